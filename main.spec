@@ -3,7 +3,7 @@
 import os
 import sys
 import platform
-from PyInstaller.utils.hooks import collect_submodules
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 
 block_cipher = None
 
@@ -49,7 +49,7 @@ a = Analysis(
     datas=[
         (chrome_portable_path, 'chrome_portable'),
         (chromedriver_path, 'chromedriver')
-    ],
+    ] + collect_data_files('seleniumwire'),  # selenium-wire's proxy CA certificate
     hiddenimports=collect_submodules('tkinter') + collect_submodules('ttkbootstrap') + ['win32ctypes.pywin32', 'pywintypes', 'win32api'],
     hookspath=[],
     hooksconfig={},
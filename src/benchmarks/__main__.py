@@ -0,0 +1,43 @@
+"""
+Offline benchmark suite: `python -m benchmarks` from src/.
+
+Starts a local fixture web server and the bundled Chromium, runs the selected
+benchmarks and writes the results as JSON, optionally comparing them with the
+results of an earlier commit.
+"""
+import argparse
+import json
+import os
+import sys
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks', description='Run the offline ScrapeGoat benchmarks.')
+    parser.add_argument('--output', default='benchmark-results.json', help='where to write the results')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file of an earlier run to compare with')
+    parser.add_argument('--only', action='append', help='benchmark to run (repeatable): startup, steps, '
+                                                        'handlers, throughput, memory')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per latency benchmark')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of the throughput benchmark')
+    parser.add_argument('--tabs', type=int, default=5, help='tabs opened by the memory benchmark')
+    parser.add_argument('--headed', action='store_true', help='show the browser windows')
+    args = parser.parse_args()
+
+    from utils.logger import Logger
+    Logger(stream=sys.stderr)
+    from benchmarks.suite import BenchmarkSuite, compare, load_results
+
+    suite = BenchmarkSuite(repeat=args.repeat, duration=args.duration, tabs=args.tabs, headless=not args.headed)
+    results = suite.run(args.only)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    if args.compare:
+        print(compare(load_results(args.compare), results))
+    return 0
+
+
+sys.exit(main())
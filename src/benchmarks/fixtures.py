@@ -0,0 +1,178 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+import threading
+import time
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+</body></html>"""
+
+
+def _int(query: Dict[str, list], name: str, default: int) -> int:
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        return default
+
+
+def form_page(query) -> str:
+    """A login-like form: text field, checkbox and a submit button that navigates."""
+    return PAGE.format(title='form', body="""
+<form action="/done" method="get">
+  <input type="email" name="email" id="email">
+  <input type="checkbox" name="remember" id="remember">
+  <button type="submit" id="submit">Sign in</button>
+</form>""")
+
+
+def done_page(query) -> str:
+    return PAGE.format(title='done', body='<h1 id="done">Done</h1>')
+
+
+def large_page(query) -> str:
+    """`nodes` nested rows of filler DOM with the target button at the very end."""
+    nodes = _int(query, 'nodes', 5000)
+    rows = ''.join(
+        f'<div class="row" data-i="{i}"><span class="label">Item {i}</span><a href="#{i}">link {i}</a></div>'
+        for i in range(nodes)
+    )
+    return PAGE.format(title='large', body=f"""
+<div id="rows">{rows}</div>
+<button id="target" onclick="document.body.insertAdjacentHTML('beforeend', '<p id=clicked>ok</p>')">Go</button>""")
+
+
+def delayed_page(query) -> str:
+    """The target button is inserted `ms` milliseconds after load."""
+    delay = _int(query, 'ms', 500)
+    return PAGE.format(title='delayed', body=f"""
+<div id="slot"></div>
+<script>
+setTimeout(function () {{
+  document.getElementById('slot').innerHTML = '<button id="target" onclick="this.textContent=\\'clicked\\'">Go</button>';
+}}, {delay});
+</script>""")
+
+
+def ajax_page(query) -> str:
+    """The target button is inserted from an XHR to /api/item, which answers after `ms` milliseconds."""
+    delay = _int(query, 'ms', 300)
+    return PAGE.format(title='ajax', body=f"""
+<div id="slot"></div>
+<script>
+fetch('/api/item?ms={delay}').then(function (r) {{ return r.json(); }}).then(function (item) {{
+  document.getElementById('slot').innerHTML = '<button id="target">' + item.label + '</button>';
+}});
+</script>""")
+
+
+def shadow_page(query) -> str:
+    """A button inside an open shadow root."""
+    return PAGE.format(title='shadow', body="""
+<div id="host"></div>
+<script>
+var root = document.getElementById('host').attachShadow({mode: 'open'});
+root.innerHTML = '<button id="inner">Inner</button>';
+root.getElementById('inner').addEventListener('click', function () {
+  document.body.insertAdjacentHTML('beforeend', '<p id="shadow-clicked">ok</p>');
+});
+</script>""")
+
+
+def alert_page(query) -> str:
+    return PAGE.format(title='alert', body="""
+<button id="target" onclick="alert('benchmark')">Alert</button>""")
+
+
+def captcha_page(query) -> str:
+    """
+    A stand-in CAPTCHA iframe that "gets solved" (removed) after `ms` milliseconds. The iframe's
+    src is the only mention of "captcha" in the page, as handle_captcha waits for it to disappear.
+    """
+    delay = _int(query, 'ms', 1000)
+    return PAGE.format(title='challenge', body=f"""
+<iframe id="challenge" src="/captcha/frame" width="300" height="80"></iframe>
+<script>
+setTimeout(function () {{ document.getElementById('challenge').remove(); }}, {delay});
+</script>""")
+
+
+def captcha_frame(query) -> str:
+    return PAGE.format(title='challenge', body='<label><input type="checkbox" id="robot"> I am not a robot</label>')
+
+
+def api_item(query) -> str:
+    time.sleep(_int(query, 'ms', 300) / 1000)
+    return '{"label": "Loaded"}'
+
+
+ROUTES: Dict[str, Callable[[Dict[str, list]], str]] = {
+    '/form': form_page,
+    '/done': done_page,
+    '/large': large_page,
+    '/delayed': delayed_page,
+    '/ajax': ajax_page,
+    '/shadow': shadow_page,
+    '/alert': alert_page,
+    '/captcha': captcha_page,
+    '/captcha/frame': captcha_frame,
+    '/api/item': api_item,
+}
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        route = ROUTES.get(parts.path)
+        if route is None:
+            self.send_error(404)
+            return
+        body = route(parse_qs(parts.query)).encode('utf-8')
+        content_type = 'application/json' if parts.path.startswith('/api/') else 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serves the synthetic benchmark pages on a free local port from a daemon thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'FixtureServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._server = ThreadingHTTPServer((self.host, self.port), _FixtureHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="benchmark-fixtures", daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://{self.host}:{self.port}{path}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
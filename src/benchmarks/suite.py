@@ -0,0 +1,245 @@
+from typing import Any, Callable, Dict, List, Optional
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from driver.profiler import CommandProfiler
+from driver.selenium import BrowserClient, UIElement
+from .fixtures import FixtureServer
+from . import logger
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count, min, median, mean, p95 and max of `samples` (seconds)."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'min': round(ordered[0], 4),
+        'median': round(statistics.median(ordered), 4),
+        'mean': round(statistics.fmean(ordered), 4),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'max': round(ordered[-1], 4),
+    }
+
+
+def _step(selector_value: str, action: str = 'click', settle: str = 'none', settle_value: str = '',
+          selector_type: str = 'css', action_value: str = '', in_page: bool = False) -> Dict[str, Any]:
+    return {
+        'element_type': selector_value, 'selector_type': selector_type, 'selector_value': selector_value,
+        'action': action, 'action_value': action_value, 'in_page': in_page, 'settle': settle,
+        'settle_value': settle_value, 'max_retries': 0,
+    }
+
+
+# page path -> step definitions run by the "steps" benchmark
+STEP_SCENARIOS: Dict[str, List[Dict[str, Any]]] = {
+    '/form': [
+        _step('#email', action='send_keys', action_value='bench@example.com'),
+        _step('#remember', action='USE_SCRIPT', in_page=True),
+        _step('#submit', settle='url_change'),
+    ],
+    '/large?nodes=5000': [_step('#target', settle='element', settle_value='css:#clicked', in_page=True)],
+    '/delayed?ms=500': [_step('#target', in_page=True)],
+    '/ajax?ms=300': [_step('#target', in_page=True)],
+}
+
+
+class BenchmarkSuite:
+    """
+    Runs the browser benchmarks against a local FixtureServer, so results do not
+    depend on the network. Every benchmark starts its own bundled-Chromium
+    BrowserClient; `run()` returns a JSON-serialisable result document.
+    """
+
+    def __init__(self, repeat: int = 5, duration: float = 30, tabs: int = 5, headless: bool = True):
+        self.repeat = repeat
+        self.duration = duration
+        self.tabs = tabs
+        self.headless = headless
+        self.server = FixtureServer()
+        self.benchmarks: Dict[str, Callable[[], Dict[str, Any]]] = {
+            'startup': self.bench_startup,
+            'steps': self.bench_steps,
+            'handlers': self.bench_handlers,
+            'throughput': self.bench_throughput,
+            'memory': self.bench_memory,
+        }
+
+    def _client(self, **options) -> BrowserClient:
+        client = BrowserClient(browser_headless=self.headless, max_retries=0, **options)
+        client.initialize_driver()
+        if not client.driver:
+            raise RuntimeError("Failed to start the bundled Chromium")
+        return client
+
+    def bench_startup(self) -> Dict[str, Any]:
+        """Cold start time of a browser."""
+        samples = []
+        for _ in range(self.repeat):
+            client = self._client()
+            samples.append(client.startup_time)
+            client.close_driver()
+        return {'startup': summarize(samples)}
+
+    def bench_steps(self) -> Dict[str, Any]:
+        """Per-step and per-chain latency of process_elements_chain, in both execution modes."""
+        results: Dict[str, Any] = {}
+        profiler = CommandProfiler()
+        client = self._client(profiler=profiler)
+        try:
+            for mode in ('steps', 'batched'):
+                for path, definitions in STEP_SCENARIOS.items():
+                    elements = [UIElement(definition) for definition in definitions]
+                    chains, steps, roundtrips = [], {element.element_type: [] for element in elements}, []
+                    for _ in range(self.repeat):
+                        client.visit(self.server.url(path))
+                        profiler.reset()
+                        started = time.perf_counter()
+                        if mode == 'batched':
+                            client.process_elements_chain(elements, batched=True)
+                        else:
+                            for element in elements:
+                                step_started = time.perf_counter()
+                                client.process_element(element)
+                                steps[element.element_type].append(time.perf_counter() - step_started)
+                        chains.append(time.perf_counter() - started)
+                        roundtrips.append(profiler.report()['roundtrips'])
+                    result = {'chain': summarize(chains), 'roundtrips': statistics.median(roundtrips)}
+                    if mode == 'steps':
+                        result['steps'] = {name: summarize(samples) for name, samples in steps.items()}
+                    results[f"{mode} {path}"] = result
+        finally:
+            client.close_driver()
+        return results
+
+    def bench_handlers(self) -> Dict[str, Any]:
+        """Shadow DOM, alert and CAPTCHA stand-in handling."""
+        shadow, alert, captcha = [], [], []
+        client = self._client()
+        try:
+            for _ in range(self.repeat):
+                client.visit(self.server.url('/shadow'))
+                started = time.perf_counter()
+                inner = client.handle_shadow_dom('#host', '#inner')
+                if inner is None:
+                    raise RuntimeError("Shadow DOM benchmark could not find #inner inside #host")
+                inner.click()
+                shadow.append(time.perf_counter() - started)
+
+                client.visit(self.server.url('/alert'))
+                started = time.perf_counter()
+                client.click_element(By.CSS_SELECTOR, '#target')
+                client.handle_alert()
+                alert.append(time.perf_counter() - started)
+
+                client.visit(self.server.url('/captcha?ms=1000'))
+                started = time.perf_counter()
+                client.handle_captcha()
+                captcha.append(time.perf_counter() - started)
+        finally:
+            client.close_driver()
+        return {'shadow_dom': summarize(shadow), 'alert': summarize(alert), 'captcha_1s': summarize(captcha)}
+
+    def bench_throughput(self) -> Dict[str, Any]:
+        """Pages per minute a single browser loads for `duration` seconds."""
+        client = self._client()
+        pages, loads = 0, []
+        try:
+            started_at = time.perf_counter()
+            deadline = started_at + self.duration
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                client.visit(self.server.url(f'/large?nodes=1000&n={pages}'))
+                loads.append(time.perf_counter() - started)
+                pages += 1
+        finally:
+            elapsed = time.perf_counter() - started_at
+            client.close_driver()
+        return {'pages_per_minute': round(pages / elapsed * 60, 1), 'page_load': summarize(loads)}
+
+    def bench_memory(self) -> Dict[str, Any]:
+        """Unique memory (USS) of the browser process tree with one tab, and per additional tab."""
+        client = self._client()
+        try:
+            client.visit(self.server.url('/large?nodes=5000'))
+            time.sleep(1)
+            baseline = client.get_memory_usage('uss')
+            for index in range(self.tabs):
+                client.driver.execute_script("window.open(arguments[0], '_blank');",
+                                             self.server.url(f'/large?nodes=5000&tab={index}'))
+            time.sleep(2)
+            loaded = client.get_memory_usage('uss')
+        finally:
+            client.close_driver()
+        return {
+            'browser_mb': round(baseline, 1),
+            'with_tabs_mb': round(loaded, 1),
+            'per_tab_mb': round((loaded - baseline) / self.tabs, 1),
+            'tabs': self.tabs,
+        }
+
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Any]:
+        names = only or list(self.benchmarks)
+        unknown = set(names) - set(self.benchmarks)
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        results: Dict[str, Any] = {}
+        with self.server:
+            for name in names:
+                logger.info("Running benchmark '%s'", name)
+                started = time.perf_counter()
+                results[name] = self.benchmarks[name]()
+                logger.info("Benchmark '%s' finished in %.1fs", name, time.perf_counter() - started)
+        return {'meta': environment(), 'settings': self.settings(), 'results': results}
+
+    def settings(self) -> Dict[str, Any]:
+        return {'repeat': self.repeat, 'duration': self.duration, 'tabs': self.tabs, 'headless': self.headless}
+
+
+def environment() -> Dict[str, Any]:
+    """Commit and machine the results were produced on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+    }
+
+
+def _flatten(document: Any, prefix: str = '') -> Dict[str, float]:
+    if isinstance(document, dict):
+        flat: Dict[str, float] = {}
+        for key, value in document.items():
+            flat.update(_flatten(value, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(document, (int, float)) and not isinstance(document, bool):
+        return {prefix: document}
+    return {}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Render the relative change of every numeric result between two result documents."""
+    old, new = _flatten(baseline.get('results', {})), _flatten(current.get('results', {}))
+    lines = [f"{'metric':<60}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for key in sorted(old.keys() & new.keys()):
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else 'n/a'
+        lines.append(f"{key:<60}{old[key]:>12g}{new[key]:>12g}{change:>10}")
+    return '\n'.join(lines)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as file:
+        return json.load(file)
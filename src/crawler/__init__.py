@@ -0,0 +1,2 @@
+from utils.logger import Logger
+logger = Logger()
\ No newline at end of file
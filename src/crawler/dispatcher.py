@@ -0,0 +1,80 @@
+from urllib.parse import urljoin
+from typing import Callable, Iterable, List, Optional
+import threading
+
+from driver.pool import BrowserPool
+from driver.selenium import BrowserClient
+from utils.logger import log_context
+from .frontier import CrawlRequest, Frontier
+from . import logger
+
+# A handler works on a client that has already visited the request's URL and
+# may return newly discovered links (absolute or relative to the current page).
+CrawlHandler = Callable[[BrowserClient, CrawlRequest], Optional[Iterable[str]]]
+
+
+class Dispatcher:
+    """
+    Feeds requests from a Frontier to workers leasing browsers from a BrowserPool.
+
+    Each worker thread takes the next fetchable request, visits it on a pooled
+    browser, runs `handler` and pushes the links it returns back into the frontier.
+    The crawl ends once the frontier has no pending or in-flight requests.
+    """
+
+    def __init__(self, frontier: Frontier, pool: BrowserPool, handler: CrawlHandler,
+                 workers: Optional[int] = None, max_depth: Optional[int] = None):
+        self.frontier = frontier
+        self.pool = pool
+        self.handler = handler
+        self.workers = workers or pool.size
+        self.max_depth = max_depth
+        self.processed = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        """Crawl until the frontier is exhausted or `stop()` is called."""
+        threads: List[threading.Thread] = [
+            threading.Thread(target=self._work, name=f"crawler-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info("Crawl finished: %s pages processed, %s failed", self.processed, self.failed)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            request = self.frontier.next(timeout=1.0)
+            if request is None:
+                if len(self.frontier) == 0 and self.frontier.in_flight == 0:
+                    return
+                continue
+            try:
+                with log_context(worker=threading.current_thread().name, url=request.url):
+                    self._process(request)
+            finally:
+                self.frontier.done(request)
+
+    def _process(self, request: CrawlRequest) -> None:
+        try:
+            with self.pool.lease() as client:
+                client.visit(request.url)
+                links = self.handler(client, request)
+                base_url = client.driver.current_url
+            with self._stats_lock:
+                self.processed += 1
+        except Exception as e:
+            logger.error("Failed to crawl %s: %s", request.url, e)
+            with self._stats_lock:
+                self.failed += 1
+            return
+
+        if links and (self.max_depth is None or request.depth < self.max_depth):
+            added = self.frontier.add_many((urljoin(base_url, link) for link in links), depth=request.depth + 1)
+            logger.debug("Discovered %d new URLs on %s", added, request.url)
@@ -0,0 +1,210 @@
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import posixpath
+import re
+import string
+import threading
+import time
+
+from .bloom import BloomFilter
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMETERS = ('utm_', 'gclid', 'fbclid', 'msclkid', 'mc_eid', '_ga')
+SAFE_PATH_CHARACTERS = "/:@!$&'()*+,;=-._~%"
+# RFC 3986 unreserved characters: the only ones whose percent-escapes can be decoded without changing the URL.
+UNRESERVED_CHARACTERS = frozenset(string.ascii_letters + string.digits + '-._~')
+PERCENT_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+
+def _normalize_escapes(component: str) -> str:
+    """Decode escaped unreserved characters and uppercase every other escape (%7e -> ~, %2f -> %2F)."""
+    def replace(match):
+        character = chr(int(match.group(1), 16))
+        return character if character in UNRESERVED_CHARACTERS else f"%{match.group(1).upper()}"
+    return PERCENT_ESCAPE.sub(replace, component)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalise a URL so that trivially different spellings of the same page compare equal.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, resolves dot segments and sorts the query string. Percent-escapes
+    in the path are only decoded for unreserved characters, so "%2F" stays distinct
+    from "/"; user info is kept as is.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    userinfo, separator, _ = parts.netloc.rpartition('@')
+    if separator:
+        host = f"{userinfo}@{host}"
+
+    path = quote(_normalize_escapes(parts.path), safe=SAFE_PATH_CHARACTERS) or '/'
+    normalized = posixpath.normpath(path)
+    if path.endswith('/') and normalized != '/':
+        normalized += '/'
+    path = normalized.replace('//', '/')
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMETERS)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def get_host(url: str) -> str:
+    """Return the lowercased host (with non-default port) of a URL."""
+    return urlsplit(url).netloc.lower()
+
+
+class CrawlRequest:
+    """A URL scheduled by the frontier together with its crawl metadata."""
+
+    __slots__ = ('url', 'host', 'priority', 'depth', 'meta')
+
+    def __init__(self, url: str, priority: int = 0, depth: int = 0, meta: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.host = get_host(url)
+        self.priority = priority
+        self.depth = depth
+        self.meta = meta or {}
+
+    def __repr__(self) -> str:
+        return f"CrawlRequest(url={self.url!r}, priority={self.priority}, depth={self.depth})"
+
+
+class Frontier:
+    """
+    Thread-safe crawl frontier.
+
+    URLs are canonicalised and deduplicated through a Bloom filter, then kept in
+    one priority queue per host. A host is handed out to at most one worker at a
+    time and only after `politeness_delay` seconds have passed since its previous
+    fetch finished, so busy hosts are throttled while other hosts keep workers busy.
+    Higher `priority` values are crawled first.
+    """
+
+    def __init__(self, politeness_delay: float = 1.0, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.politeness_delay = politeness_delay
+        self.seen = BloomFilter(capacity, error_rate)
+        self._host_queues: Dict[str, List[Tuple[int, int, CrawlRequest]]] = {}
+        self._host_delays: Dict[str, float] = {}
+        self._host_next_fetch: Dict[str, float] = {}
+        self._host_state: Dict[str, str] = {}
+        self._ready: List[Tuple[int, int, str]] = []
+        self._cooling: List[Tuple[float, str]] = []
+        self._counter = itertools.count()
+        self._pending = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def set_delay(self, host: str, delay: float) -> None:
+        """Override the politeness delay for a single host (e.g. from robots.txt Crawl-delay)."""
+        with self._condition:
+            self._host_delays[host.lower()] = delay
+
+    def add(self, url: str, priority: int = 0, depth: int = 0, **meta) -> bool:
+        """Schedule `url` unless it has been seen before. Return True if it was added."""
+        canonical = canonicalize_url(url)
+        with self._condition:
+            if not self.seen.add(canonical):
+                return False
+            request = CrawlRequest(canonical, priority, depth, meta)
+            queue = self._host_queues.setdefault(request.host, [])
+            heapq.heappush(queue, (-priority, next(self._counter), request))
+            self._pending += 1
+            state = self._host_state.get(request.host)
+            if state is None:
+                self._schedule_host(request.host)
+            elif state == 'ready':
+                # Re-push so a new higher-priority head is not hidden behind a stale entry.
+                heapq.heappush(self._ready, (-queue[0][2].priority, next(self._counter), request.host))
+            self._condition.notify()
+            return True
+
+    def add_many(self, urls, priority: int = 0, depth: int = 0) -> int:
+        """Schedule several URLs and return how many were new."""
+        return sum(self.add(url, priority, depth) for url in urls)
+
+    def _schedule_host(self, host: str) -> None:
+        ready_at = self._host_next_fetch.get(host, 0.0)
+        if ready_at <= time.monotonic():
+            self._host_state[host] = 'ready'
+            heapq.heappush(self._ready, (-self._host_queues[host][0][2].priority, next(self._counter), host))
+        else:
+            self._host_state[host] = 'cooling'
+            heapq.heappush(self._cooling, (ready_at, host))
+
+    def _promote_cooled_hosts(self, now: float) -> None:
+        while self._cooling and self._cooling[0][0] <= now:
+            _, host = heapq.heappop(self._cooling)
+            if self._host_state.get(host) == 'cooling':
+                self._host_state[host] = 'ready'
+                heapq.heappush(self._ready, (-self._host_queues[host][0][2].priority, next(self._counter), host))
+
+    def next(self, timeout: Optional[float] = None) -> Optional[CrawlRequest]:
+        """
+        Return the next request that may be fetched now, blocking until a host is ready.
+        Return None once the frontier is exhausted or `timeout` expires.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._pending == 0 and self._in_flight == 0:
+                    return None
+                now = time.monotonic()
+                self._promote_cooled_hosts(now)
+                while self._ready:
+                    _, _, host = heapq.heappop(self._ready)
+                    if self._host_state.get(host) != 'ready':
+                        continue
+                    _, _, request = heapq.heappop(self._host_queues[host])
+                    self._host_state[host] = 'fetching'
+                    self._pending -= 1
+                    self._in_flight += 1
+                    return request
+
+                if deadline is not None and now >= deadline:
+                    return None
+                wait = None if deadline is None else deadline - now
+                if self._cooling:
+                    until_cooled = self._cooling[0][0] - now
+                    wait = until_cooled if wait is None else min(wait, until_cooled)
+                self._condition.wait(wait)
+
+    def done(self, request: CrawlRequest) -> None:
+        """Mark a request returned by `next()` as finished, releasing its host after the politeness delay."""
+        with self._condition:
+            self._in_flight -= 1
+            host = request.host
+            delay = self._host_delays.get(host, self.politeness_delay)
+            self._host_next_fetch[host] = time.monotonic() + delay
+            if self._host_queues.get(host):
+                self._schedule_host(host)
+            else:
+                self._host_queues.pop(host, None)
+                self._host_state.pop(host, None)
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return self._pending
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'pending': self._pending,
+                'in_flight': self._in_flight,
+                'hosts': len(self._host_queues),
+                'seen': len(self.seen),
+            }
@@ -0,0 +1,324 @@
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+import json
+import os
+import secrets
+import sqlite3
+import time
+import uuid
+
+from storage.database import ThreadConnections
+from utils.filesystem import get_data_path
+from . import logger
+
+JOB_STATES = ('pending', 'leased', 'done', 'failed')
+DEFAULT_BROKER_PORT = 7463
+BROKER_KEY_ENV = 'SCRAPEGOAT_BROKER_KEY'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_token TEXT,
+    leased_by TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, state, available_at);
+"""
+
+
+def retry_delay(attempts: int, base: float = 5.0, cap: float = 300.0) -> float:
+    """Delay before a failed job becomes available again, doubling with every attempt."""
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+class Job:
+    """A leased unit of work. `lease_token` proves the lease when the job is completed or failed."""
+
+    __slots__ = ('id', 'queue', 'payload', 'attempts', 'max_attempts', 'lease_token', 'leased_by')
+
+    def __init__(self, id: int, queue: str, payload: Dict[str, Any], attempts: int, max_attempts: int,
+                 lease_token: str, leased_by: str):
+        self.id = id
+        self.queue = queue
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.lease_token = lease_token
+        self.leased_by = leased_by
+
+    def __repr__(self) -> str:
+        return f"Job(id={self.id}, queue={self.queue!r}, attempts={self.attempts}/{self.max_attempts})"
+
+
+class JobQueue:
+    """
+    Interface of a job queue backend.
+
+    A worker `lease()`s a job for `visibility_timeout` seconds, during which no other
+    worker sees it. The lease is extended with `heartbeat()` while the job runs and
+    ends with `complete()` or `fail()`. If the worker dies instead, the lease runs
+    out and the job is handed to another worker, until `max_attempts` is spent.
+    Calls made with a lost lease are rejected (they return False).
+    """
+
+    def put(self, payload: Dict[str, Any], queue: str = 'default', priority: int = 0, max_attempts: int = 3) -> int:
+        raise NotImplementedError
+
+    def put_many(self, payloads: Iterable[Dict[str, Any]], queue: str = 'default', priority: int = 0,
+                 max_attempts: int = 3) -> List[int]:
+        return [self.put(payload, queue, priority, max_attempts) for payload in payloads]
+
+    def lease(self, worker: str, visibility_timeout: float = 300, queue: str = 'default') -> Optional[Job]:
+        raise NotImplementedError
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        raise NotImplementedError
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        raise NotImplementedError
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        raise NotImplementedError
+
+    def results(self, queue: str = 'default', state: Optional[str] = None, after_id: int = 0,
+                limit: int = 1000) -> List[Dict[str, Any]]:
+        """Finished (or, with `state`, any) jobs with an id above `after_id`, oldest first."""
+        raise NotImplementedError
+
+    def stats(self, queue: str = 'default') -> Dict[str, int]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a local SQLite database, shared by every worker process on the box.
+
+    Leases are taken in `BEGIN IMMEDIATE` transactions so two processes never lease
+    the same job; otherwise it follows the other stores: WAL mode, one connection
+    per thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_data_path('jobs.db')
+        self._connections = ThreadConnections(self.path, isolation_level=None)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def put(self, payload: Dict[str, Any], queue: str = 'default', priority: int = 0, max_attempts: int = 3) -> int:
+        return self.put_many([payload], queue, priority, max_attempts)[0]
+
+    def put_many(self, payloads: Iterable[Dict[str, Any]], queue: str = 'default', priority: int = 0,
+                 max_attempts: int = 3) -> List[int]:
+        now = time.time()
+        with self._transaction() as connection:
+            return [connection.execute(
+                'INSERT INTO jobs (queue, payload, priority, max_attempts, available_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', (queue, json.dumps(payload), priority, max_attempts, now, now, now)
+            ).lastrowid for payload in payloads]
+
+    def lease(self, worker: str, visibility_timeout: float = 300, queue: str = 'default') -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', error = COALESCE(error, 'lease expired'), lease_token = NULL, "
+                "updated_at = ? WHERE queue = ? AND state = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, queue, now),
+            )
+            row = connection.execute(
+                "SELECT id, payload, attempts, max_attempts FROM jobs WHERE queue = ? AND "
+                "((state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?)) "
+                "ORDER BY priority DESC, id LIMIT 1", (queue, now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts, max_attempts = row
+            token = uuid.uuid4().hex
+            connection.execute(
+                "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_token = ?, leased_by = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (token, worker, now + visibility_timeout, now, job_id),
+            )
+        return Job(job_id, queue, json.loads(payload), attempts + 1, max_attempts, token, worker)
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND state = 'leased' AND lease_token = ?",
+                (now + visibility_timeout, now, job.id, job.lease_token),
+            ).rowcount == 1
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND state = 'leased' AND lease_token = ?",
+                (json.dumps(result, default=str), time.time(), job.id, job.lease_token),
+            ).rowcount == 1
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        now = time.time()
+        retry = retry and job.attempts < job.max_attempts
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET state = ?, error = ?, available_at = ?, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND state = 'leased' AND lease_token = ?",
+                ('pending' if retry else 'failed', error, now + retry_delay(job.attempts), now, job.id, job.lease_token),
+            ).rowcount == 1
+
+    def results(self, queue: str = 'default', state: Optional[str] = None, after_id: int = 0,
+                limit: int = 1000) -> List[Dict[str, Any]]:
+        states = (state,) if state else ('done', 'failed')
+        rows = self._connection().execute(
+            f"SELECT id, payload, state, attempts, result, error FROM jobs WHERE queue = ? AND id > ? "
+            f"AND state IN ({', '.join('?' * len(states))}) ORDER BY id LIMIT ?", (queue, after_id, *states, limit)
+        ).fetchall()
+        return [{
+            'id': job_id, 'payload': json.loads(payload), 'state': job_state, 'attempts': attempts,
+            'result': json.loads(result) if result else None, 'error': error,
+        } for job_id, payload, job_state, attempts, result, error in rows]
+
+    def stats(self, queue: str = 'default') -> Dict[str, int]:
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update(self._connection().execute(
+            'SELECT state, COUNT(*) FROM jobs WHERE queue = ? GROUP BY state', (queue,)
+        ).fetchall())
+        return counts
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+# Separate manager classes, as `register()` is class-wide and a process may be both server and client.
+class _BrokerServerManager(BaseManager):
+    pass
+
+
+class _BrokerClientManager(BaseManager):
+    pass
+
+
+class BrokerServer:
+    """
+    Local stand-in for a network broker: serves a queue (usually a SQLiteJobQueue)
+    to workers on other boxes over a multiprocessing manager connection.
+
+    The protocol is pickle-based and only authenticated by `authkey`, so bind it to
+    a trusted network. The key defaults to the SCRAPEGOAT_BROKER_KEY environment
+    variable; without one a random key is generated (see `generated_key`) and
+    workers must be given it in SCRAPEGOAT_BROKER_KEY.
+    """
+
+    def __init__(self, queue: JobQueue, host: str = '127.0.0.1', port: int = DEFAULT_BROKER_PORT,
+                 authkey: Optional[bytes] = None):
+        authkey = authkey or os.environ.get(BROKER_KEY_ENV, '').encode()
+        self.generated_key: Optional[str] = None
+        if not authkey:
+            self.generated_key = secrets.token_urlsafe(24)
+            authkey = self.generated_key.encode()
+        _BrokerServerManager.register('queue', callable=lambda: queue)
+        self.manager = _BrokerServerManager(address=(host, port), authkey=authkey)
+        self.address = (host, port)
+
+    def serve_forever(self) -> None:
+        logger.info("Job broker listening on %s:%s", self.address[0], self.address[1])
+        self.manager.get_server().serve_forever()
+
+
+class BrokerJobQueue(JobQueue):
+    """
+    JobQueue client of a BrokerServer. Method calls are forwarded as is; each thread gets its own connection.
+    The broker's key is taken from `authkey` or the SCRAPEGOAT_BROKER_KEY environment variable.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_BROKER_PORT, authkey: Optional[bytes] = None):
+        authkey = authkey or os.environ.get(BROKER_KEY_ENV, '').encode()
+        if not authkey:
+            raise ValueError(f"Set {BROKER_KEY_ENV} to the key of the job broker at {host}:{port}")
+        _BrokerClientManager.register('queue')
+        manager = _BrokerClientManager(address=(host, port), authkey=authkey)
+        manager.connect()
+        self._queue = manager.queue()
+
+    def put(self, payload: Dict[str, Any], queue: str = 'default', priority: int = 0, max_attempts: int = 3) -> int:
+        return self._queue.put(payload, queue, priority, max_attempts)
+
+    def put_many(self, payloads: Iterable[Dict[str, Any]], queue: str = 'default', priority: int = 0,
+                 max_attempts: int = 3) -> List[int]:
+        return self._queue.put_many(list(payloads), queue, priority, max_attempts)
+
+    def lease(self, worker: str, visibility_timeout: float = 300, queue: str = 'default') -> Optional[Job]:
+        return self._queue.lease(worker, visibility_timeout, queue)
+
+    def heartbeat(self, job: Job, visibility_timeout: float = 300) -> bool:
+        return self._queue.heartbeat(job, visibility_timeout)
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        return self._queue.complete(job, result)
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        return self._queue.fail(job, error, retry)
+
+    def results(self, queue: str = 'default', state: Optional[str] = None, after_id: int = 0,
+                limit: int = 1000) -> List[Dict[str, Any]]:
+        return self._queue.results(queue, state, after_id, limit)
+
+    def stats(self, queue: str = 'default') -> Dict[str, int]:
+        return self._queue.stats(queue)
+
+
+def _open_broker(address: str) -> JobQueue:
+    parts = urlsplit(address)
+    return BrokerJobQueue(parts.hostname or '127.0.0.1', parts.port or DEFAULT_BROKER_PORT)
+
+
+# URL scheme -> factory taking the full queue address; register other brokers here.
+QUEUE_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    'sqlite': lambda address: SQLiteJobQueue(address.split('://', 1)[1]),
+    'broker': _open_broker,
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], JobQueue]) -> None:
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_queue(address: Optional[str] = None) -> JobQueue:
+    """
+    Open a job queue from an address: a SQLite file path, `sqlite://path` or `broker://host:port`.
+    Without one, the SQLite queue jobs.db in the data directory is opened.
+    """
+    address = address or get_data_path('jobs.db')
+    scheme = address.split('://', 1)[0] if '://' in address else 'sqlite'
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown job queue backend '{scheme}' (known: {', '.join(sorted(QUEUE_BACKENDS))})")
+    return QUEUE_BACKENDS[scheme](address if '://' in address else f"sqlite://{address}")
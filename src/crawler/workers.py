@@ -0,0 +1,304 @@
+from typing import Any, Dict, List, Optional
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from utils.logger import log_context
+from .jobs import Job, JobQueue, open_queue, retry_delay
+from . import logger
+
+
+class _RunningJob:
+    """A job a worker thread is running, with when it started and the browser it runs on."""
+
+    __slots__ = ('job', 'started', 'client', 'killed')
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.started = time.monotonic()
+        self.client = None
+        self.killed = False
+
+
+class Worker:
+    """
+    Runs queued recipe jobs in the current process on its own BrowserPool.
+
+    Each job payload carries the recipe definition (`site`, `page`, `definition`)
+    and the `url` to run it on, so workers on other boxes need no recipe files.
+    One thread per browser leases jobs; a heartbeat thread keeps the leases of
+    running jobs alive. When the process dies, its leases run out after
+    `visibility_timeout` and the jobs go to other workers. A job still running
+    after `max_job_runtime` seconds is considered wedged: its lease is no longer
+    extended and its browser is killed, which fails the job.
+    """
+
+    def __init__(self, queue_address: Optional[str] = None, queue: str = 'default', browsers: int = 1,
+                 visibility_timeout: float = 300, poll_interval: float = 2.0, exit_when_idle: bool = False,
+                 name: Optional[str] = None, max_job_runtime: float = 900, **client_options):
+        self.queue_address = queue_address
+        self.queue_name = queue
+        self.browsers = browsers
+        self.visibility_timeout = visibility_timeout
+        self.max_job_runtime = max_job_runtime
+        self.poll_interval = poll_interval
+        self.exit_when_idle = exit_when_idle
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.client_options = client_options
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[JobQueue] = None
+        self._running: Dict[int, _RunningJob] = {}
+        self._recipes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        """Work until `stop()` is called (or SIGTERM arrives), or the queue runs dry with `exit_when_idle`."""
+        from driver.pool import BrowserPool
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        self._queue = open_queue(self.queue_address)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            with BrowserPool(size=self.browsers, **self.client_options) as pool:
+                threads = [threading.Thread(target=self._work, args=(pool,), name=f"job-worker-{i}", daemon=True)
+                           for i in range(self.browsers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            self._stop.set()
+            self._queue.close()
+        logger.info("Worker %s stopped: %s jobs completed, %s failed", self.name, self.completed, self.failed)
+
+    def stop(self) -> None:
+        """Finish the running jobs and stop leasing new ones."""
+        self._stop.set()
+
+    def _work(self, pool) -> None:
+        errors = 0
+        while not self._stop.is_set():
+            try:
+                job = self._queue.lease(self.name, self.visibility_timeout, self.queue_name)
+                if job is None and self.exit_when_idle and self._idle():
+                    return
+            except Exception as e:
+                # An unreachable queue must not end the thread while the process stays up
+                errors += 1
+                delay = retry_delay(errors, base=self.poll_interval, cap=60.0)
+                logger.error("Failed to lease a job from queue %s, retrying in %.1fs: %s", self.queue_name, delay, e)
+                self._stop.wait(delay)
+                continue
+            errors = 0
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            running = _RunningJob(job)
+            with self._lock:
+                self._running[job.id] = running
+            try:
+                self._process(pool, running)
+            except Exception as e:
+                # Reporting the outcome failed; the lease runs out and the job is retried
+                logger.error("Failed to report the outcome of job %s: %s", job.id, e)
+            finally:
+                with self._lock:
+                    self._running.pop(job.id, None)
+
+    def _idle(self) -> bool:
+        stats = self._queue.stats(self.queue_name)
+        return stats['pending'] == 0 and stats['leased'] == 0
+
+    def _recipe(self, payload: Dict[str, Any]):
+        from driver.recipes import compile_recipe
+        key = json.dumps([payload['site'], payload['page'], payload['definition']], sort_keys=True)
+        with self._lock:
+            recipe = self._recipes.get(key)
+            if recipe is None:
+                recipe = self._recipes[key] = compile_recipe(payload['site'], payload['page'], payload['definition'])
+        return recipe
+
+    def _process(self, pool, running: _RunningJob) -> None:
+        job = running.job
+        payload = job.payload
+        url = payload.get('url')
+        started = time.perf_counter()
+        try:
+            recipe = self._recipe(payload)
+            with log_context(job=recipe.name, worker=self.name, url=url), pool.lease() as client:
+                with self._lock:
+                    running.client = client
+                if running.killed:
+                    raise TimeoutError("Job was considered wedged while it waited for a browser")
+                outcome = client.run_recipe(recipe, url)
+                result: Dict[str, Any] = {'url': url, 'recipe': recipe.name, 'static': outcome.static}
+                result['final_url'] = outcome.page.url if outcome.static else client.driver.current_url
+                if outcome.unchanged:
+                    result['unchanged'] = True
+                elif outcome.records is not None:
+                    result['records'] = outcome.records
+        except Exception as e:
+            if running.killed:
+                e = TimeoutError(f"Job ran for more than {self.max_job_runtime}s")
+            logger.error("Job %s failed on %s (attempt %s/%s): %s", job.id, url, job.attempts, job.max_attempts, e,
+                         url=url)
+            with self._lock:
+                self.failed += 1
+            if not self._queue.fail(job, f"{type(e).__name__}: {e}"):
+                logger.warning("Lost the lease of job %s before reporting its failure", job.id)
+            return
+        result['elapsed'] = round(time.perf_counter() - started, 3)
+        result['worker'] = self.name
+        if self._queue.complete(job, result):
+            with self._lock:
+                self.completed += 1
+        else:
+            logger.warning("Lost the lease of job %s; its result was dropped and it will run again", job.id)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.visibility_timeout / 3):
+            with self._lock:
+                running_jobs = list(self._running.values())
+            for running in running_jobs:
+                job = running.job
+                if time.monotonic() - running.started > self.max_job_runtime:
+                    self._kill_wedged(running)
+                    continue
+                try:
+                    if not self._queue.heartbeat(job, self.visibility_timeout):
+                        logger.warning("Lease of job %s expired while it was running", job.id)
+                except Exception as e:
+                    logger.warning("Failed to extend the lease of job %s: %s", job.id, e)
+
+    def _kill_wedged(self, running: _RunningJob) -> None:
+        """Stop extending the lease of a job over `max_job_runtime` and kill the browser it is stuck on."""
+        with self._lock:
+            if running.killed:
+                return
+            running.killed = True
+            client = running.client
+        logger.error("Job %s has run for more than %ss, killing its browser", running.job.id, self.max_job_runtime)
+        if client is not None:
+            try:
+                client.kill()
+            except Exception as e:
+                logger.warning("Failed to kill the browser of job %s: %s", running.job.id, e)
+
+
+def _run_worker(options: Dict[str, Any]) -> None:
+    Worker(**options).run()
+
+
+class _Slot:
+    """A supervised worker process, with when it started and how often in a row it died early."""
+
+    __slots__ = ('process', 'started', 'failures', 'restart_at')
+
+    def __init__(self, process: multiprocessing.Process):
+        self.process = process
+        self.started = time.monotonic()
+        self.failures = 0
+        self.restart_at: Optional[float] = None
+
+
+class WorkerSupervisor:
+    """
+    Runs `processes` Worker processes and replaces any that die.
+
+    A crashing Chrome or a wedged driver only takes down its own process; the
+    supervisor starts a replacement after `restart_delay` seconds and the lost
+    jobs are retried once their lease expires. A process that dies within
+    `healthy_after` seconds of its start counts as a startup failure: the delay
+    doubles with every consecutive one (up to `max_restart_delay`), and the slot
+    is given up after `max_startup_failures`. Processes are spawned rather than
+    forked, so each one starts with a clean interpreter.
+    """
+
+    def __init__(self, processes: int, restart_delay: float = 5.0, max_restart_delay: float = 300.0,
+                 healthy_after: float = 60.0, max_startup_failures: int = 10, **worker_options):
+        self.processes = processes
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.healthy_after = healthy_after
+        self.max_startup_failures = max_startup_failures
+        self.worker_options = worker_options
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._slots: List[Optional[_Slot]] = [None] * processes
+        self._stop = threading.Event()
+
+    def _start(self, index: int) -> _Slot:
+        process = self._context.Process(target=_run_worker, args=(self.worker_options,),
+                                        name=f"scrapegoat-worker-{index}")
+        process.start()
+        previous = self._slots[index]
+        slot = self._slots[index] = _Slot(process)
+        if previous is not None:
+            slot.failures = previous.failures
+        return slot
+
+    def _check(self, index: int) -> bool:
+        """Restart the process of slot `index` when it died and its delay is over. Return whether the slot is live."""
+        slot = self._slots[index]
+        process = slot.process
+        if process.is_alive():
+            return True
+        if process.exitcode == 0:
+            return False
+        now = time.monotonic()
+        if slot.restart_at is None:
+            slot.failures = slot.failures + 1 if now - slot.started < self.healthy_after else 0
+            if slot.failures >= self.max_startup_failures:
+                logger.error("%s exited with code %s %s times in a row right after starting, giving up on it",
+                             process.name, process.exitcode, slot.failures)
+                slot.restart_at = now
+                return False
+            delay = retry_delay(slot.failures, base=self.restart_delay, cap=self.max_restart_delay)
+            logger.warning("%s exited with code %s, restarting it in %.1fs", process.name, process.exitcode, delay)
+            slot.restart_at = now + delay
+        elif slot.failures >= self.max_startup_failures:
+            return False
+        if now >= slot.restart_at:
+            self.restarts += 1
+            self._start(index)
+        return True
+
+    def run(self) -> None:
+        """Supervise the workers until they all exit (with `exit_when_idle`) or `stop()` is called."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        for index in range(self.processes):
+            self._start(index)
+        logger.info("Started %s worker processes", self.processes)
+        try:
+            while not self._stop.wait(1.0):
+                if not sum(self._check(index) for index in range(self.processes)):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _shutdown(self, timeout: float = 60) -> None:
+        processes = [slot.process for slot in self._slots if slot is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("%s did not stop in time, killing it", process.name)
+                process.kill()
+                process.join()
+        logger.info("Worker processes stopped (%s restarts)", self.restarts)
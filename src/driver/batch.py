@@ -0,0 +1,190 @@
+from selenium.common.exceptions import WebDriverException
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settle import parse_settle_selector, wait_for_settle
+from . import logger
+
+# Settle strategies that can be awaited inside the page without a WebDriver roundtrip.
+IN_PAGE_SETTLE = ('none', 'dom_quiet', 'element')
+PROGRESS_KEY = '__scrapegoatBatch'
+# Actions that may navigate away from the document unless the step is marked `in_page`.
+NAVIGATING_ACTIONS = ('click', 'USE_SCRIPT')
+
+# Runs a list of steps inside the page: each step is located (polling until its timeout),
+# scrolled into view, acted on, post-actioned and settled. Resolves with a compact status
+# {ok, done, error}, where `done` counts the steps confirmed complete; progress is mirrored to
+# sessionStorage so it survives a navigation.
+BATCH_SCRIPT = """
+const steps = arguments[0], progressKey = arguments[1], done = arguments[arguments.length - 1];
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function locate(by, value) {
+    switch (by) {
+        case 'css selector': return document.querySelector(value);
+        case 'xpath': return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case 'id': return document.getElementById(value);
+        case 'name': return document.getElementsByName(value)[0] || null;
+        case 'class name': return document.getElementsByClassName(value)[0] || null;
+        case 'tag name': return document.getElementsByTagName(value)[0] || null;
+        case 'link text': return Array.from(document.links).find((a) => a.textContent.trim() === value) || null;
+        case 'partial link text': return Array.from(document.links).find((a) => a.textContent.includes(value)) || null;
+    }
+    return null;
+}
+
+async function waitFor(by, value, timeout) {
+    const deadline = performance.now() + timeout;
+    for (;;) {
+        const element = locate(by, value);
+        if (element) return element;
+        if (performance.now() >= deadline) return null;
+        await sleep(50);
+    }
+}
+
+function domQuiet(quiet, timeout) {
+    return new Promise((resolve) => {
+        let quietTimer, limitTimer;
+        const observer = new MutationObserver(() => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(finish, quiet);
+        });
+        function finish() {
+            observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(limitTimer);
+            resolve();
+        }
+        observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+        quietTimer = setTimeout(finish, quiet);
+        limitTimer = setTimeout(finish, timeout);
+    });
+}
+
+let current = 0;
+(async () => {
+    for (let i = 0; i < steps.length; i++) {
+        const step = steps[i];
+        current = i;
+        const element = await waitFor(step.by, step.value, step.timeout);
+        if (!element) {
+            try { sessionStorage.removeItem(progressKey); } catch (e) {}
+            return done({ok: false, done: i, error: 'not_found'});
+        }
+        try { sessionStorage.setItem(progressKey, String(i)); } catch (e) {}
+        element.scrollIntoView();
+        if (step.action === 'click' || step.action === 'USE_SCRIPT') element.click();
+        else if (step.action === 'send_keys') {
+            element.focus();
+            // Through the native setter: frameworks such as React track the value property of
+            // controlled inputs and would discard a plain assignment.
+            const prototype = element instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+                : element instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+            const descriptor = Object.getOwnPropertyDescriptor(prototype, 'value');
+            if (descriptor && descriptor.set) descriptor.set.call(element, step.action_value);
+            else element.value = step.action_value;
+            element.dispatchEvent(new Event('input', {bubbles: true}));
+            element.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+        if (step.post_action === 'submit') {
+            const form = element.form || element.closest('form');
+            if (form) form.requestSubmit ? form.requestSubmit() : form.submit();
+        }
+        if (step.settle === 'dom_quiet') await domQuiet(step.quiet_ms, step.settle_timeout);
+        else if (step.settle === 'element') await waitFor(step.settle_by, step.settle_value, step.settle_timeout);
+    }
+    try { sessionStorage.removeItem(progressKey); } catch (e) {}
+    done({ok: true, done: steps.length, error: null});
+})().catch((error) => {
+    try { sessionStorage.removeItem(progressKey); } catch (e) {}
+    done({ok: false, done: current, error: String(error)});
+});
+"""
+
+
+def ends_batch(element) -> bool:
+    """
+    A step ends its batch when it may navigate away or needs a settle check from outside the page.
+    Any click may navigate unless the step is marked `in_page`.
+    """
+    if element.post_action == 'submit' or element.settle not in IN_PAGE_SETTLE:
+        return True
+    return element.action in NAVIGATING_ACTIONS and not element.in_page
+
+
+def compile_batches(elements: List[Any]) -> List[List[Any]]:
+    """Group consecutive steps into runs that can execute in a single script call."""
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    for element in elements:
+        current.append(element)
+        if ends_batch(element):
+            batches.append(current)
+            current = []
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _compile_step(client, element) -> Dict[str, Any]:
+    step = {
+        'by': element.locator[0],
+        'value': element.locator[1],
+        'action': element.action,
+        'action_value': element.action_value,
+        'post_action': element.post_action,
+        'settle': element.settle,
+        'quiet_ms': element.quiet_ms,
+        'settle_timeout': element.settle_timeout * 1000,
+        'timeout': client.timeout_after * 1000,
+    }
+    if element.settle == 'element':
+        settle_type, settle_value = parse_settle_selector(element.settle_value)
+        step['settle_by'] = client._get_by_selector(settle_type)
+        step['settle_value'] = settle_value
+    return step
+
+
+def run_batch(client, batch: List[Any]) -> Tuple[int, Optional[str]]:
+    """
+    Execute a batch of steps in one `execute_async_script` call.
+    Return how many steps completed and the error that stopped the batch, if any.
+    """
+    steps = [_compile_step(client, element) for element in batch]
+    budget = sum(step['timeout'] + step['settle_timeout'] for step in steps) / 1000 + 5
+    if budget > client.script_timeout:
+        client.driver.set_script_timeout(budget)
+        client.script_timeout = budget
+
+    previous_url = client.driver.current_url if batch[-1].settle == 'url_change' else ''
+    try:
+        status = client.driver.execute_async_script(BATCH_SCRIPT, steps, PROGRESS_KEY)
+    except WebDriverException as e:
+        # The document unloaded mid-script: the last step we started is the one that navigated.
+        started = _read_progress(client)
+        if started is None and ends_batch(batch[-1]):
+            # A cross-origin navigation drops the progress key; only the last step may navigate.
+            started = len(batch) - 1
+        if started is None:
+            return 0, f"batch interrupted at an unknown step: {e.msg}"
+        if started < len(batch) - 1:
+            return started + 1, f"navigation interrupted batch after step {started}: {e.msg}"
+        status = {'ok': True, 'done': len(batch), 'error': None}
+
+    if not status['ok']:
+        return status['done'], status['error']
+    if batch[-1].settle not in IN_PAGE_SETTLE and not wait_for_settle(client, batch[-1], previous_url):
+        last = batch[-1]
+        logger.warning("UIElement %s did not settle (%s) within %ss", last.element_type, last.settle, last.settle_timeout)
+    return len(batch), None
+
+
+def _read_progress(client) -> Optional[int]:
+    try:
+        value = client.driver.execute_script(
+            "const v = sessionStorage.getItem(arguments[0]); sessionStorage.removeItem(arguments[0]); return v;",
+            PROGRESS_KEY,
+        )
+        return int(value) if value is not None else None
+    except (WebDriverException, ValueError):
+        return None
@@ -0,0 +1,169 @@
+from urllib.parse import urlsplit
+from typing import Any, Dict, Iterable, List, Optional
+import fnmatch
+import os
+import threading
+
+RESOURCE_TYPES = ('document', 'stylesheet', 'script', 'image', 'font', 'media', 'xhr', 'other')
+
+# Chrome announces what a request is for in the Sec-Fetch-Dest header.
+FETCH_DEST_TYPES = {
+    'document': 'document', 'iframe': 'document', 'frame': 'document',
+    'style': 'stylesheet', 'script': 'script', 'worker': 'script', 'sharedworker': 'script',
+    'serviceworker': 'script', 'image': 'image', 'font': 'font', 'audio': 'media', 'video': 'media',
+    'track': 'media', 'empty': 'xhr',
+}
+EXTENSION_TYPES = {
+    '.css': 'stylesheet', '.js': 'script', '.mjs': 'script',
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.gif': 'image', '.webp': 'image', '.avif': 'image',
+    '.svg': 'image', '.ico': 'image', '.bmp': 'image',
+    '.woff': 'font', '.woff2': 'font', '.ttf': 'font', '.otf': 'font', '.eot': 'font',
+    '.mp4': 'media', '.webm': 'media', '.mp3': 'media', '.ogg': 'media', '.wav': 'media', '.m3u8': 'media',
+}
+# Rough average transfer sizes, used for resource types whose responses have not been measured yet.
+ESTIMATED_BYTES = {
+    'image': 40_000, 'font': 35_000, 'media': 500_000, 'stylesheet': 25_000,
+    'script': 40_000, 'xhr': 5_000, 'document': 50_000, 'other': 5_000,
+}
+TRACKER_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'facebook.net', 'connect.facebook.net', 'hotjar.com', 'segment.io', 'segment.com', 'mixpanel.com',
+    'newrelic.com', 'nr-data.net', 'scorecardresearch.com', 'criteo.com', 'taboola.com', 'outbrain.com',
+)
+
+
+def _matches_domain(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class ResourcePolicy:
+    """
+    Declarative rules deciding which browser requests are aborted.
+
+    A request is blocked when its resource type, domain or URL glob is on the
+    blocklist (or it goes to a known tracker with `block_trackers`), unless its
+    domain or URL is explicitly allowed. Documents are never blocked by type.
+
+    The bytes saved are an estimate: an aborted request never reports its size,
+    so each one counts as the average size (Content-Length) of the responses of
+    its type that were let through, or as a per-type default until one was seen.
+    """
+
+    def __init__(self, block_types: Iterable[str] = (), block_domains: Iterable[str] = (),
+                 block_urls: Iterable[str] = (), allow_domains: Iterable[str] = (),
+                 allow_urls: Iterable[str] = (), block_trackers: bool = False):
+        self.block_types = {resource_type for resource_type in block_types if resource_type != 'document'}
+        unknown = self.block_types - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {sorted(unknown)}")
+        self.block_domains = tuple(domain.lower() for domain in block_domains)
+        if block_trackers:
+            self.block_domains += TRACKER_DOMAINS
+        self.block_urls = tuple(block_urls)
+        self.allow_domains = tuple(domain.lower() for domain in allow_domains)
+        self.allow_urls = tuple(allow_urls)
+        self.blocked: Dict[str, int] = {}
+        # Resource type -> [responses measured, total bytes]
+        self._measured: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'ResourcePolicy':
+        """Build a policy from a recipe's "blocking" section."""
+        return cls(
+            block_types=spec.get('types', ()),
+            block_domains=spec.get('domains', ()),
+            block_urls=spec.get('urls', ()),
+            allow_domains=spec.get('allow_domains', ()),
+            allow_urls=spec.get('allow_urls', ()),
+            block_trackers=spec.get('trackers', False),
+        )
+
+    @staticmethod
+    def resource_type(request: Any) -> str:
+        """Infer the resource type of a request from Sec-Fetch-Dest, falling back to its extension."""
+        destination = (request.headers.get('Sec-Fetch-Dest') or '').lower()
+        if destination in FETCH_DEST_TYPES:
+            return FETCH_DEST_TYPES[destination]
+        extension = os.path.splitext(urlsplit(request.url).path)[1].lower()
+        return EXTENSION_TYPES.get(extension, 'other')
+
+    def _is_allowed(self, host: str, url: str) -> bool:
+        return _matches_domain(host, self.allow_domains) or any(fnmatch.fnmatchcase(url, glob) for glob in self.allow_urls)
+
+    def should_block(self, request: Any) -> Optional[str]:
+        """Return the resource type if `request` must be blocked, otherwise None."""
+        url = request.url
+        host = (urlsplit(url).hostname or '').lower()
+        if self._is_allowed(host, url):
+            return None
+        resource_type = self.resource_type(request)
+        if (resource_type in self.block_types
+                or _matches_domain(host, self.block_domains)
+                or any(fnmatch.fnmatchcase(url, glob) for glob in self.block_urls)):
+            return resource_type
+        return None
+
+    def record_block(self, resource_type: str) -> None:
+        with self._lock:
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+
+    def record_response(self, request: Any, response: Any) -> None:
+        """Measure a response that was let through (selenium-wire), to size the blocked requests of its type."""
+        length = response.headers.get('Content-Length')
+        try:
+            size = int(length) if length is not None else len(response.body or b'')
+        except ValueError:
+            return
+        resource_type = self.resource_type(request)
+        with self._lock:
+            measured = self._measured.setdefault(resource_type, [0, 0])
+            measured[0] += 1
+            measured[1] += size
+
+    def _average_bytes(self, resource_type: str) -> float:
+        measured = self._measured.get(resource_type)
+        if measured:
+            return measured[1] / measured[0]
+        return ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES['other'])
+
+    @property
+    def estimated_bytes_saved(self) -> int:
+        return self.stats()['estimated_bytes_saved']
+
+    def intercept(self, request: Any) -> bool:
+        """Abort `request` (selenium-wire) if the policy blocks it. Return True if it was aborted."""
+        resource_type = self.should_block(request)
+        if resource_type is None:
+            return False
+        request.abort()
+        self.record_block(resource_type)
+        return True
+
+    def cdp_url_patterns(self) -> List[str]:
+        """
+        URL patterns for DevTools `Network.setBlockedURLs`, used when requests cannot be
+        intercepted. DevTools has no allowlist and no request counters, so those are not applied.
+        Patterns match the whole URL, so extensions are also matched before a query string.
+        """
+        extensions = [extension for extension, resource_type in EXTENSION_TYPES.items() if resource_type in self.block_types]
+        patterns = [pattern for extension in extensions for pattern in (f"*{extension}", f"*{extension}?*")]
+        patterns += [f"*://{domain}/*" for domain in self.block_domains]
+        patterns += [f"*.{domain}/*" for domain in self.block_domains]
+        patterns += list(self.block_urls)
+        return patterns
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Blocked request counts, and the bytes they would have cost as an estimate (see the
+        class docstring). `measured_types` lists the blocked types sized from real responses.
+        """
+        with self._lock:
+            return {
+                'blocked': dict(self.blocked),
+                'blocked_total': sum(self.blocked.values()),
+                'estimated_bytes_saved': round(sum(count * self._average_bytes(resource_type)
+                                                   for resource_type, count in self.blocked.items())),
+                'measured_types': sorted(resource_type for resource_type in self.blocked
+                                         if resource_type in self._measured),
+            }
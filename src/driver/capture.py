@@ -0,0 +1,154 @@
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+import base64
+import json
+import os
+import re
+import threading
+import time
+
+from . import logger
+
+TEXT_CONTENT_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', '+json', '+xml')
+
+
+class CaptureFilter:
+    """Decides which request/response pairs are worth keeping."""
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None,
+                 content_types: Optional[Iterable[str]] = None, methods: Optional[Iterable[str]] = None):
+        self.include = [re.compile(pattern) for pattern in include or []]
+        self.exclude = [re.compile(pattern) for pattern in exclude or []]
+        self.content_types = tuple(content_type.lower() for content_type in content_types or [])
+        self.methods = {method.upper() for method in methods or []}
+
+    def matches_request(self, method: str, url: str) -> bool:
+        """Cheap pre-check on the request line, before any response data is touched."""
+        if self.methods and method.upper() not in self.methods:
+            return False
+        if self.include and not any(pattern.search(url) for pattern in self.include):
+            return False
+        return not any(pattern.search(url) for pattern in self.exclude)
+
+    def matches_content_type(self, content_type: str) -> bool:
+        return not self.content_types or content_type.lower().startswith(self.content_types)
+
+
+class CapturedExchange:
+    """Metadata (and optionally a capped body) of one request/response pair."""
+
+    __slots__ = ('timestamp', 'method', 'url', 'status', 'content_type', 'size',
+                 'request_headers', 'response_headers', 'body', 'body_encoding', 'truncated')
+
+    def __init__(self, request: Any, response: Any, capture_body: bool, max_body_bytes: int):
+        self.timestamp = time.time()
+        self.method = request.method
+        self.url = request.url
+        self.status = response.status_code
+        self.content_type = response.headers.get('Content-Type', '') or ''
+        self.request_headers = dict(request.headers)
+        self.response_headers = dict(response.headers)
+        self.body: Optional[str] = None
+        self.body_encoding: Optional[str] = None
+        self.truncated = False
+        body = response.body or b''
+        self.size = len(body)
+        if capture_body and body:
+            self._capture_body(body, response.headers.get('Content-Encoding', 'identity'), max_body_bytes)
+
+    def _capture_body(self, body: bytes, encoding: str, max_body_bytes: int) -> None:
+        try:
+            from seleniumwire.utils import decode
+            body = decode(body, encoding)
+        except Exception:
+            pass
+        if len(body) > max_body_bytes:
+            body = body[:max_body_bytes]
+            self.truncated = True
+        if any(marker in self.content_type.lower() for marker in TEXT_CONTENT_TYPES):
+            self.body = body.decode('utf-8', errors='replace')
+            self.body_encoding = 'utf-8'
+        else:
+            self.body = base64.b64encode(body).decode('ascii')
+            self.body_encoding = 'base64'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class NetworkCapture:
+    """
+    Bounded buffer of captured network traffic.
+
+    Keeps at most `capacity` exchanges in memory. When the buffer is full it is
+    flushed to `spill_path` as NDJSON if one is configured; otherwise the oldest
+    exchanges are dropped, ring-buffer style. Bodies are only kept when
+    `capture_bodies` is set and are capped at `max_body_bytes`.
+    """
+
+    def __init__(self, capacity: int = 1000, capture_filter: Optional[CaptureFilter] = None,
+                 capture_bodies: bool = False, max_body_bytes: int = 1024 * 1024, spill_path: Optional[str] = None):
+        self.capacity = capacity
+        self.filter = capture_filter or CaptureFilter()
+        self.capture_bodies = capture_bodies
+        self.max_body_bytes = max_body_bytes
+        self.spill_path = spill_path
+        self.captured = 0
+        self.dropped = 0
+        self.spilled = 0
+        self._buffer: Deque[CapturedExchange] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def record(self, request: Any, response: Any) -> bool:
+        """Store an exchange if it passes the filter. Return True if it was captured."""
+        if not self.filter.matches_request(request.method, request.url):
+            return False
+        if not self.filter.matches_content_type(response.headers.get('Content-Type', '') or ''):
+            return False
+        exchange = CapturedExchange(request, response, self.capture_bodies, self.max_body_bytes)
+        with self._lock:
+            if len(self._buffer) == self.capacity:
+                if self.spill_path:
+                    self._spill()
+                else:
+                    self.dropped += 1
+            self._buffer.append(exchange)
+            self.captured += 1
+        return True
+
+    def _spill(self) -> None:
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as file:
+                file.write(''.join(json.dumps(exchange.to_dict()) + '\n' for exchange in self._buffer))
+            self.spilled += len(self._buffer)
+        except OSError as e:
+            logger.error("Failed to spill network capture to %s: %s", self.spill_path, e)
+            self.dropped += len(self._buffer)
+        self._buffer.clear()
+
+    def flush(self) -> None:
+        """Write everything still buffered to the spill file."""
+        with self._lock:
+            if self.spill_path and self._buffer:
+                self._spill()
+
+    def drain(self) -> List[CapturedExchange]:
+        """Return and remove every buffered exchange."""
+        with self._lock:
+            exchanges = list(self._buffer)
+            self._buffer.clear()
+            return exchanges
+
+    def snapshot(self) -> List[CapturedExchange]:
+        """Return the buffered exchanges without removing them."""
+        with self._lock:
+            return list(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def stats(self) -> Dict[str, int]:
+        return {'captured': self.captured, 'buffered': len(self._buffer), 'spilled': self.spilled, 'dropped': self.dropped}
@@ -0,0 +1,89 @@
+from collections import deque
+from typing import Any, Callable, Deque, Optional, Pattern, Tuple, Union
+import asyncio
+import itertools
+import re
+import threading
+import time
+
+RequestPredicate = Callable[[Any], bool]
+
+
+class RequestWaiter:
+    """
+    Wakes up threads waiting for intercepted HTTP requests.
+
+    The interceptor thread calls `notify()` for every request; callers block in
+    `wait_for()` until a request matching a URL pattern, method and/or predicate
+    shows up, instead of sleep-polling. A short history is kept so a request that
+    fires between `mark()` and `wait_for()` is not missed.
+    """
+
+    def __init__(self, history: int = 256):
+        self._history: Deque[Tuple[int, Any]] = deque(maxlen=history)
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last(self) -> Optional[Any]:
+        with self._condition:
+            return self._history[-1][1] if self._history else None
+
+    def notify(self, request: Any) -> None:
+        """Record an intercepted request and wake every waiter."""
+        with self._condition:
+            self._last_sequence = next(self._sequence)
+            self._history.append((self._last_sequence, request))
+            self._condition.notify_all()
+
+    def mark(self) -> int:
+        """Return a marker; `wait_for(since=marker)` only matches requests seen after it."""
+        with self._condition:
+            return self._last_sequence
+
+    @staticmethod
+    def _build_predicate(url: Union[str, Pattern, None], method: Optional[str],
+                         predicate: Optional[RequestPredicate]) -> RequestPredicate:
+        pattern = re.compile(url) if isinstance(url, str) else url
+        method = method.upper() if method else None
+
+        def matches(request: Any) -> bool:
+            if method and request.method.upper() != method:
+                return False
+            if pattern and not pattern.search(request.url):
+                return False
+            return predicate(request) if predicate else True
+
+        return matches
+
+    def wait_for(self, url: Union[str, Pattern, None] = None, method: Optional[str] = None,
+                 predicate: Optional[RequestPredicate] = None, since: Optional[int] = None,
+                 timeout: float = 10) -> Optional[Any]:
+        """
+        Block until a request matching `url` (regex), `method` and `predicate` is intercepted.
+        Return the request, or None if nothing matched within `timeout` seconds.
+        """
+        matches = self._build_predicate(url, method, predicate)
+        cursor = self.mark() if since is None else since
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                for sequence, request in self._history:
+                    if sequence > cursor and matches(request):
+                        return request
+                if self._history:
+                    cursor = max(cursor, self._history[-1][0])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    async def wait_for_async(self, url: Union[str, Pattern, None] = None, method: Optional[str] = None,
+                             predicate: Optional[RequestPredicate] = None, since: Optional[int] = None,
+                             timeout: float = 10) -> Optional[Any]:
+        """Awaitable variant of `wait_for()` for asyncio callers."""
+        if since is None:
+            since = self.mark()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.wait_for(url, method, predicate, since, timeout))
@@ -0,0 +1,288 @@
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+import re
+
+from utils.markup import parse_html, select
+from .schema import SELECTOR_MAP, parse_settle_selector
+
+# Transforms applied, in order, to every extracted value ("name" or "name:argument").
+TRANSFORMS = ('strip', 'lower', 'upper', 'number', 'int', 'absolute_url', 'regex')
+NUMBER = re.compile(r'-?\d[\d.,\s ]*')
+WHITESPACE = re.compile(r'\s+')
+# Regex syntax that Python's re accepts but JavaScript's RegExp does not (or reads differently):
+# named groups and backreferences in the (?P...) form, comments, inline flags, conditionals,
+# atomic groups, possessive quantifiers and the \A, \Z, \z anchors. Escapes and character
+# classes are matched first so that their contents are skipped.
+PYTHON_ONLY_REGEX = re.compile(r'\\.|\[(?:\\.|[^\]])*\]|\(\?P[<=]|\(\?#|\(\?[aiLmsux-]+[:)]|\(\?\(|\(\?>|[*+?}]\+')
+
+# Evaluates a compiled spec against the live DOM and returns the records as one JSON array.
+# Must stay in sync with the Python evaluation in extract_from_tree().
+EXTRACT_SCRIPT = """
+const spec = arguments[0];
+
+function locateAll(root, by, value) {
+    switch (by) {
+        case 'css selector': return Array.from(root.querySelectorAll(value));
+        case 'xpath': {
+            const result = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+            return nodes;
+        }
+        case 'id': return Array.from(root.querySelectorAll('#' + CSS.escape(value)));
+        case 'name': return Array.from(root.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+        case 'class name': return Array.from(root.querySelectorAll('.' + CSS.escape(value)));
+        case 'tag name': return Array.from(root.querySelectorAll(value));
+        case 'link text': return Array.from(root.querySelectorAll('a')).filter((a) => a.textContent.trim() === value);
+        case 'partial link text': return Array.from(root.querySelectorAll('a')).filter((a) => a.textContent.includes(value));
+    }
+    return [];
+}
+
+function toNumber(value) {
+    const match = value.match(/-?\\d[\\d.,\\s\\u00a0]*/);
+    if (!match) return null;
+    let text = match[0].replace(/[\\s\\u00a0]/g, '').replace(/[.,]+$/, '');
+    const comma = text.lastIndexOf(','), dot = text.lastIndexOf('.');
+    let decimal = null;
+    if (comma >= 0 && dot >= 0) decimal = comma > dot ? ',' : '.';
+    else if (comma >= 0) decimal = (text.split(',').length === 2 && text.length - comma - 1 !== 3) ? ',' : null;
+    else if (dot >= 0) decimal = text.split('.').length === 2 ? '.' : null;
+    const thousands = decimal === ',' ? '.' : (decimal === '.' ? ',' : /[.,]/g);
+    text = text.split(thousands).join('');
+    if (decimal === ',') text = text.replace(',', '.');
+    const number = parseFloat(text);
+    return Number.isNaN(number) ? null : number;
+}
+
+function transform(value, name, argument) {
+    if (value === null || value === undefined) return null;
+    value = String(value);
+    switch (name) {
+        case 'strip': return value.replace(/\\s+/g, ' ').trim();
+        case 'lower': return value.toLowerCase();
+        case 'upper': return value.toUpperCase();
+        case 'number': return toNumber(value);
+        case 'int': { const number = toNumber(value); return number === null ? null : Math.trunc(number); }
+        case 'absolute_url': try { return new URL(value, document.baseURI).href; } catch (e) { return value; }
+        case 'regex': {
+            const match = value.match(new RegExp(argument));
+            return match ? (match.length > 1 ? match[1] : match[0]) : null;
+        }
+    }
+    return value;
+}
+
+function read(element, field) {
+    let value = field.attribute ? element.getAttribute(field.attribute) : element.textContent;
+    if (!field.attribute && value !== null) value = value.replace(/\\s+/g, ' ').trim();
+    for (const [name, argument] of field.transforms) value = transform(value, name, argument);
+    return value;
+}
+
+function record(root) {
+    const result = {};
+    for (const field of spec.fields) {
+        const elements = field.by ? locateAll(root, field.by, field.value) : [root];
+        if (field.all) result[field.name] = elements.map((element) => read(element, field));
+        else result[field.name] = elements.length ? read(elements[0], field) : null;
+    }
+    return result;
+}
+
+let rows = spec.rows ? locateAll(document, spec.rows[0], spec.rows[1]) : [document.documentElement];
+if (spec.limit) rows = rows.slice(0, spec.limit);
+return rows.map(record);
+"""
+
+
+class ExtractionError(ValueError):
+    """Raised when an extraction spec is malformed."""
+
+
+def _locator(selector: str, path: str) -> List[str]:
+    """Resolve a "type:value" selector to a Selenium-style [By, value] locator."""
+    selector_type, value = parse_settle_selector(selector)
+    if selector_type.lower() not in SELECTOR_MAP:
+        raise ExtractionError(f"{path}: unsupported selector type '{selector_type}'")
+    return [SELECTOR_MAP[selector_type.lower()], value]
+
+
+def _python_only_syntax(pattern: str) -> Optional[str]:
+    """Return the first construct of `pattern` that JavaScript's RegExp would reject or read differently."""
+    for match in PYTHON_ONLY_REGEX.finditer(pattern):
+        token = match.group()
+        if token[0] == '[' or (token[0] == '\\' and token not in ('\\A', '\\Z', '\\z')):
+            continue
+        return token
+    return None
+
+
+def _to_number(value: str) -> Optional[float]:
+    match = NUMBER.search(value)
+    if not match:
+        return None
+    text = re.sub(r'[\s ]', '', match.group()).rstrip('.,')
+    comma, dot = text.rfind(','), text.rfind('.')
+    decimal = None
+    if comma >= 0 and dot >= 0:
+        decimal = ',' if comma > dot else '.'
+    elif comma >= 0:
+        decimal = ',' if text.count(',') == 1 and len(text) - comma - 1 != 3 else None
+    elif dot >= 0:
+        decimal = '.' if text.count('.') == 1 else None
+    if decimal is None:
+        text = text.replace(',', '').replace('.', '')
+    else:
+        text = text.replace('.' if decimal == ',' else ',', '').replace(decimal, '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def apply_transform(value: Any, name: str, argument: str = '', base_url: str = '') -> Any:
+    """Python counterpart of the in-page transforms, used for static and replayed pages."""
+    if value is None:
+        return None
+    value = str(value)
+    if name == 'strip':
+        return WHITESPACE.sub(' ', value).strip()
+    if name == 'lower':
+        return value.lower()
+    if name == 'upper':
+        return value.upper()
+    if name == 'number':
+        return _to_number(value)
+    if name == 'int':
+        number = _to_number(value)
+        return None if number is None else int(number)
+    if name == 'absolute_url':
+        return urljoin(base_url, value)
+    if name == 'regex':
+        match = re.search(argument, value)
+        return (match.group(1) if match.groups() else match.group(0)) if match else None
+    return value
+
+
+class ExtractionSpec:
+    """
+    A declarative description of the records to pull out of a page.
+
+    `rows` is an optional "type:value" selector (e.g. "css:.product") of the record
+    containers; without it the whole page yields one record. Each field is either a
+    selector string, whose text is extracted, or an object with:
+
+        selector    "type:value" relative to the row (default: the row itself)
+        attribute   attribute to read instead of the text
+        all         extract a list of every match instead of the first one
+        transform   a transform or list of transforms from TRANSFORMS,
+                    e.g. ["number"] or "regex:SKU-(\\d+)"
+
+    Missing elements yield None. `limit` caps the number of rows.
+    """
+
+    __slots__ = ('rows', 'fields', 'limit')
+
+    def __init__(self, rows: Optional[str], fields: Dict[str, Any], limit: Optional[int] = None):
+        self.rows = _locator(rows, 'rows') if rows else None
+        self.fields = [self._compile_field(name, field) for name, field in fields.items()]
+        self.limit = limit
+
+    @classmethod
+    def from_dict(cls, spec: Any, path: str = 'extract') -> 'ExtractionSpec':
+        if not isinstance(spec, dict):
+            raise ExtractionError(f"{path}: expected an object")
+        unknown = set(spec) - {'rows', 'fields', 'limit'}
+        if unknown:
+            raise ExtractionError(f"{path}: unknown fields {sorted(unknown)}")
+        if not isinstance(spec.get('fields'), dict) or not spec['fields']:
+            raise ExtractionError(f"{path}.fields: expected a non-empty object")
+        if 'rows' in spec and not isinstance(spec['rows'], str):
+            raise ExtractionError(f"{path}.rows: expected str")
+        limit = spec.get('limit')
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+            raise ExtractionError(f"{path}.limit: expected a positive int")
+        try:
+            return cls(spec.get('rows'), spec['fields'], limit)
+        except ExtractionError as e:
+            raise ExtractionError(f"{path}.{e}")
+
+    @staticmethod
+    def _compile_field(name: str, field: Any) -> Dict[str, Any]:
+        path = f"fields.{name}"
+        if isinstance(field, str):
+            field = {'selector': field}
+        if not isinstance(field, dict):
+            raise ExtractionError(f"{path}: expected a selector string or an object")
+        unknown = set(field) - {'selector', 'attribute', 'all', 'transform'}
+        if unknown:
+            raise ExtractionError(f"{path}: unknown fields {sorted(unknown)}")
+        by = value = None
+        if field.get('selector'):
+            by, value = _locator(field['selector'], f"{path}.selector")
+        transforms = field.get('transform', [])
+        if isinstance(transforms, str):
+            transforms = [transforms]
+        compiled_transforms = []
+        for transform in transforms:
+            transform_name, _, argument = str(transform).partition(':')
+            if transform_name not in TRANSFORMS:
+                raise ExtractionError(f"{path}.transform: unknown transform '{transform_name}'")
+            if transform_name == 'regex':
+                try:
+                    re.compile(argument)
+                except re.error as e:
+                    raise ExtractionError(f"{path}.transform: invalid regex: {e}")
+                unsupported = _python_only_syntax(argument)
+                if unsupported:
+                    raise ExtractionError(f"{path}.transform: regex syntax '{unsupported}' is not supported in the browser")
+            compiled_transforms.append([transform_name, argument])
+        return {
+            'name': name, 'by': by, 'value': value, 'attribute': field.get('attribute'),
+            'all': bool(field.get('all', False)), 'transforms': compiled_transforms,
+        }
+
+    def to_script_argument(self) -> Dict[str, Any]:
+        return {'rows': self.rows, 'fields': self.fields, 'limit': self.limit}
+
+
+def extract(driver: Any, spec: ExtractionSpec) -> List[Dict[str, Any]]:
+    """Evaluate `spec` in the current page with a single WebDriver roundtrip."""
+    return driver.execute_script(EXTRACT_SCRIPT, spec.to_script_argument()) or []
+
+
+def _read(element: Any, field: Dict[str, Any], base_url: str) -> Any:
+    if field['attribute']:
+        value = element.get(field['attribute'])
+    else:
+        value = WHITESPACE.sub(' ', element.text_content()).strip()
+    for name, argument in field['transforms']:
+        value = apply_transform(value, name, argument, base_url)
+    return value
+
+
+def extract_from_tree(tree: Any, spec: ExtractionSpec, base_url: str = '') -> List[Dict[str, Any]]:
+    """Evaluate `spec` against a parsed lxml tree, mirroring EXTRACT_SCRIPT."""
+    if spec.rows:
+        rows = select(tree, *spec.rows)
+    else:
+        rows = [tree]
+    if spec.limit:
+        rows = rows[:spec.limit]
+    records = []
+    for row in rows:
+        record = {}
+        for field in spec.fields:
+            elements = select(row, field['by'], field['value']) if field['by'] else [row]
+            if field['all']:
+                record[field['name']] = [_read(element, field, base_url) for element in elements]
+            else:
+                record[field['name']] = _read(elements[0], field, base_url) if elements else None
+        records.append(record)
+    return records
+
+
+def extract_from_html(html: str, spec: ExtractionSpec, base_url: str = '') -> List[Dict[str, Any]]:
+    """Evaluate `spec` against raw HTML. Raises ImportError when lxml is not installed."""
+    return extract_from_tree(parse_html(html), spec, base_url)
@@ -0,0 +1,221 @@
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+import requests
+import threading
+import time
+
+from storage.fingerprints import FingerprintIndex, content_hash
+from utils.markup import has_element
+from .netcache import NetworkCache
+from .schema import FETCH_MODES, parse_settle_selector, resolve_selector
+from . import logger
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REPLAYED_REDIRECTS = 10
+
+
+class StaticPage:
+    """
+    A page served over plain HTTP instead of the browser. `unchanged` is set when
+    the fingerprint index shows it was already processed in this state (a 304
+    answer to a conditional request has an empty `html`).
+    """
+
+    __slots__ = ('url', 'status', 'headers', 'html', 'elapsed', 'content_hash', 'unchanged')
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], html: str, elapsed: float,
+                 content_hash: Optional[str] = None, unchanged: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.html = html
+        self.elapsed = elapsed
+        self.content_hash = content_hash
+        self.unchanged = unchanged
+
+
+class StaticFetcher:
+    """
+    Keep-alive HTTP fetcher for pages that do not need JavaScript.
+
+    Shares the user agent and cookies of a BrowserClient so requests look like
+    they come from the same session. A page is accepted only if every expected
+    selector is present in the raw HTML; otherwise the caller falls back to the
+    browser. In "auto" mode the outcome is remembered per host and recipe, so
+    pages that turn out to need JavaScript are not probed again. With a
+    FingerprintIndex, requests are conditional and unchanged pages are flagged.
+    With a NetworkCache, pages are recorded and replayed like browser traffic.
+    """
+
+    def __init__(self, client=None, user_agent: Optional[str] = None, pool_size: int = 10, timeout: float = 15,
+                 fingerprints: Optional[FingerprintIndex] = None, network_cache: Optional[NetworkCache] = None):
+        self.client = client
+        self.timeout = timeout
+        self.fingerprints = fingerprints
+        self.network_cache = network_cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self._probes: Dict[Tuple[str, str], bool] = {}
+        self._synced_epoch = -1
+        self._lock = threading.Lock()
+
+    def sync_from_driver(self, force: bool = False) -> None:
+        """Copy the browser's cookies into the session (only when they may have changed since the last sync)."""
+        client = self.client
+        if not client or not client.driver:
+            return
+        if not force and client.cookie_epoch == self._synced_epoch:
+            return
+        for cookie in client.driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self._synced_epoch = client.cookie_epoch
+
+    def fetch(self, url: str, scope: str = '') -> Optional[StaticPage]:
+        """
+        GET `url` over the pooled session. Return None on network errors or non-HTML responses.
+        `scope` selects the fingerprints used for conditional requests (see FingerprintIndex).
+        """
+        cache = self.network_cache
+        if cache and cache.mode != 'record':
+            recorded = cache.lookup('GET', url)
+            if recorded is not None:
+                return self._replayed_page(url, recorded, scope)
+            if cache.mode == 'replay' and not cache.passthrough:
+                logger.debug("Static fetch of %s not recorded", url, url=url)
+                return None
+        self.sync_from_driver()
+        fingerprint = self.fingerprints.get(url, scope) if self.fingerprints else None
+        # A recorded 304 could not be replayed later, so recording always asks for the full page.
+        headers = fingerprint.conditional_headers() if fingerprint and not (cache and cache.records) else {}
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug("Static fetch of %s failed: %s", url, e, url=url)
+            return None
+        if cache and cache.records:
+            # Every hop is stored under the URL it answered, so replay follows the same redirects.
+            for hop in response.history + [response]:
+                # requests has already decoded the body, so the encoding headers no longer apply.
+                cache.store('GET', hop.url, None, hop.status_code, hop.reason or '',
+                            [(name, value) for name, value in hop.headers.items()
+                             if name.lower() not in ('content-encoding', 'content-length')],
+                            hop.content, list(hop.request.headers.items()))
+        if response.status_code == 304 and fingerprint:
+            self.fingerprints.touch(url, scope)
+            return StaticPage(url, 304, dict(response.headers), '', time.monotonic() - started,
+                              fingerprint.content_hash, unchanged=True)
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code >= 400 or 'html' not in content_type:
+            logger.debug("Static fetch of %s unusable: HTTP %s %s", url, response.status_code, content_type, url=url)
+            return None
+        html = response.text
+        page_hash = content_hash(html) if self.fingerprints else None
+        unchanged = bool(fingerprint and page_hash == fingerprint.content_hash)
+        if unchanged:
+            self.fingerprints.touch(url, scope)
+        return StaticPage(response.url, response.status_code, dict(response.headers), html, time.monotonic() - started,
+                          page_hash, unchanged=unchanged)
+
+    def _replayed_page(self, url: str, recorded, scope: str = '') -> Optional[StaticPage]:
+        final_url = url
+        for _ in range(MAX_REPLAYED_REDIRECTS):
+            location = recorded.header('Location') if recorded.status in REDIRECT_STATUSES else ''
+            if not location:
+                break
+            final_url = urljoin(final_url, location)
+            recorded = self.network_cache.lookup('GET', final_url)
+            if recorded is None:
+                logger.debug("Redirect target %s of %s not recorded", final_url, url, url=url)
+                return None
+        content_type = recorded.header('Content-Type')
+        if recorded.status >= 400 or 'html' not in content_type:
+            return None
+        html = self.network_cache.text(recorded)
+        fingerprint = self.fingerprints.get(url, scope) if self.fingerprints else None
+        page_hash = content_hash(html) if self.fingerprints else None
+        unchanged = bool(fingerprint and page_hash == fingerprint.content_hash)
+        if unchanged:
+            self.fingerprints.touch(url, scope)
+        return StaticPage(final_url, recorded.status, dict(recorded.headers), html, 0.0, page_hash, unchanged=unchanged)
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[StaticPage]:
+        """HEAD `url`, following redirects, and return the answer as a body-less StaticPage (None on errors)."""
+        self.sync_from_driver()
+        started = time.monotonic()
+        try:
+            response = self.session.head(url, headers=headers or {}, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            logger.debug("HEAD request for %s failed: %s", url, e, url=url)
+            return None
+        if response.status_code >= 400:
+            return None
+        return StaticPage(response.url, response.status_code, dict(response.headers), '', time.monotonic() - started)
+
+    def revalidate(self, url: str, scope: str = '') -> Optional[StaticPage]:
+        """
+        Ask the server with a conditional HEAD request whether `url` changed since it
+        was last processed in `scope`. Return a 304 StaticPage (`unchanged`) if it did
+        not, and None otherwise. Nothing is sent when no ETag or Last-Modified is
+        stored, e.g. on the first run or for servers that send neither.
+        """
+        if not self.fingerprints or (self.network_cache and self.network_cache.mode != 'record'):
+            # Replayed pages are compared by content hash in fetch() instead.
+            return None
+        headers = self.fingerprints.conditional_headers(url, scope)
+        if not headers:
+            return None
+        page = self.head(url, headers)
+        if page is None or page.status != 304:
+            return None
+        self.fingerprints.touch(url, scope)
+        page.url = url
+        page.unchanged = True
+        return page
+
+    @staticmethod
+    def has_expected(html: str, expect: Iterable[str]) -> bool:
+        """Check that every "type:value" selector in `expect` is present in `html`."""
+        for selector in expect:
+            selector_type, selector_value = parse_settle_selector(selector)
+            if not has_element(html, resolve_selector(selector_type), selector_value):
+                return False
+        return True
+
+    def get(self, url: str, expect: Iterable[str] = (), mode: str = 'auto', key: str = '',
+            scope: str = '') -> Optional[StaticPage]:
+        """
+        Try to serve `url` without the browser according to `mode`.
+        Return the page, or None when the browser has to be used instead.
+        """
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{mode}'")
+        if mode == 'browser':
+            return None
+        probe_key = (urlsplit(url).netloc, key)
+        if mode == 'auto' and self._probes.get(probe_key) is False:
+            return None
+
+        page = self.fetch(url, scope)
+        if page is not None and page.unchanged:
+            # Only processed pages are fingerprinted, so this one passed before.
+            return page
+        if page is None:
+            # Network errors and unusable responses say nothing about whether the pages need JavaScript.
+            return None
+        usable = self.has_expected(page.html, expect)
+        if mode == 'auto':
+            with self._lock:
+                if probe_key not in self._probes:
+                    logger.info("Pages of %s (%s) are %s", probe_key[0], key or 'any recipe',
+                                'static' if usable else 'dynamic')
+                self._probes[probe_key] = usable
+        return page if usable else None
+
+    def close(self) -> None:
+        self.session.close()
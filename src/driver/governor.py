@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Set, Tuple
+import threading
+import time
+
+import psutil
+
+from .pool import BrowserPool
+from .selenium import BrowserClient
+from . import logger
+
+BROWSER_PROCESS_NAMES = ('chromedriver', 'chrome', 'chromium')
+ORPHAN_GRACE_SECONDS = 60
+
+
+class ResourceGovernor:
+    """
+    Background watchdog for a BrowserPool.
+
+    Every `interval` seconds it samples the unique memory (USS) of each pooled
+    browser's process tree, recycles browsers above `per_browser_mb` (at once when
+    idle, after their lease when busy), kills idle browsers whose liveness probe
+    does not answer within `probe_timeout`, reaps orphaned chromedriver/Chrome
+    processes and scales the pool between `min_size` and `max_size` to keep the
+    total under `global_mb`.
+    Idle browsers are leased from the pool while they are probed, and only processes
+    once seen in a pooled browser's tree are ever reaped.
+    """
+
+    def __init__(self, pool: BrowserPool, per_browser_mb: Optional[float] = None, global_mb: Optional[float] = None,
+                 interval: float = 5, probe_timeout: float = 10, min_size: int = 1, max_size: Optional[int] = None):
+        self.pool = pool
+        self.per_browser_mb = per_browser_mb
+        self.global_mb = global_mb
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.min_size = min_size
+        self.max_size = max_size or pool.size
+        self.last_usage: Dict[BrowserClient, float] = {}
+        # pid -> (create time, last time it was part of a pooled browser)
+        self._owned: Dict[int, Tuple[float, float]] = {}
+        self._probe_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="governor-probe")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="resource-governor", daemon=True)
+        self._thread.start()
+        logger.info("Resource governor started (per browser %s MB, global %s MB)", self.per_browser_mb, self.global_mb)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._probe_executor.shutdown(wait=False)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("Resource governor tick failed: %s", e)
+
+    def tick(self) -> None:
+        """Run one sampling and enforcement round."""
+        usage: Dict[BrowserClient, float] = {}
+        known_pids: Set[int] = set()
+        now = time.time()
+        for client, leased in self.pool.clients():
+            for process in client.get_process_tree():
+                try:
+                    self._owned[process.pid] = (process.create_time(), now)
+                except psutil.Error:
+                    continue
+                known_pids.add(process.pid)
+            usage[client] = client.get_memory_usage()
+
+            if self.per_browser_mb and usage[client] > self.per_browser_mb:
+                logger.warning("Browser uses %.0f MB (budget %s MB), recycling it", usage[client], self.per_browser_mb)
+                self.pool.request_recycle(client)
+            elif not leased and self.pool.acquire_idle(client):
+                # Leased for the probe, so no worker can pick up the browser while it is checked or killed.
+                if self._responds(client):
+                    # Not probed again: a browser that hangs now must not block the governor thread.
+                    self.pool.release(client, probe=False)
+                else:
+                    logger.warning("Browser did not answer within %ss, killing it", self.probe_timeout)
+                    client.kill()
+                    self.pool.replace(client)
+
+        self.last_usage = usage
+        self._reap_orphans(known_pids)
+        self._autoscale(usage)
+
+    def _responds(self, client: BrowserClient) -> bool:
+        future = self._probe_executor.submit(client.is_alive)
+        try:
+            return future.result(timeout=self.probe_timeout)
+        except FutureTimeoutError:
+            return False
+
+    def _reap_orphans(self, known_pids: Set[int]) -> None:
+        """Kill processes of this pool's browsers that no pooled client has owned for ORPHAN_GRACE_SECONDS."""
+        now = time.time()
+        for pid, (created, last_seen) in list(self._owned.items()):
+            if pid in known_pids:
+                continue
+            if now - last_seen < ORPHAN_GRACE_SECONDS:
+                # Browsers being closed by the pool get the grace period to exit on their own.
+                continue
+            del self._owned[pid]
+            try:
+                process = psutil.Process(pid)
+                if process.create_time() != created:
+                    # The pid has been reused by an unrelated process.
+                    continue
+                name = process.name().lower()
+                if not any(browser_name in name for browser_name in BROWSER_PROCESS_NAMES):
+                    continue
+                logger.warning("Reaping orphaned process %s (%s)", pid, name)
+                process.kill()
+                process.wait(timeout=1)
+            except (psutil.Error, psutil.TimeoutExpired):
+                continue
+
+    def _autoscale(self, usage: Dict[BrowserClient, float]) -> None:
+        if not self.global_mb or not usage:
+            return
+        total = sum(usage.values())
+        average = total / len(usage)
+        size = self.pool.size
+        if total > self.global_mb and size > self.min_size:
+            logger.warning("Browsers use %.0f MB of the %s MB budget, scaling down", total, self.global_mb)
+            self.pool.resize(size - 1)
+        elif total + average < self.global_mb * 0.8 and size < self.max_size:
+            self.pool.resize(size + 1)
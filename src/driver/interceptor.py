@@ -1,6 +1,9 @@
 from seleniumwire import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
+from webdriver_manager.chrome import ChromeDriverManager
+from .events import RequestWaiter
+from . import logger
 
 class SeleniumClientWithInterception:
     def __init__(self, headless=False):
@@ -10,9 +13,11 @@ class SeleniumClientWithInterception:
         self.options.add_argument('--disable-infobars')
         self.options.add_argument('--disable-extensions')
         self.options.add_argument('--start-maximized')
+        # Created before the interceptor is installed: it runs on proxy threads as soon as Chrome starts.
+        self.last_request = None
+        self.requests = RequestWaiter()
         self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
         self.driver.request_interceptor = self._intercept_request
-        self.last_request = None
 
     def close(self):
         """Close the browser and clean up."""
@@ -28,29 +33,25 @@ class SeleniumClientWithInterception:
         element.click()
 
     def _intercept_request(self, request):
-        """Intercept the HTTP request and store it."""
+        """Intercept the HTTP request, store it and wake up any waiters."""
         self.last_request = request
-        print(f"Intercepted request: {request.method} {request.url}")
+        self.requests.notify(request)
 
     def get_last_request(self):
         """Return the last intercepted request."""
         return self.last_request
 
-    def perform_action_and_intercept(self, by, value):
-        """Perform an action and intercept the next HTTP request."""
-        self.last_request = None  # Reset the last request
+    def perform_action_and_intercept(self, by, value, url=None, method=None, timeout=10):
+        """Perform an action and return the next HTTP request matching `url`/`method`."""
+        marker = self.requests.mark()
         self.click_element(by, value)
 
-        # Wait for the request to be intercepted
-        timeout = 10  # seconds
-        while self.last_request is None and timeout > 0:
-            timeout -= 1
-            time.sleep(1)
-
-        if self.last_request:
-            print(f"Next request after action: {self.last_request.method} {self.last_request.url}")
+        request = self.requests.wait_for(url, method, since=marker, timeout=timeout)
+        if request:
+            logger.debug("Next request after action: %s %s", request.method, request.url)
         else:
-            print("No request intercepted after the action.")
+            logger.warning("No request intercepted after the action.")
+        return request
 
 # Example usage
 # if __name__ == '__main__':
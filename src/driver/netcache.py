@@ -0,0 +1,231 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+from utils.filesystem import get_data_path
+from . import logger
+
+CACHE_MODES = ('record', 'replay', 'auto')
+# Dropped when recording: the body is stored whole, and the proxy manages the connection.
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'transfer-encoding', 'proxy-connection', 'upgrade')
+# Dropped from outgoing requests while recording, so the server sends full bodies instead of 304s.
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class RecordedResponse:
+    """A stored response: status, headers (in order, repeated names kept) and the raw body digest."""
+
+    __slots__ = ('status', 'reason', 'headers', 'body_digest', 'size')
+
+    def __init__(self, status: int, reason: str, headers: List[Tuple[str, str]], body_digest: str, size: int):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body_digest = body_digest
+        self.size = size
+
+    def header(self, name: str, default: str = '') -> str:
+        name = name.lower()
+        return next((value for key, value in self.headers if key.lower() == name), default)
+
+
+class NetworkCache:
+    """
+    On-disk record/replay cache of browser (and static fetcher) traffic.
+
+    Responses are keyed by method, URL and a hash of the request body, and stored
+    as HAR-like JSON entries under `entries/`, with the raw (still content-encoded)
+    bodies kept once per digest under `bodies/`. Modes:
+
+        record  every request goes to the network and its response is stored
+        replay  requests are answered from the cache; misses get a 504 unless
+                `passthrough` lets them through (unrecorded)
+        auto    hits are replayed and misses are fetched and recorded
+
+    Query parameters listed in `ignore_params` (cache busters, timestamps) are left
+    out of the key so reruns match. Files are written atomically, so several
+    browsers can record into the same cache.
+    """
+
+    def __init__(self, root: Optional[str] = None, mode: str = 'auto', ignore_params: Iterable[str] = (),
+                 passthrough: bool = False):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown network cache mode '{mode}'")
+        self.root = root = root or get_data_path('netcache')
+        self.mode = mode
+        self.ignore_params = set(ignore_params)
+        self.passthrough = passthrough
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'bodies'), exist_ok=True)
+
+    @property
+    def records(self) -> bool:
+        return self.mode in ('record', 'auto')
+
+    def normalize_url(self, url: str) -> str:
+        if not self.ignore_params:
+            return url
+        parts = urlsplit(url)
+        query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                 if name not in self.ignore_params]
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def key(self, method: str, url: str, body: Optional[bytes] = None) -> str:
+        return _sha256(f"{method.upper()} {self.normalize_url(url)}\n{_sha256(body or b'')}".encode('utf-8'))
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, 'entries', key[:2], f"{key}.json")
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'bodies', digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def lookup(self, method: str, url: str, body: Optional[bytes] = None) -> Optional[RecordedResponse]:
+        try:
+            with open(self._entry_path(self.key(method, url, body)), 'r', encoding='utf-8') as file:
+                response = json.load(file)['response']
+        except (OSError, ValueError, KeyError):
+            return None
+        headers = [(header['name'], header['value']) for header in response['headers']]
+        return RecordedResponse(response['status'], response['statusText'], headers,
+                                response['content']['digest'], response['content']['size'])
+
+    def body(self, response: RecordedResponse) -> bytes:
+        with open(self._body_path(response.body_digest), 'rb') as file:
+            return file.read()
+
+    def text(self, response: RecordedResponse) -> str:
+        """The body of a recorded response, content-decoded and as text."""
+        body = self.body(response)
+        encoding = response.header('Content-Encoding', 'identity').lower()
+        if encoding in ('gzip', 'x-gzip'):
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        elif encoding not in ('identity', ''):
+            from seleniumwire.utils import decode
+            body = decode(body, encoding)
+        return body.decode('utf-8', errors='replace')
+
+    def store(self, method: str, url: str, request_body: Optional[bytes], status: int, reason: str,
+              headers: Iterable[Tuple[str, str]], body: bytes, request_headers: Iterable[Tuple[str, str]] = ()) -> str:
+        """Record one exchange and return its key. `body` must match the Content-Encoding in `headers`."""
+        key = self.key(method, url, request_body)
+        digest = _sha256(body)
+        if not os.path.exists(self._body_path(digest)):
+            self._write_atomic(self._body_path(digest), body)
+        headers = [(name, value) for name, value in headers if name.lower() not in HOP_BY_HOP_HEADERS]
+        request: Dict[str, Any] = {
+            'method': method.upper(), 'url': url,
+            'headers': [{'name': name, 'value': value} for name, value in request_headers],
+        }
+        if request_body:
+            request['postData'] = {'digest': _sha256(request_body), 'size': len(request_body)}
+        entry = {
+            'startedDateTime': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'request': request,
+            'response': {
+                'status': status, 'statusText': reason,
+                'headers': [{'name': name, 'value': value} for name, value in headers],
+                'content': {
+                    'size': len(body), 'digest': digest,
+                    'mimeType': next((value for name, value in headers if name.lower() == 'content-type'), ''),
+                },
+            },
+        }
+        self._write_atomic(self._entry_path(key), json.dumps(entry).encode('utf-8'))
+        with self._lock:
+            self.recorded += 1
+        logger.debug("Recorded %s %s (%d bytes)", method, url, len(body), url=url)
+        return key
+
+    def intercept(self, request: Any) -> bool:
+        """
+        selenium-wire request hook: answer `request` from the cache when the mode
+        allows it. Return True if it was answered and must not reach the network.
+        """
+        if self.mode != 'record':
+            response = self.lookup(request.method, request.url, request.body)
+            if response is not None:
+                request.create_response(status_code=response.status, headers=response.headers, body=self.body(response))
+                with self._lock:
+                    self.hits += 1
+                return True
+            with self._lock:
+                self.misses += 1
+            if self.mode == 'replay' and not self.passthrough:
+                logger.debug("Not recorded, answering 504: %s %s", request.method, request.url)
+                request.create_response(status_code=504, headers={'Content-Type': 'text/plain'},
+                                        body=f"Not recorded: {request.method} {request.url}".encode('utf-8'))
+                return True
+        if self.records:
+            for header in CONDITIONAL_HEADERS:
+                del request.headers[header]
+        return False
+
+    def record(self, request: Any, response: Any) -> None:
+        """selenium-wire response hook: store the exchange if this mode records and it is not stored yet."""
+        if not self.records or response is None or response.status_code == 304:
+            return
+        if self.mode == 'auto' and os.path.exists(self._entry_path(self.key(request.method, request.url, request.body))):
+            # Replayed from the cache in the request hook.
+            return
+        try:
+            self.store(request.method, request.url, request.body, response.status_code, response.reason or '',
+                       list(response.headers.items()), response.body or b'', list(request.headers.items()))
+        except OSError as e:
+            logger.warning("Failed to record %s: %s", request.url, e)
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        directory = os.path.join(self.root, 'entries')
+        for prefix in sorted(os.listdir(directory)):
+            for name in sorted(os.listdir(os.path.join(directory, prefix))):
+                if name.endswith('.json'):
+                    with open(os.path.join(directory, prefix, name), 'r', encoding='utf-8') as file:
+                        yield json.load(file)
+
+    def export_har(self, path: str) -> int:
+        """Write every entry as a HAR 1.2 file (bodies inlined as base64) and return the entry count."""
+        from scrapegoat import __version__
+        entries = []
+        for entry in self.entries():
+            content = entry['response']['content']
+            with open(self._body_path(content['digest']), 'rb') as file:
+                content = dict(content, text=base64.b64encode(file.read()).decode('ascii'), encoding='base64')
+            entries.append(dict(entry, response=dict(entry['response'], content=content, httpVersion='HTTP/1.1',
+                                                     cookies=[], redirectURL='', headersSize=-1, bodySize=-1),
+                                request=dict(entry['request'], httpVersion='HTTP/1.1', cookies=[], queryString=[],
+                                             headersSize=-1, bodySize=-1),
+                                time=0, cache={}, timings={'send': 0, 'wait': 0, 'receive': 0}))
+        document = {'log': {'version': '1.2', 'creator': {'name': 'scrapegoat', 'version': __version__},
+                            'entries': entries}}
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(document, file)
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'mode': self.mode, 'hits': self.hits, 'misses': self.misses, 'recorded': self.recorded}
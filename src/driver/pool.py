@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+import queue
+import threading
+import time
+
+from utils.helpers import calculate_max_browsers_or_tabs, load_browser_cost
+from .selenium import BrowserClient
+from . import logger
+
+
+class BrowserPool:
+    """
+    A pool of pre-launched BrowserClient instances.
+
+    Browsers are started up front so jobs never pay Chrome's cold start. A job
+    borrows a browser through `lease()`; when it is handed back the browser is
+    probed for liveness and recycled once it has visited `max_pages` pages or
+    its process tree grows beyond `max_memory_mb`. A browser that fails to start
+    is retried `launch_attempts` times with exponential backoff; once no browser
+    is alive or launching, `acquire()` raises instead of waiting forever.
+    """
+
+    def __init__(self, size: Optional[int] = None, client_factory: Optional[Callable[[], BrowserClient]] = None,
+                 max_pages: int = 100, max_memory_mb: Optional[float] = None, launch_attempts: int = 3,
+                 launch_backoff: float = 2.0, **client_options):
+        self.size = size if size is not None else max(1, calculate_max_browsers_or_tabs()['max_browsers'])
+        self.client_factory = client_factory or (lambda: BrowserClient(**client_options))
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.launch_attempts = max(1, launch_attempts)
+        self.launch_backoff = launch_backoff
+        self._idle: "queue.LifoQueue[BrowserClient]" = queue.LifoQueue()
+        self._clients: List[BrowserClient] = []
+        self._leased: Set[BrowserClient] = set()
+        self._recycle_requested: Set[BrowserClient] = set()
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="browser-pool")
+        self._closed = False
+        self._closing = threading.Event()
+
+    def __enter__(self) -> 'BrowserPool':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Launch every browser of the pool concurrently and wait until they are ready."""
+        logger.info("Starting browser pool with %s browsers", self.size)
+        futures = [self._submit_launch() for _ in range(self.size)]
+        for future in futures:
+            if future is not None:
+                future.result()
+        logger.info("Browser pool ready with %s/%s browsers", self._idle.qsize(), self.size)
+        self._measure_browser_cost()
+
+    def _measure_browser_cost(self) -> None:
+        """Refresh the cached per-browser cost from a warm browser if the cache is stale."""
+        if load_browser_cost() is not None:
+            return
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            calculate_max_browsers_or_tabs(client=client)
+        except Exception as e:
+            logger.warning("Failed to measure browser cost: %s", e)
+        finally:
+            self._idle.put(client)
+
+    def _submit_launch(self):
+        """Schedule a launch; return its future, or None once the pool is closed."""
+        with self._lock:
+            # Checked under the lock close() takes before shutting the executor down.
+            if self._closed:
+                return None
+            self._launching += 1
+            return self._executor.submit(self._launch)
+
+    def _launch(self) -> Optional[BrowserClient]:
+        try:
+            client = self._launch_with_retries()
+        finally:
+            with self._lock:
+                self._launching -= 1
+        if client is None:
+            return None
+        with self._lock:
+            if self._closed or len(self._clients) >= self.size:
+                client.close_driver()
+                return None
+            self._clients.append(client)
+        self._idle.put(client)
+        return client
+
+    def _launch_with_retries(self) -> Optional[BrowserClient]:
+        for attempt in range(self.launch_attempts):
+            if self._closing.is_set():
+                return None
+            client = None
+            try:
+                client = self.client_factory()
+                client.initialize_driver()
+            except Exception as e:
+                logger.warning("Browser launch raised: %s", e)
+            if client is not None and client.driver:
+                return client
+            if attempt + 1 < self.launch_attempts:
+                delay = self.launch_backoff * (2 ** attempt)
+                logger.warning("Browser pool failed to launch a browser (attempt %s/%s), retrying in %.1fs",
+                               attempt + 1, self.launch_attempts, delay)
+                self._closing.wait(delay)
+        logger.error("Browser pool failed to launch a browser after %s attempts", self.launch_attempts)
+        return None
+
+    def _top_up(self) -> None:
+        """Launch browsers until the pool (including launches in flight) reaches its target size."""
+        with self._lock:
+            missing = 0 if self._closed else self.size - len(self._clients) - self._launching
+        for _ in range(max(missing, 0)):
+            self._submit_launch()
+
+    def clients(self) -> List[Tuple[BrowserClient, bool]]:
+        """Snapshot of every browser in the pool with whether it is currently leased."""
+        with self._lock:
+            return [(client, client in self._leased) for client in self._clients]
+
+    def acquire_idle(self, client: BrowserClient) -> bool:
+        """Lease `client` without blocking if it is idle; return whether it was. Hand it back with `release()`."""
+        with self._idle.mutex:
+            if client not in self._idle.queue:
+                return False
+            self._idle.queue.remove(client)
+        with self._lock:
+            self._leased.add(client)
+        return True
+
+    def resize(self, size: int) -> None:
+        """Change the target number of browsers; extra browsers are retired as they become idle."""
+        size = max(1, size)
+        if size == self.size:
+            return
+        logger.info("Resizing browser pool from %s to %s browsers", self.size, size)
+        with self._lock:
+            self.size = size
+        self._top_up()
+        self._retire_idle_surplus()
+
+    def _retire_idle_surplus(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._clients) <= self.size:
+                    return
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(client)
+
+    def request_recycle(self, client: BrowserClient) -> None:
+        """Replace `client` now if it is idle, otherwise as soon as its lease ends."""
+        with self._lock:
+            if client not in self._clients:
+                return
+            leased = client in self._leased
+            if leased:
+                self._recycle_requested.add(client)
+        if not leased:
+            self.replace(client)
+
+    def replace(self, client: BrowserClient) -> None:
+        """Close `client` (removing it from the idle queue if needed) and launch a fresh browser."""
+        with self._idle.mutex:
+            if client in self._idle.queue:
+                self._idle.queue.remove(client)
+        self._discard(client)
+        self._top_up()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[BrowserClient]:
+        """Borrow a warm browser for the duration of the `with` block."""
+        client = self.acquire(timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def acquire(self, timeout: Optional[float] = None) -> BrowserClient:
+        """
+        Take an idle browser out of the pool, blocking up to `timeout` seconds.
+        Raises RuntimeError when the pool has no browser and none is launching.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            wait = 0.5 if deadline is None else min(0.5, max(0.0, deadline - time.monotonic()))
+            try:
+                client = self._idle.get(timeout=wait)
+                break
+            except queue.Empty:
+                pass
+            with self._lock:
+                exhausted = not self._clients and not self._launching
+            if exhausted and self._idle.empty():
+                raise RuntimeError("Browser pool has no browsers left: every launch failed")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"No browser became available within {timeout} seconds")
+        with self._lock:
+            self._leased.add(client)
+        return client
+
+    def release(self, client: BrowserClient, probe: bool = True) -> None:
+        """
+        Return a browser to the pool, replacing it if it is dead or worn out. With `probe=False`
+        the liveness probe and memory sample are skipped, for callers that have just checked it.
+        """
+        with self._lock:
+            self._leased.discard(client)
+            surplus = len(self._clients) > self.size
+        if self._closed or surplus:
+            self._discard(client)
+            return
+        reason = self._recycle_reason(client, probe)
+        if reason:
+            logger.info("Recycling browser: %s", reason)
+            self._discard(client)
+            self._top_up()
+        else:
+            self._idle.put(client)
+
+    def _recycle_reason(self, client: BrowserClient, probe: bool = True) -> Optional[str]:
+        if client in self._recycle_requested:
+            return "recycle requested"
+        if probe and not client.is_alive():
+            return "liveness probe failed"
+        if self.max_pages and client.pages_visited >= self.max_pages:
+            return f"visited {client.pages_visited} pages"
+        if probe and self.max_memory_mb:
+            memory_usage = client.get_memory_usage()
+            if memory_usage >= self.max_memory_mb:
+                return f"memory usage {memory_usage:.0f} MB"
+        return None
+
+    def _discard(self, client: BrowserClient) -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+            self._leased.discard(client)
+            self._recycle_requested.discard(client)
+        if not client.driver:
+            return
+        try:
+            client.close_driver()
+        except Exception as e:
+            logger.warning("Error closing recycled browser: %s", e)
+
+    def close(self) -> None:
+        """Shut down every browser owned by the pool."""
+        with self._lock:
+            self._closed = True
+            clients = list(self._clients)
+            self._clients.clear()
+        self._closing.set()
+        self._executor.shutdown(wait=True)
+        for client in clients:
+            try:
+                client.close_driver()
+            except Exception as e:
+                logger.warning("Error closing pooled browser: %s", e)
+        logger.info("Browser pool closed")
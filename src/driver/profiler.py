@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import sys
+import threading
+import time
+
+from . import logger
+
+# Frames from these modules are skipped when attributing a command to its call site.
+LIBRARY_MODULES = ('selenium', 'seleniumwire', 'urllib3', 'http', 'requests', __name__)
+
+
+def _is_library_frame(module: str) -> bool:
+    return any(module == prefix or module.startswith(prefix + '.') for prefix in LIBRARY_MODULES)
+
+
+def _call_site(depth: int = 2) -> str:
+    """Return "module:line function" of the first caller outside Selenium and this module."""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not _is_library_frame(module):
+            return f"{module}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class _Stats:
+    __slots__ = ('count', 'total', 'max', 'errors')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def add(self, elapsed: float, failed: bool) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.errors += failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'max': round(self.max, 6),
+            'errors': self.errors,
+        }
+
+
+class CommandProfiler:
+    """
+    Times every WebDriver command sent by the drivers it is attached to.
+
+    `attach()` wraps the driver's command executor, so each wire roundtrip
+    (findElement, executeScript, get, ...) is counted per command, per call site
+    (the first frame outside Selenium, e.g. "driver.selenium:312 process_element")
+    and per step, as reported by the `context` callable given to `attach()`.
+    One profiler can be shared by all browsers of a pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.commands: Dict[str, _Stats] = {}
+            self.call_sites: Dict[Tuple[str, str], _Stats] = {}
+            self.steps: Dict[str, _Stats] = {}
+            self.started_at = time.time()
+
+    def attach(self, driver: Any, context: Optional[Callable[[], str]] = None) -> None:
+        """Start profiling the commands `driver` sends; `context` names the step being run."""
+        executor = driver.command_executor
+        execute = executor.execute
+        if getattr(execute, '_profiler', None) is self:
+            return
+
+        def profiled_execute(command: str, params: Optional[dict] = None):
+            call_site = _call_site()
+            step = context() if context else ''
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = execute(command, params)
+                failed = False
+                return result
+            finally:
+                self.record(command, time.perf_counter() - started, call_site, step, failed)
+
+        profiled_execute._profiler = self
+        profiled_execute._wrapped = execute
+        executor.execute = profiled_execute
+
+    @staticmethod
+    def detach(driver: Any) -> None:
+        execute = driver.command_executor.execute
+        if getattr(execute, '_profiler', None) is not None:
+            driver.command_executor.execute = execute._wrapped
+
+    def record(self, command: str, elapsed: float, call_site: str = '<unknown>', step: str = '',
+               failed: bool = False) -> None:
+        with self._lock:
+            self.commands.setdefault(command, _Stats()).add(elapsed, failed)
+            self.call_sites.setdefault((call_site, command), _Stats()).add(elapsed, failed)
+            if step:
+                self.steps.setdefault(step, _Stats()).add(elapsed, failed)
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """Summarise roundtrips and wire time; call sites are ranked by total time."""
+        with self._lock:
+            commands = {name: stats.to_dict() for name, stats in self.commands.items()}
+            call_sites = sorted(self.call_sites.items(), key=lambda item: item[1].total, reverse=True)
+            steps = {name: stats.to_dict() for name, stats in self.steps.items()}
+            duration = time.time() - self.started_at
+        return {
+            'duration': round(duration, 3),
+            'roundtrips': sum(stats['count'] for stats in commands.values()),
+            'wire_time': round(sum(stats['total'] for stats in commands.values()), 6),
+            'commands': dict(sorted(commands.items(), key=lambda item: item[1]['total'], reverse=True)),
+            'call_sites': [
+                {'call_site': call_site, 'command': command, **stats.to_dict()}
+                for (call_site, command), stats in call_sites[:top]
+            ],
+            'steps': steps,
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        report = self.report(top)
+        lines = [
+            f"{report['roundtrips']} WebDriver roundtrips, {report['wire_time']:.3f}s on the wire "
+            f"over {report['duration']:.1f}s",
+            '',
+            f"{'command':<32}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}",
+        ]
+        for name, stats in report['commands'].items():
+            lines.append(f"{name:<32}{stats['count']:>8}{stats['total']:>10.3f}"
+                         f"{stats['mean'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
+        lines += ['', f"Top {top} call sites by wire time:"]
+        for entry in report['call_sites']:
+            lines.append(f"  {entry['total']:>8.3f}s {entry['count']:>6}x  {entry['command']:<24} {entry['call_site']}")
+        if report['steps']:
+            lines += ['', 'Roundtrips per step:']
+            for name, stats in sorted(report['steps'].items(), key=lambda item: item[1]['count'], reverse=True):
+                lines.append(f"  {stats['count']:>6}x {stats['total']:>8.3f}s  {name}")
+        return '\n'.join(lines)
+
+    def dump(self, path: str, top: int = 10) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.report(top), file, indent=2)
+        logger.info("Wrote WebDriver command profile to %s", path)
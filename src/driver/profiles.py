@@ -0,0 +1,69 @@
+from typing import Iterable, Optional
+import os
+import shutil
+import tempfile
+
+from . import logger
+
+# Files Chrome uses to lock a profile to one running instance; never copied.
+LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile')
+TMPFS_DIRECTORY = '/dev/shm'
+
+
+class ProfileTemplate:
+    """
+    A prepared Chrome `--user-data-dir` that new browsers start from.
+
+    The template keeps HTTP and code caches, service workers and HSTS state warm,
+    so each instance skips rebuilding them. `instantiate()` gives every browser its
+    own copy (on tmpfs when available), so instances never write to the template.
+    """
+
+    def __init__(self, path: str, base_directory: Optional[str] = None):
+        self.path = os.path.abspath(path)
+        if base_directory is None and os.path.isdir(TMPFS_DIRECTORY) and os.access(TMPFS_DIRECTORY, os.W_OK):
+            base_directory = TMPFS_DIRECTORY
+        self.base_directory = base_directory
+
+    @property
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def build(self, client, warm_urls: Iterable[str] = ()) -> None:
+        """
+        Create the template by running `client` on it and visiting `warm_urls`.
+        Raises RuntimeError if Chrome does not start; a template directory left
+        half-written by that attempt is removed, so it is never instantiated.
+        """
+        existed = self.exists
+        user_data_dir, client.user_data_dir = client.user_data_dir, self.path
+        try:
+            client.initialize_driver()
+            if not client.driver:
+                if not existed:
+                    shutil.rmtree(self.path, ignore_errors=True)
+                raise RuntimeError(f"Chrome did not start, profile template {self.path} was not built")
+            try:
+                for url in warm_urls:
+                    client.visit(url)
+            finally:
+                client.close_driver()
+        finally:
+            client.user_data_dir = user_data_dir
+        logger.info("Built Chrome profile template at %s", self.path)
+
+    def instantiate(self) -> str:
+        """Create a private copy of the template and return its path."""
+        if not self.exists:
+            raise FileNotFoundError(f"Profile template {self.path} does not exist")
+        instance = tempfile.mkdtemp(prefix='scrapegoat-profile-', dir=self.base_directory)
+        shutil.copytree(
+            self.path, instance, dirs_exist_ok=True, symlinks=True,
+            ignore=shutil.ignore_patterns(*LOCK_FILES),
+        )
+        return instance
+
+    @staticmethod
+    def release(instance: str) -> None:
+        """Delete an instance created by `instantiate()`."""
+        shutil.rmtree(instance, ignore_errors=True)
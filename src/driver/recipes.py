@@ -0,0 +1,266 @@
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import os
+import threading
+
+from .schema import ACTION_NAMES, FETCH_MODES, LEGACY_ACTION_NAMES, POST_ACTION_NAMES, SELECTOR_MAP, SETTLE_STRATEGIES, UIElement
+from .extraction import ExtractionError, ExtractionSpec
+from . import logger
+
+DEFAULT_RECIPES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'elements.json')
+
+# field -> (accepted types, required)
+STEP_SCHEMA: Dict[str, Tuple[tuple, bool]] = {
+    'element_type': ((str,), False),
+    'selector_type': ((str,), True),
+    'selector_value': ((str,), True),
+    'action': ((str,), False),
+    'action_value': ((str,), False),
+    'in_page': ((bool,), False),
+    'post_action': ((str,), False),
+    'settle': ((str,), False),
+    'settle_value': ((str,), False),
+    'settle_timeout': ((int, float), False),
+    'quiet_ms': ((int,), False),
+    'max_retries': ((int,), False),
+    'backoff': ((int, float), False),
+    'backoff_max': ((int, float), False),
+}
+# Pages are either a plain list of steps or an object with "steps" plus these options.
+PAGE_OPTIONS_SCHEMA: Dict[str, tuple] = {
+    'steps': (list,),
+    'blocking': (dict,),
+    'fetch': (str,),
+    'expect': (list,),
+    'extract': (dict,),
+    'incremental': (bool,),
+}
+BLOCKING_SCHEMA: Dict[str, tuple] = {
+    'types': (list,),
+    'domains': (list,),
+    'urls': (list,),
+    'allow_domains': (list,),
+    'allow_urls': (list,),
+    'trackers': (bool,),
+}
+
+
+class RecipeError(ValueError):
+    """Raised when a recipe file does not match the recipe schema."""
+
+
+class CompiledStep(UIElement):
+    """A validated UIElement that remembers where in the recipe file it came from."""
+
+    __slots__ = ('site', 'page', 'index')
+
+    def __init__(self, element_data: Dict[str, Any], site: str, page: str, index: int):
+        super().__init__(element_data)
+        self.site = site
+        self.page = page
+        self.index = index
+
+
+def validate_step(step: Any, path: str) -> None:
+    """Check a single step against STEP_SCHEMA, raising RecipeError with the offending path."""
+    if not isinstance(step, dict):
+        raise RecipeError(f"{path}: step must be an object")
+    for field, (types, required) in STEP_SCHEMA.items():
+        if field not in step:
+            if required:
+                raise RecipeError(f"{path}.{field}: missing required field")
+            continue
+        value = step[field]
+        if value is not None and ((isinstance(value, bool) and bool not in types) or not isinstance(value, types)):
+            raise RecipeError(f"{path}.{field}: expected {' or '.join(t.__name__ for t in types)}")
+    unknown = set(step) - set(STEP_SCHEMA)
+    if unknown:
+        raise RecipeError(f"{path}: unknown fields {sorted(unknown)}")
+    if step['selector_type'].lower().split(':')[0] not in SELECTOR_MAP:
+        raise RecipeError(f"{path}.selector_type: unsupported selector type '{step['selector_type']}'")
+    if step.get('settle', 'none') not in SETTLE_STRATEGIES:
+        raise RecipeError(f"{path}.settle: expected one of {', '.join(SETTLE_STRATEGIES)}")
+    if step.get('action') and step['action'] not in ACTION_NAMES + LEGACY_ACTION_NAMES:
+        raise RecipeError(f"{path}.action: unsupported action '{step['action']}'")
+    if step.get('action') == 'send_keys' and step.get('action_value') is None:
+        raise RecipeError(f"{path}.action_value: required by the send_keys action")
+    if step.get('post_action') and step['post_action'] not in POST_ACTION_NAMES:
+        raise RecipeError(f"{path}.post_action: unsupported post action '{step['post_action']}'")
+
+
+def _validate_section(section: Any, schema: Dict[str, tuple], path: str) -> None:
+    if not isinstance(section, dict):
+        raise RecipeError(f"{path}: expected an object")
+    for field, value in section.items():
+        if field not in schema:
+            raise RecipeError(f"{path}: unknown field '{field}'")
+        if not isinstance(value, schema[field]):
+            raise RecipeError(f"{path}.{field}: expected {' or '.join(t.__name__ for t in schema[field])}")
+
+
+def validate_page(page: Any, path: str) -> None:
+    """Validate a page, given either as a list of steps or as an options object."""
+    if isinstance(page, dict):
+        _validate_section(page, PAGE_OPTIONS_SCHEMA, path)
+        if 'blocking' in page:
+            _validate_section(page['blocking'], BLOCKING_SCHEMA, f"{path}.blocking")
+        if page.get('fetch', 'browser') not in FETCH_MODES:
+            raise RecipeError(f"{path}.fetch: expected one of {', '.join(FETCH_MODES)}")
+        if 'extract' in page:
+            try:
+                ExtractionSpec.from_dict(page['extract'], f"{path}.extract")
+            except ExtractionError as e:
+                raise RecipeError(str(e))
+        steps = page.get('steps', [])
+    elif isinstance(page, list):
+        steps = page
+    else:
+        raise RecipeError(f"{path}: page must be a list of steps or an object")
+    for index, step in enumerate(steps):
+        validate_step(step, f"{path}[{index}]")
+
+
+def validate_site(site: str, pages: Any) -> None:
+    """Validate every page of a site."""
+    if not isinstance(pages, dict):
+        raise RecipeError(f"{site}: site must map page names to pages")
+    for page_name, page in pages.items():
+        validate_page(page, f"{site}.{page_name}")
+
+
+class Recipe:
+    """The compiled steps of one site page together with its page-level options."""
+
+    __slots__ = ('site', 'page', 'steps', 'options', 'digest')
+
+    def __init__(self, site: str, page: str, steps: List[CompiledStep], options: Dict[str, Any], digest: str = ''):
+        self.site = site
+        self.page = page
+        self.steps = steps
+        self.options = options
+        # Hash of the definition the recipe was compiled from
+        self.digest = digest
+
+    @property
+    def name(self) -> str:
+        return f"{self.site}.{self.page}"
+
+    @property
+    def fingerprint_scope(self) -> str:
+        """FingerprintIndex scope of this recipe, so editing its steps or extract spec invalidates it."""
+        return f"{self.name}@{self.digest}"
+
+
+def compile_recipe(site: str, page: str, definition: Any) -> Recipe:
+    """Compile an already validated page definition into a Recipe."""
+    if isinstance(definition, list):
+        definition = {'steps': definition}
+    digest = hashlib.blake2b(json.dumps(definition, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+    options = {key: value for key, value in definition.items() if key != 'steps'}
+    if 'extract' in options:
+        options['extract'] = ExtractionSpec.from_dict(options['extract'], f"{site}.{page}.extract")
+    steps = [CompiledStep(step, site, page, index) for index, step in enumerate(definition.get('steps', []))]
+    return Recipe(site, page, steps, options, digest)
+
+
+class RecipeRegistry:
+    """
+    Lazily loads, validates and compiles recipes.
+
+    `path` is either a single JSON file mapping site -> page -> steps (like
+    data/elements.json) or a directory of `<site>.json` files mapping page -> steps,
+    in which case only the requested site's file is ever read. Parsed files and
+    compiled pages are cached and invalidated when the file's mtime changes.
+    """
+
+    def __init__(self, path: str = DEFAULT_RECIPES_PATH):
+        self.path = path
+        self._documents: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._compiled: Dict[Tuple[str, str], Tuple[int, Recipe]] = {}
+        self._lock = threading.Lock()
+
+    def _site_file(self, site: str) -> str:
+        return os.path.join(self.path, f"{site}.json") if os.path.isdir(self.path) else self.path
+
+    def _load(self, file_path: str) -> Tuple[int, Dict[str, Any]]:
+        mtime = os.stat(file_path).st_mtime_ns
+        cached = self._documents.get(file_path)
+        if cached and cached[0] == mtime:
+            return cached
+        with open(file_path, 'r') as file:
+            document = json.load(file)
+        if not isinstance(document, dict):
+            raise RecipeError(f"{file_path}: recipe file must be a JSON object")
+        if os.path.isdir(self.path):
+            validate_site(os.path.splitext(os.path.basename(file_path))[0], document)
+        else:
+            for site, pages in document.items():
+                validate_site(site, pages)
+        logger.debug("Loaded recipe file %s", file_path)
+        self._documents[file_path] = (mtime, document)
+        return mtime, document
+
+    def _pages(self, site: str) -> Tuple[int, Dict[str, Any]]:
+        mtime, document = self._load(self._site_file(site))
+        if os.path.isdir(self.path):
+            return mtime, document
+        if site not in document:
+            raise KeyError(f"Unknown recipe site '{site}'")
+        return mtime, document[site]
+
+    def recipe(self, site: str, page: str) -> Recipe:
+        """Return the compiled recipe of `site`.`page`."""
+        with self._lock:
+            mtime, pages = self._pages(site)
+            cached = self._compiled.get((site, page))
+            if cached and cached[0] == mtime:
+                return cached[1]
+            if page not in pages:
+                raise KeyError(f"Unknown recipe page '{site}.{page}'")
+            recipe = compile_recipe(site, page, pages[page])
+            self._compiled[(site, page)] = (mtime, recipe)
+            return recipe
+
+    def definition(self, site: str, page: str) -> Any:
+        """Return the validated, uncompiled definition of `site`.`page`, e.g. to ship it to another process."""
+        with self._lock:
+            pages = self._pages(site)[1]
+            if page not in pages:
+                raise KeyError(f"Unknown recipe page '{site}.{page}'")
+            return pages[page]
+
+    def get(self, site: str, page: str) -> List[CompiledStep]:
+        """Return the compiled steps of `site`.`page`."""
+        return self.recipe(site, page).steps
+
+    def sites(self) -> List[str]:
+        if os.path.isdir(self.path):
+            return sorted(os.path.splitext(name)[0] for name in os.listdir(self.path) if name.endswith('.json'))
+        with self._lock:
+            return sorted(self._load(self.path)[1])
+
+    def pages(self, site: str) -> List[str]:
+        with self._lock:
+            return sorted(self._pages(site)[1])
+
+
+_registries: Dict[str, RecipeRegistry] = {}
+
+
+def get_registry(path: str = DEFAULT_RECIPES_PATH) -> RecipeRegistry:
+    """Return the process-wide registry for `path`, so workers share one compiled cache."""
+    registry = _registries.get(path)
+    if registry is None:
+        registry = _registries.setdefault(path, RecipeRegistry(path))
+    return registry
+
+
+def load_recipe(site: str, page: str, path: str = DEFAULT_RECIPES_PATH) -> List[CompiledStep]:
+    """Shortcut for `get_registry(path).get(site, page)`."""
+    return get_registry(path).get(site, page)
+
+
+def get_recipe(site: str, page: str, path: str = DEFAULT_RECIPES_PATH) -> Recipe:
+    """Shortcut for `get_registry(path).recipe(site, page)`."""
+    return get_registry(path).recipe(site, page)
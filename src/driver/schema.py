@@ -0,0 +1,87 @@
+from typing import Dict, Optional
+
+# Recipe vocabulary shared by driver.recipes (validation) and driver.selenium (execution).
+# Kept free of Selenium imports so recipes can be validated and queued on boxes without a browser.
+
+# Recipe selector type -> Selenium `By` strategy (the strings `selenium.webdriver.common.by.By` uses)
+SELECTOR_MAP = {
+    "css": "css selector",
+    "xpath": "xpath",
+    "id": "id",
+    "name": "name",
+    "class": "class name",
+    "tag": "tag name",
+    "link": "link text",
+    "partial": "partial link text"
+}
+# Names of the UIElement.action / UIElement.post_action handlers in driver.selenium.ACTIONS / POST_ACTIONS
+ACTION_NAMES = ('click', 'USE_SCRIPT', 'send_keys')
+# Actions found in existing recipe files (data/elements.json) that are filled in by the GUI and have
+# no handler here; recipes may keep them and BrowserClient only locates and settles those steps.
+LEGACY_ACTION_NAMES = ('USE_EMAIL', 'USE_PASSWORD', 'GENERATE_MFA')
+POST_ACTION_NAMES = ('submit',)
+SETTLE_STRATEGIES = ('none', 'dom_quiet', 'network_idle', 'url_change', 'element')
+FETCH_MODES = ('browser', 'static', 'auto')
+
+
+def resolve_selector(selector: str) -> str:
+    """Map a recipe selector type (e.g. "XPATH", "css") to its Selenium `By` strategy."""
+    return SELECTOR_MAP.get(selector.lower().split(':')[0], SELECTOR_MAP['name'])
+
+
+def parse_settle_selector(settle_value: str):
+    """
+    Split a "type:value" settle selector (e.g. "css:#results") into its type and value.
+    Without a known type prefix the whole string is a CSS selector, so "a:hover" stays intact.
+    """
+    selector_type, _, selector_value = settle_value.partition(':')
+    if selector_type.lower() not in SELECTOR_MAP:
+        return 'css', settle_value
+    return selector_type, selector_value
+
+
+class UIElement:
+    __slots__ = ('element_type', 'selector_type', 'selector_value', 'locator', 'action', 'action_value', 'in_page',
+                 'post_action', 'settle', 'settle_value', 'settle_timeout', 'quiet_ms', 'max_retries', 'backoff', 'backoff_max')
+
+    def __init__(self, element_data: Dict[str, str]):
+        self.element_type: str = element_data.get('element_type', '')
+        self.selector_type: str = element_data.get('selector_type', '')
+        self.selector_value: str = element_data.get('selector_value', '')
+        self.locator = (resolve_selector(self.selector_type), self.selector_value)
+        self.action: str = element_data.get('action', '')
+        # Text typed by the send_keys action
+        self.action_value: str = element_data.get('action_value', '')
+        # The action stays in the current document, so batched mode may run later steps in the same script
+        self.in_page: bool = bool(element_data.get('in_page', False))
+        self.post_action: str = element_data.get('post_action', '')
+        # How to decide the page has settled after the action (see SETTLE_STRATEGIES)
+        self.settle: str = element_data.get('settle', 'none')
+        self.settle_value: str = element_data.get('settle_value', '')
+        self.settle_timeout: float = float(element_data.get('settle_timeout', 5))
+        self.quiet_ms: int = int(element_data.get('quiet_ms', 300))
+        # Retry policy; max_retries=None falls back to the client's setting
+        self.max_retries: Optional[int] = element_data.get('max_retries')
+        self.backoff: float = float(element_data.get('backoff', 0.25))
+        self.backoff_max: float = float(element_data.get('backoff_max', 4))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            'element_type': self.element_type,
+            'selector_type': self.selector_type,
+            'selector_value': self.selector_value,
+            'action': self.action,
+            'action_value': self.action_value,
+            'in_page': self.in_page,
+            'post_action': self.post_action,
+            'settle': self.settle,
+            'settle_value': self.settle_value,
+            'settle_timeout': self.settle_timeout,
+            'quiet_ms': self.quiet_ms,
+            'max_retries': self.max_retries,
+            'backoff': self.backoff,
+            'backoff_max': self.backoff_max,
+        }
+
+    def __repr__(self) -> str:
+        return f"UIElement({self.to_dict()!r})"
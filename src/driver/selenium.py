@@ -5,62 +5,181 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import WebDriverException, TimeoutException, NoSuchElementException, StaleElementReferenceException
-from selenium import webdriver
 from selenium.webdriver.common.alert import Alert
 from utils.filesystem import get_resource_path
+from utils.markup import lxml_available
+from .events import RequestWaiter
+from .capture import NetworkCapture
+from .blocking import ResourcePolicy
+from .fetch import StaticFetcher, StaticPage
+from .profiles import ProfileTemplate
+from storage.sessions import SessionStore
+from storage.fingerprints import FingerprintIndex, record_hash
+from storage.snapshots import Snapshot, SnapshotStore
+from .settle import backoff_delay, wait_for_settle
+from .batch import compile_batches, run_batch
+from .metrics import FAILURES, PHASE_SECONDS, RETRIES, timed
+from .profiler import CommandProfiler
+from .netcache import NetworkCache
+from .extraction import ExtractionSpec, extract, extract_from_html
+from .schema import UIElement, resolve_selector
 from . import logger
 
-from typing import Dict, List, Optional
+try:
+    # selenium-wire exposes request_interceptor on the driver; plain Selenium silently ignores it.
+    from seleniumwire import webdriver
+    # Keep selenium-wire's own request history small; NetworkCapture is the place to keep traffic.
+    WEBDRIVER_OPTIONS = {'seleniumwire_options': {'request_storage': 'memory', 'request_storage_max_size': 100}}
+except ImportError:
+    from selenium import webdriver
+    WEBDRIVER_OPTIONS = {}
+
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import psutil
 import time
 import os
 import sys
 import platform
 
-class UIElement:
-    def __init__(self, element_data: Dict[str, str]):
-        self.element_type: str = element_data.get('element_type', '')
-        self.selector_type: str = element_data.get('selector_type', '')
-        self.selector_value: str = element_data.get('selector_value', '')
-        self.action: str = element_data.get('action', '')
-        self.post_action: str = element_data.get('post_action', '')
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.66 Safari/537.36"
+
+
+def _click(client: 'BrowserClient', element: UIElement, found_element: WebElement) -> None:
+    found_element.click()
+
+
+def _script_click(client: 'BrowserClient', element: UIElement, found_element: WebElement) -> None:
+    client.driver.execute_script("arguments[0].click();", found_element)
+
+
+def _send_keys(client: 'BrowserClient', element: UIElement, found_element: WebElement) -> None:
+    found_element.clear()
+    found_element.send_keys(element.action_value)
+
+
+def _submit(client: 'BrowserClient', element: UIElement, found_element: WebElement) -> None:
+    found_element.submit()
+
+
+# Dispatch tables for UIElement.action / UIElement.post_action; keep in sync with schema.ACTION_NAMES / POST_ACTION_NAMES
+ACTIONS = {
+    'click': _click,
+    'USE_SCRIPT': _script_click,
+    'send_keys': _send_keys,
+}
+POST_ACTIONS = {
+    'submit': _submit,
+}
+
+
+class RecipeResult:
+    """
+    Outcome of BrowserClient.run_recipe: the static page if one was served, the
+    extracted records, and whether the fingerprint index found nothing new.
+    """
+
+    __slots__ = ('page', 'records', 'unchanged')
+
+    def __init__(self, page: Optional[StaticPage] = None, records: Optional[List[Dict[str, Any]]] = None,
+                 unchanged: bool = False):
+        self.page = page
+        self.records = records
+        self.unchanged = unchanged
+
+    @property
+    def static(self) -> bool:
+        return self.page is not None
 
-    def to_dict(self) -> Dict[str, str]:
-        return {
-            'element_type': self.element_type,
-            'selector_type': self.selector_type,
-            'selector_value': self.selector_value,
-            'action': self.action,
-            'post_action': self.post_action,
-        }
 
 class BrowserClient:
-    def __init__(self, timeout_after: int = 15, max_retries: int = 5, browser_headless: bool = False, is_experimental: bool = False):
+    def __init__(self, timeout_after: int = 15, max_retries: int = 5, browser_headless: bool = False, is_experimental: bool = False,
+                 page_load_strategy: str = "normal", execution_mode: str = "steps",
+                 capture: Optional[NetworkCapture] = None, resource_policy: Optional[ResourcePolicy] = None,
+                 session_store: Optional[SessionStore] = None, profile_template: Optional[ProfileTemplate] = None,
+                 user_data_dir: Optional[str] = None, profiler: Optional[CommandProfiler] = None,
+                 fingerprints: Optional[FingerprintIndex] = None, snapshots: Optional[SnapshotStore] = None,
+                 network_cache: Optional[NetworkCache] = None):
         self.driver: Optional[webdriver.Chrome] = None
         self.initial_window_handle: Optional[str] = None
         self.timeout_after = timeout_after
         self.max_retries = max_retries
         self.browser_headless = browser_headless
         self.is_experimental = is_experimental
+        self.page_load_strategy = page_load_strategy
+        # "steps" drives each UIElement through WebDriver; "batched" runs runs of steps in-page
+        self.execution_mode = execution_mode
+        self.script_timeout = 30
         self.request_interceptor = None
         self.last_request = None
+        self.requests = RequestWaiter()
+        self.capture = capture
+        self.resource_policy = resource_policy
+        self._static_fetcher: Optional[StaticFetcher] = None
+        self._session_store = session_store
+        self.fingerprints = fingerprints
+        self.snapshots = snapshots
+        self.network_cache = network_cache
+        self.profile_template = profile_template
+        self.user_data_dir = user_data_dir
+        self._profile_instance: Optional[str] = None
+        self.startup_time: Optional[float] = None
+        self.pages_visited = 0
+        # Bumped whenever the browser may hold new cookies (page loads, element chains, injected
+        # sessions); the static fetcher copies the cookies again once it has moved
+        self.cookie_epoch = 0
+        # Recipe and step being run, used to label timing metrics and command profiles
+        self._recipe = None
+        self._element: Optional[UIElement] = None
+        self.profiler = profiler
+        # (URL, ETag / Last-Modified headers) of the last top-level document the browser received
+        self._document_validators: Optional[Tuple[str, Dict[str, str]]] = None
         self.wait = WebDriverWait(self.driver, 10)
 
     def initialize_driver(self):
+        started = time.perf_counter()
+        if self.profile_template and self.profile_template.exists:
+            self._profile_instance = self.profile_template.instantiate()
+        profile_ready = time.perf_counter()
         options = self._configure_chrome_options()
         service = self._get_chrome_service(options)
         
         try:
-            self.driver = webdriver.Chrome(service=service, options=options)
+            self.driver = webdriver.Chrome(service=service, options=options, **WEBDRIVER_OPTIONS)
+            if self.profiler:
+                self.profiler.attach(self.driver, context=self._profile_context)
             self.driver.request_interceptor = self._intercept_request
             self.request_interceptor = self._intercept_request
+            if self.capture or self.fingerprints or (self.network_cache and self.network_cache.records):
+                self.driver.response_interceptor = self._intercept_response
+            if self.network_cache and not WEBDRIVER_OPTIONS:
+                logger.warning("The network cache needs selenium-wire; browser traffic is neither recorded nor replayed")
+            if self.resource_policy:
+                self.set_resource_policy(self.resource_policy)
             self.initial_window_handle = self.driver.current_window_handle
-            logger.debug(f"Successfully Initialized Chrome Browser with Initial Window Handle: {self.initial_window_handle}")
+            self.startup_time = time.perf_counter() - started
+            PHASE_SECONDS.observe(self.startup_time, phase='startup')
+            logger.debug("Successfully Initialized Chrome Browser with Initial Window Handle: %s",
+                         self.initial_window_handle)
+            logger.info("Chrome started in %.2fs (profile preparation %.2fs)",
+                        self.startup_time, profile_ready - started)
         except WebDriverException as error:
-            logger.error(f"Failed to initialize Chrome browser: {error}")
+            FAILURES.inc(phase='startup', exception=type(error).__name__)
+            logger.error("Failed to initialize Chrome browser: %s", error)
             logger.error("Ensure that the Chrome Portable and ChromeDriver binaries are correctly bundled.")
+            self._release_profile()
+
+    def _release_profile(self):
+        if self._profile_instance:
+            ProfileTemplate.release(self._profile_instance)
+            self._profile_instance = None
 
     def _configure_chrome_options(self) -> Options:
         options = Options()
+        options.page_load_strategy = self.page_load_strategy
+        user_data_dir = self._profile_instance or self.user_data_dir
+        if user_data_dir:
+            options.add_argument(f"--user-data-dir={user_data_dir}")
         if self.browser_headless:
             options.add_argument("--headless")
             logger.debug("Headless mode enabled")
@@ -74,7 +193,7 @@ class BrowserClient:
             "--disable-infobars",
             "--window-size=1450,860",
             "--password-store=basic",
-            "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.66 Safari/537.36"
+            f"--user-agent={USER_AGENT}"
         ]
         
         for arg in default_arguments:
@@ -90,7 +209,7 @@ class BrowserClient:
                 options.add_experimental_option(option, value)
             logger.debug("Experimental options added")
 
-        logger.debug(f"Chrome configured with options: {options.arguments}")
+        logger.debug("Chrome configured with options: %s", options.arguments)
         return options
 
     def _get_chrome_service(self, options: Options) -> Service:
@@ -127,89 +246,335 @@ class BrowserClient:
 
     def visit(self, url):
         """Visit the target URL."""
-        self.driver.get(url)
+        with timed('visit', **self._step_labels()):
+            self.driver.get(url)
+        self.pages_visited += 1
+        self.cookie_epoch += 1
         
-    @staticmethod
-    def _get_by_selector(selector: str):
-        selector_map = {
-            "css": By.CSS_SELECTOR,
-            "xpath": By.XPATH,
-            "id": By.ID,
-            "name": By.NAME,
-            "class": By.CLASS_NAME,
-            "tag": By.TAG_NAME,
-            "link": By.LINK_TEXT,
-            "partial": By.PARTIAL_LINK_TEXT
+    def _step_labels(self, element: Optional[UIElement] = None) -> Dict[str, str]:
+        recipe = self._recipe
+        return {
+            'recipe': recipe.name if recipe else '',
+            'site': getattr(element, 'site', None) or (recipe.site if recipe else ''),
+            'step': element.element_type if element else '',
         }
-        selector_type = selector.lower().split(':')[0]
-        return selector_map.get(selector_type, By.NAME)
 
-    def process_elements_chain(self, elements: List[UIElement]):
-        logger.debug(f"Processing {len(elements)} Elements Chain")
-        for element in elements:
-            self.process_element(element, self.max_retries)
+    def _profile_context(self) -> str:
+        labels = self._step_labels(self._element)
+        return f"{labels['recipe']}/{labels['step']}" if labels['step'] else labels['recipe']
 
-    def process_element(self, element: UIElement, retries: int):
-        logger.debug(f"Processing element: {element.to_dict()}")
+    @staticmethod
+    def _get_by_selector(selector: str):
+        return resolve_selector(selector)
+
+    def process_elements_chain(self, elements: List[UIElement], batched: Optional[bool] = None):
+        logger.debug("Processing %d Elements Chain", len(elements))
+        if batched is None:
+            batched = self.execution_mode == 'batched'
         try:
-            found_element = self.wait_for_element(element.selector_value, element.selector_type)
-            found_element = self.scroll_to_element(By.CSS_SELECTOR, found_element)
-            found_element = self._perform_action(element, found_element)
-            if element.post_action:
-                found_element = self._perform_post_action(element, found_element)
-            time.sleep(1)
-            logger.debug(f"Successfully Processed UIElement {element.element_type}")
-        except (TimeoutException, NoSuchElementException, StaleElementReferenceException) as e:
-            if retries > 0:
-                logger.warning(f"Error interacting with UIElement '{element.element_type}': {str(e)}. Retrying {retries} more times.")
-                self.process_element(element, retries - 1)
+            if batched:
+                return self._process_elements_batched(elements)
+            for element in elements:
+                self.process_element(element)
+        finally:
+            # Logins, consent banners and in-page requests set cookies without a page load.
+            self.cookie_epoch += 1
+
+    def _process_elements_batched(self, elements: List[UIElement]):
+        """Run consecutive non-navigating steps in a single in-page script, falling back to per-step processing on failure."""
+        for batch in compile_batches(elements):
+            with timed('batch', **self._step_labels()):
+                completed, error = run_batch(self, batch)
+            if error:
+                logger.warning("Batched steps stopped after %s/%s steps (%s), falling back to per-step processing",
+                               completed, len(batch), error)
+                for element in batch[completed:]:
+                    self.process_element(element)
             else:
-                logger.error(f"Failed to process UIElement with selector '{element.element_type}' after multiple retries: {e}")
-        except Exception as e:
-            logger.error(f"Failed to process UIElement with selector '{element.element_type}': {e}")
-
+                logger.debug("Processed batch of %d UIElements in one roundtrip", len(batch))
 
+    def process_element(self, element: UIElement, retries: Optional[int] = None) -> bool:
+        """Locate, act on and settle a single UIElement, retrying with capped exponential backoff."""
+        self._element = element
+        try:
+            return self._process_element(element, retries)
+        finally:
+            self._element = None
+
+    def _process_element(self, element: UIElement, retries: Optional[int]) -> bool:
+        logger.debug(lambda: f"Processing element: {element.to_dict()}")
+        if retries is None:
+            retries = element.max_retries if element.max_retries is not None else self.max_retries
+        by, value = element.locator
+        labels = self._step_labels(element)
+
+        for attempt in range(retries + 1):
+            try:
+                with timed('wait_for_element', **labels):
+                    found_element = self.wait_for_element(by, value, timeout=self.timeout_after)
+                    if found_element is None:
+                        raise NoSuchElementException(f"Element {value} not found")
+                with timed('scroll', **labels):
+                    self.driver.execute_script("arguments[0].scrollIntoView();", found_element)
+                previous_url = self.driver.current_url if element.settle == 'url_change' else ''
+                with timed('action', **labels):
+                    found_element = self._perform_action(element, found_element)
+                if element.post_action:
+                    with timed('post_action', **labels):
+                        found_element = self._perform_post_action(element, found_element)
+                with timed('settle', **labels):
+                    settled = wait_for_settle(self, element, previous_url)
+                if not settled:
+                    logger.warning("UIElement %s did not settle (%s) within %ss",
+                                   element.element_type, element.settle, element.settle_timeout)
+                logger.debug("Successfully Processed UIElement %s", element.element_type)
+                return True
+            except (TimeoutException, NoSuchElementException, StaleElementReferenceException) as e:
+                if attempt >= retries:
+                    logger.error("Failed to process UIElement with selector '%s' after multiple retries: %s",
+                                 element.element_type, e)
+                    return False
+                delay = backoff_delay(attempt, element.backoff, element.backoff_max)
+                RETRIES.inc(**labels)
+                logger.warning("Error interacting with UIElement '%s': %s. Retrying in %.2fs (%s retries left).",
+                               element.element_type, e, delay, retries - attempt)
+                with timed('retry', **labels):
+                    time.sleep(delay)
+            except Exception as e:
+                logger.error("Failed to process UIElement with selector '%s': %s", element.element_type, e)
+                return False
+        return False
 
     def _perform_action(self, element: UIElement, found_element: WebElement) -> WebElement:
-        logger.debug(f"Performing action={element.action} on UIElement={element.selector_value}")
-        if element.action == 'click':
-            found_element.click()
-        elif element.action == 'USE_SCRIPT':
-            self.driver.execute_script("arguments[0].click();", found_element)
-        logger.debug(f"Action {element.action} performed successfully")
+        logger.debug("Performing action=%s on UIElement=%s", element.action, element.selector_value)
+        perform = ACTIONS.get(element.action)
+        if perform:
+            perform(self, element, found_element)
+        logger.debug("Action %s performed successfully", element.action)
         return found_element
 
     def _perform_post_action(self, element: UIElement, found_element: WebElement) -> WebElement:
-        logger.debug(f"Performing post-action={element.post_action} on UIElement={element.selector_value}")
-        if element.post_action == 'submit':
-            found_element.submit()
-        logger.debug(f"Post-action {element.post_action} performed successfully")
+        logger.debug("Performing post-action=%s on UIElement=%s", element.post_action, element.selector_value)
+        post_perform = POST_ACTIONS.get(element.post_action)
+        if post_perform:
+            post_perform(self, element, found_element)
+        logger.debug("Post-action %s performed successfully", element.post_action)
         return found_element
 
+    def set_resource_policy(self, policy: Optional[ResourcePolicy]):
+        """Switch the resource blocking rules applied to subsequent requests."""
+        self.resource_policy = policy
+        if not self.driver:
+            return
+        if WEBDRIVER_OPTIONS:
+            # selenium-wire: enforced in _intercept_request, with per-type counters; the responses
+            # let through size the estimate of the bytes saved
+            if policy:
+                self.driver.response_interceptor = self._intercept_response
+            return
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': policy.cdp_url_patterns() if policy else []})
+        except WebDriverException as e:
+            logger.warning("Failed to apply resource blocking through DevTools: %s", e)
+
+    @property
+    def session_store(self) -> SessionStore:
+        """Store used by save_cookies/load_cookies; shared with other workers when passed in."""
+        if self._session_store is None:
+            self._session_store = SessionStore()
+        return self._session_store
+
+    @property
+    def static_fetcher(self) -> StaticFetcher:
+        """HTTP fetcher sharing this browser's user agent and cookies, created on first use."""
+        if self._static_fetcher is None:
+            self._static_fetcher = StaticFetcher(self, user_agent=USER_AGENT, fingerprints=self.fingerprints,
+                                                 network_cache=self.network_cache)
+        return self._static_fetcher
+
+    def run_recipe(self, recipe, url: Optional[str] = None, try_static: bool = True) -> RecipeResult:
+        """
+        Apply a compiled recipe's page options, optionally visit `url`, run its steps and
+        then its "extract" spec, if any. Step-less recipes marked "static"/"auto" are
+        served over HTTP when possible, in which case the browser is not touched
+        (`try_static=False` skips that attempt when `run_static()` already made it).
+
+        With a snapshot store, the HTML of every processed page is kept for replay.
+        With a fingerprint index, static fetches are conditional and pages already
+        processed in the same state are skipped (`unchanged`). Browser recipes marked
+        "incremental" are revalidated with a conditional HEAD request first, when
+        validators were stored, and skipped on a 304. Results whose records match the
+        previous run are flagged `unchanged` as well.
+        """
+        self._recipe = recipe
+        previous_policy = self.resource_policy
+        try:
+            spec: Optional[ExtractionSpec] = recipe.options.get('extract')
+            static = self._serves_static(recipe, url)
+            if static and try_static:
+                result = self._fetch_static(recipe, url)
+                if result is not None:
+                    return result
+            incremental = bool(not static and url and self.fingerprints and recipe.options.get('incremental'))
+            if incremental:
+                revalidated = self.static_fetcher.revalidate(url, recipe.fingerprint_scope)
+                if revalidated:
+                    logger.debug("Skipping %s, the server reports it unchanged", url, url=url)
+                    return RecipeResult(revalidated, unchanged=True)
+            if 'blocking' in recipe.options:
+                self.set_resource_policy(ResourcePolicy.from_dict(recipe.options['blocking']))
+            if url:
+                self._document_validators = None
+                self.visit(url)
+            self.process_elements_chain(recipe.steps)
+            if self.resource_policy:
+                logger.debug(lambda: f"Resource blocking for {recipe.name}: {self.resource_policy.stats()}")
+            if self.snapshots and url:
+                self.snapshot(url)
+            result = RecipeResult(records=self.extract(spec) if spec else None)
+            return self._remember(url, recipe, result, self._validators(url, recipe) if incremental else None)
+        finally:
+            if self.resource_policy is not previous_policy:
+                self.set_resource_policy(previous_policy)
+            self._recipe = None
+
+    def run_static(self, recipe, url: Optional[str]) -> Optional[RecipeResult]:
+        """
+        Serve `url` for a step-less "static"/"auto" recipe over HTTP only. Return None when
+        the recipe or the page needs the browser. The driver is never touched, so this
+        works on a client whose browser was not started.
+        """
+        if not self._serves_static(recipe, url):
+            return None
+        self._recipe = recipe
+        try:
+            return self._fetch_static(recipe, url)
+        finally:
+            self._recipe = None
+
+    def _serves_static(self, recipe, url: Optional[str]) -> bool:
+        if not url or recipe.steps or recipe.options.get('fetch', 'browser') == 'browser':
+            return False
+        if recipe.options.get('extract') and not lxml_available():
+            # The records could not be extracted from the static page, so do not download it first.
+            logger.debug("lxml or cssselect is not installed, running %s in the browser", recipe.name, url=url)
+            return False
+        return True
+
+    def _fetch_static(self, recipe, url: str) -> Optional[RecipeResult]:
+        spec: Optional[ExtractionSpec] = recipe.options.get('extract')
+        with timed('static_fetch', **self._step_labels()):
+            page = self.static_fetcher.get(url, recipe.options.get('expect', ()), recipe.options.get('fetch', 'browser'),
+                                           key=recipe.name, scope=recipe.fingerprint_scope)
+        if page is None:
+            return None
+        if page.unchanged:
+            logger.debug("Skipping %s, unchanged since it was last processed", url, url=url)
+            return RecipeResult(page, unchanged=True)
+        if self.snapshots:
+            self.snapshots.save(url, page.html, page.url, recipe.name)
+        records = extract_from_html(page.html, spec, page.url) if spec else None
+        logger.debug("Served %s over HTTP in %.3fs", url, page.elapsed, url=url)
+        return self._remember(url, recipe, RecipeResult(page, records))
+
+    def _validators(self, url: str, recipe) -> Optional[Dict[str, str]]:
+        """
+        ETag / Last-Modified of the page the browser just loaded for `url`: taken from its own
+        document response with selenium-wire, otherwise asked once with a HEAD request. A page
+        already fingerprinted without validators comes from a server that sends none.
+        """
+        document = self._document_validators
+        if document and document[0] in (url, self.driver.current_url):
+            return document[1]
+        if WEBDRIVER_OPTIONS or self.fingerprints.get(url, recipe.fingerprint_scope) is not None:
+            return None
+        page = self.static_fetcher.head(url)
+        return page.headers if page else None
+
+    def _remember(self, url: Optional[str], recipe, result: RecipeResult,
+                  validators: Optional[Dict[str, str]] = None) -> RecipeResult:
+        """
+        Store the fingerprint of a processed page and flag the result if nothing changed.
+        Browser runs pass the ETag / Last-Modified headers of the loaded document as `validators`.
+        """
+        if not self.fingerprints or not url:
+            return result
+        page = result.page
+        source = page.headers if page else validators or {}
+        headers = {name.lower(): value for name, value in source.items()}
+        changed = self.fingerprints.update(
+            url,
+            etag=headers.get('etag'),
+            last_modified=headers.get('last-modified'),
+            content_hash=page.content_hash if page else None,
+            record_hash=record_hash(result.records) if result.records is not None else None,
+            scope=recipe.fingerprint_scope,
+        )
+        result.unchanged = not changed
+        return result
+
+    def snapshot(self, url: Optional[str] = None) -> Snapshot:
+        """Store the current DOM (as serialised by the browser) in the snapshot store."""
+        with timed('snapshot', **self._step_labels()):
+            final_url = self.driver.current_url
+            html = self.driver.page_source
+        recipe = self._recipe.name if self._recipe else None
+        return self.snapshots.save(url or final_url, html, final_url, recipe)
+
+    def extract(self, spec) -> List[Dict[str, Any]]:
+        """
+        Return the records described by `spec` (an ExtractionSpec or its dict form) from
+        the current page, evaluated in a single execute_script roundtrip.
+        """
+        if not isinstance(spec, ExtractionSpec):
+            spec = ExtractionSpec.from_dict(spec)
+        with timed('extract', **self._step_labels()):
+            return extract(self.driver, spec)
+
     def _intercept_request(self, request):
-        """Intercept the HTTP request and store it."""
+        """Intercept the HTTP request, store it and wake up any waiters."""
+        if self.resource_policy and self.resource_policy.intercept(request):
+            return
+        if self.network_cache:
+            self.network_cache.intercept(request)
         self.last_request = request
-        print(f"Intercepted request: {request.method} {request.url}")
+        self.requests.notify(request)
+
+    def _intercept_response(self, request, response):
+        """Hand the finished exchange to the network capture buffer, the network cache and the resource policy."""
+        if self.resource_policy:
+            self.resource_policy.record_response(request, response)
+        if self.capture:
+            self.capture.record(request, response)
+        if self.network_cache:
+            self.network_cache.record(request, response)
+        if self.fingerprints and (request.headers.get('Sec-Fetch-Dest') or '').lower() == 'document':
+            # Validators of the top-level document, stored with its fingerprint by incremental recipes.
+            self._document_validators = (request.url, {
+                name.lower(): value for name, value in response.headers.items()
+                if name.lower() in ('etag', 'last-modified')
+            })
 
     def get_last_request(self):
         """Return the last intercepted request."""
         return self.last_request
 
-    def perform_action_and_intercept(self, by, value):
-        """Perform an action and intercept the next HTTP request."""
-        self.last_request = None  # Reset the last request
-        self.click_element(by, value)
+    def wait_for_request(self, url=None, method=None, predicate=None, since=None, timeout=10):
+        """Block until an intercepted request matches the given URL regex, method and predicate."""
+        return self.requests.wait_for(url, method, predicate, since, timeout)
 
-        # Wait for the request to be intercepted
-        timeout = 10  # seconds
-        while self.last_request is None and timeout > 0:
-            timeout -= 1
-            time.sleep(1)
+    def perform_action_and_intercept(self, by, value, url=None, method=None, timeout=10):
+        """Perform an action and return the next HTTP request matching `url`/`method`."""
+        marker = self.requests.mark()
+        self.click_element(by, value)
 
-        if self.last_request:
-            print(f"Next request after action: {self.last_request.method} {self.last_request.url}")
+        request = self.requests.wait_for(url, method, since=marker, timeout=timeout)
+        if request:
+            logger.debug("Next request after action: %s %s", request.method, request.url)
         else:
-            print("No request intercepted after the action.")
+            logger.warning("No request intercepted after the action.")
+        return request
 
     def wait_for_element(self, by, value, timeout=10):
         """Wait for an element to become available."""
@@ -280,32 +645,31 @@ class BrowserClient:
             print("No alert present")
 
 
-    def save_cookies(self):
-        """Save cookies to a file."""
-        import pickle
-        base_url = self.get_base_url().replace('.', '_')
-        path = f'cookies_{base_url}.pkl'
-        with open(path, 'wb') as file:
-            pickle.dump(self.driver.get_cookies(), file)
+    def get_base_url(self) -> str:
+        """Return the host of the page currently loaded in the browser."""
+        return urlsplit(self.driver.current_url).netloc
 
-    def load_cookies(self):
-        """Load cookies from a file."""
-        import pickle
-        base_url = self.get_base_url().replace('.', '_')
-        path = f'cookies_{base_url}.pkl'
-        try:
-            with open(path, 'rb') as file:
-                cookies = pickle.load(file)
-                for cookie in cookies:
-                    self.driver.add_cookie(cookie)
-        except FileNotFoundError:
-            print("Cookie file not found")
+    def save_cookies(self, account: str = 'default', store: Optional[SessionStore] = None):
+        """Save the browser's cookies as the session of `account` on the current site."""
+        store = store or self.session_store
+        store.save(self.get_base_url(), account, self.driver.get_cookies())
+
+    def load_cookies(self, account: str = 'default', site: Optional[str] = None, store: Optional[SessionStore] = None) -> bool:
+        """Inject a stored session into the browser. Return False if none is stored."""
+        store = store or self.session_store
+        site = site or self.get_base_url()
+        if not store.inject(self.driver, site, account):
+            logger.warning("No stored session for %s@%s", account, site)
+            return False
+        self.cookie_epoch += 1
+        return True
 
     def scroll_to_element(self, by, value):
         """Scroll to an element using JavaScript."""
         element = self.wait_for_element(by, value)
         if element:
             self.driver.execute_script("arguments[0].scrollIntoView();", element)
+        return element
 
     def execute_js(self, script, *args):
         """Execute JavaScript on the page."""
@@ -320,11 +684,67 @@ class BrowserClient:
         except TimeoutException:
             print("AJAX requests did not complete within the timeout")
             
+    def is_alive(self) -> bool:
+        """Cheap liveness probe: a single WebDriver roundtrip against the current window."""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_window_handle
+            return True
+        except WebDriverException:
+            return False
+
+    def get_process_tree(self) -> List[psutil.Process]:
+        """Return the chromedriver process and every browser process it spawned."""
+        if not self.driver or not getattr(self.driver.service, 'process', None):
+            return []
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def get_memory_usage(self, metric: str = 'uss') -> float:
+        """
+        Return the memory of the whole browser process tree in MB. Chrome's processes share most
+        of their pages, so summing RSS counts them once per process; the default sums the unique
+        set size (USS) instead. `metric='pss'` (Linux only) splits shared pages between processes.
+        """
+        total = 0
+        for process in self.get_process_tree():
+            try:
+                total += getattr(process.memory_full_info(), metric)
+            except psutil.Error:
+                continue
+        return total / (1024 ** 2)
+
+    def kill(self):
+        """Forcefully kill the browser process tree (for hung browsers), then clean up the client."""
+        for process in reversed(self.get_process_tree()):
+            try:
+                process.kill()
+            except psutil.Error:
+                continue
+        try:
+            self.close_driver()
+        except Exception as e:
+            logger.debug("Ignoring error while closing killed browser: %s", e)
+            self.driver = None
+            self.initial_window_handle = None
+            self._release_profile()
+
     def close_driver(self):
+        if self._static_fetcher:
+            self._static_fetcher.close()
+            self._static_fetcher = None
+        if self.capture:
+            self.capture.flush()
         if self.driver:
             self.driver.quit()
             self.driver = None
             self.initial_window_handle = None
+            self.pages_visited = 0
+            self._release_profile()
             logger.info("Chrome Browser closed successfully!")
         else:
             logger.warning("Driver is not initialized!")
\ No newline at end of file
@@ -0,0 +1,106 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import random
+
+from .schema import parse_settle_selector
+from . import logger
+
+POLL_FREQUENCY = 0.1
+
+# Resolves once no DOM mutation has been observed for `quiet` ms, or with false after `timeout` ms.
+DOM_QUIET_SCRIPT = """
+const quiet = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+let quietTimer, limitTimer;
+const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => finish(true), quiet);
+});
+function finish(settled) {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(limitTimer);
+    done(settled);
+}
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+quietTimer = setTimeout(() => finish(true), quiet);
+limitTimer = setTimeout(() => finish(false), timeout);
+"""
+
+# Resolves once the document is complete, no fetch/XHR is in flight and no resource
+# has finished loading for `quiet` ms, or with false after `timeout` ms.
+NETWORK_IDLE_SCRIPT = """
+const quiet = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+if (!window.__scrapegoatPending) {
+    window.__scrapegoatPending = {count: 0};
+    const pending = window.__scrapegoatPending;
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            pending.count++;
+            return originalFetch.apply(this, arguments).finally(() => pending.count--);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        pending.count++;
+        this.addEventListener('loadend', () => pending.count--, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+}
+const started = performance.now();
+let resources = performance.getEntriesByType('resource').length, lastActivity = started;
+(function poll() {
+    const now = performance.now(), count = performance.getEntriesByType('resource').length;
+    if (count !== resources || window.__scrapegoatPending.count > 0) {
+        resources = count;
+        lastActivity = now;
+    }
+    if (document.readyState === 'complete' && now - lastActivity >= quiet) return done(true);
+    if (now - started >= timeout) return done(false);
+    setTimeout(poll, 50);
+})();
+"""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Capped exponential backoff with full jitter for the given (zero-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def wait_for_settle(client, element, previous_url: str) -> bool:
+    """
+    Wait until the page has settled after `element`'s action according to its
+    settle strategy. Return False if the strategy timed out.
+    """
+    strategy = element.settle or 'none'
+    driver = client.driver
+    timeout = element.settle_timeout
+    try:
+        if strategy == 'none':
+            return True
+        if strategy == 'dom_quiet':
+            return bool(driver.execute_async_script(DOM_QUIET_SCRIPT, element.quiet_ms, timeout * 1000))
+        if strategy == 'network_idle':
+            return bool(driver.execute_async_script(NETWORK_IDLE_SCRIPT, element.quiet_ms, timeout * 1000))
+        if strategy == 'url_change':
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(EC.url_changes(previous_url))
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+                lambda d: d.execute_script("return document.readyState") == 'complete'
+            )
+            return True
+        if strategy == 'element':
+            selector_type, selector_value = parse_settle_selector(element.settle_value)
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+                EC.presence_of_element_located((client._get_by_selector(selector_type), selector_value))
+            )
+            return True
+        logger.warning("Unknown settle strategy '%s', not waiting", strategy)
+        return True
+    except TimeoutException:
+        return False
+    except WebDriverException as e:
+        # E.g. the page navigated away while the in-page script was still waiting; the new
+        # document has not been checked, so do not report it as settled.
+        logger.warning("Settle wait for strategy '%s' failed: %s", strategy, e.msg)
+        return False
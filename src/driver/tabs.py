@@ -0,0 +1,339 @@
+from selenium.common.exceptions import (NoSuchElementException, StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+import time
+import uuid
+
+from .selenium import BrowserClient, UIElement
+from .settle import backoff_delay, parse_settle_selector
+from . import logger
+
+# Navigation is started from inside the page so the WebDriver call returns immediately.
+# The marker lets us tell the old (already complete) document apart from the new one.
+# Returns true for a fragment-only change, which stays in the same document and never loads.
+NAVIGATE_SCRIPT = """
+const target = new URL(arguments[0], window.location.href);
+const sameDocument = target.hash !== '' && target.href.split('#')[0] === window.location.href.split('#')[0];
+window.__scrapegoatTab = arguments[1];
+window.location.href = target.href;
+return sameDocument;
+"""
+READY_SCRIPT = "return document.readyState === 'complete' && window.__scrapegoatTab !== arguments[0];"
+# Non-blocking counterpart of the dom_quiet / network_idle settle scripts: records DOM mutations and
+# fetch/XHR/resource activity in the page and answers whether the page has been quiet for `quiet` ms.
+# With `reset` the quiet period starts now. A document without the tracker (e.g. after a navigation)
+# gets one installed and is not settled yet.
+ACTIVITY_SCRIPT = """
+const strategy = arguments[0], quiet = arguments[1], reset = arguments[2];
+const now = performance.now();
+let state = window.__scrapegoatActivity;
+if (!state) {
+    state = window.__scrapegoatActivity = {mutation: now, network: now, pending: 0,
+                                           resources: performance.getEntriesByType('resource').length};
+    new MutationObserver(() => { state.mutation = performance.now(); })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            state.pending++;
+            return originalFetch.apply(this, arguments).finally(() => { state.pending--; state.network = performance.now(); });
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.pending++;
+        this.addEventListener('loadend', () => { state.pending--; state.network = performance.now(); }, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+    reset = true;
+}
+if (reset) {
+    state.mutation = state.network = now;
+    return false;
+}
+if (strategy === 'network_idle') {
+    const count = performance.getEntriesByType('resource').length;
+    if (count !== state.resources || state.pending > 0) {
+        state.resources = count;
+        state.network = now;
+    }
+    return document.readyState === 'complete' && now - state.network >= quiet;
+}
+return now - state.mutation >= quiet;
+"""
+
+
+class TabJob:
+    """A URL to load in one of the scheduler's tabs, plus the chain to run once it has loaded."""
+
+    def __init__(self, url: str, elements: Optional[List[UIElement]] = None,
+                 callback: Optional[Callable[[BrowserClient, 'TabJob'], Any]] = None):
+        self.url = url
+        self.elements = elements or []
+        self.callback = callback
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.handle: Optional[str] = None
+        self.token: str = ''
+        self.same_document = False
+        self.started_at: float = 0.0
+        # Progress through the chain: the current step, what it waits for ('load', 'locate',
+        # 'backoff' or 'settle') and until when.
+        self.step = 0
+        self.phase = 'load'
+        self.deadline: float = 0.0
+        self.attempt = 0
+        self.previous_url = ''
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+class TabScheduler:
+    """
+    Multiplexes jobs over K tabs of a single BrowserClient.
+
+    Every idle tab is given a navigation without waiting for it. Each job's element
+    chain then runs as a small state machine: whenever a tab has to wait (for its
+    page to load, for a step's element to appear, for a retry backoff or for the
+    step's settle condition) the scheduler moves on to the other tabs and polls the
+    waiting one again on its next round, so a slow load or settle in one tab never
+    blocks the chains of the others. Steps are located and settled with
+    non-blocking polls that mirror process_element(): the same `timeout_after`,
+    retry policy and settle strategies, always in per-step (not batched) mode.
+    The client should be created with page_load_strategy "none" (or "eager") so
+    chromedriver does not block on the loads we are overlapping.
+
+    Only waits are overlapped: WebDriver commands still run one at a time, and a
+    job's callback runs synchronously once its chain is done.
+    """
+
+    def __init__(self, client: BrowserClient, tabs: int = 4, load_timeout: float = 30, poll_interval: float = 0.05):
+        self.client = client
+        self.tabs = tabs
+        self.load_timeout = load_timeout
+        self.poll_interval = poll_interval
+        self.handles: List[str] = []
+        self._pending: Deque[TabJob] = deque()
+        self._current_handle: Optional[str] = None
+
+    def submit(self, url: str, elements: Optional[List[UIElement]] = None,
+               callback: Optional[Callable[[BrowserClient, TabJob], Any]] = None) -> TabJob:
+        """Queue a job; it runs on the next call to `run()`."""
+        job = TabJob(url, elements, callback)
+        self._pending.append(job)
+        return job
+
+    def open_tabs(self) -> None:
+        """Open the scheduler's tabs next to the client's initial window."""
+        driver = self.client.driver
+        if not self.handles:
+            self.handles.append(self.client.initial_window_handle or driver.current_window_handle)
+        while len(self.handles) < self.tabs:
+            driver.switch_to.new_window('tab')
+            self.handles.append(driver.current_window_handle)
+        self._current_handle = driver.current_window_handle
+        logger.debug("Tab scheduler running on %d tabs", len(self.handles))
+
+    def run(self) -> List[TabJob]:
+        """Run every queued job, overlapping the waits of their chains across tabs, and return the finished jobs."""
+        self.open_tabs()
+        idle: List[str] = list(self.handles)
+        active: Dict[str, TabJob] = {}
+        finished: List[TabJob] = []
+
+        while self._pending or active:
+            while idle and self._pending:
+                handle, job = idle.pop(), self._pending.popleft()
+                if self._start(handle, job):
+                    active[handle] = job
+                else:
+                    finished.append(job)
+                    idle.append(handle)
+
+            progressed = False
+            for handle, job in list(active.items()):
+                if not self._advance(job):
+                    continue
+                del active[handle]
+                finished.append(job)
+                idle.append(handle)
+                progressed = True
+
+            if not progressed and active:
+                time.sleep(self.poll_interval)
+
+        return finished
+
+    def _switch_to(self, handle: str) -> None:
+        if self._current_handle != handle:
+            self.client.driver.switch_to.window(handle)
+            self._current_handle = handle
+
+    def _start(self, handle: str, job: TabJob) -> bool:
+        job.handle = handle
+        job.token = uuid.uuid4().hex
+        job.started_at = time.monotonic()
+        try:
+            self._switch_to(handle)
+            job.same_document = bool(self.client.driver.execute_script(NAVIGATE_SCRIPT, job.url, job.token))
+            self.client.pages_visited += 1
+            self.client.cookie_epoch += 1
+            return True
+        except WebDriverException as e:
+            logger.error("Failed to start loading %s in tab %s: %s", job.url, handle, e)
+            job.error = e
+            return False
+
+    def _advance(self, job: TabJob) -> bool:
+        """Move `job` forward until it has to wait; return True once it has finished."""
+        try:
+            self._switch_to(job.handle)
+        except WebDriverException as e:
+            logger.error("Lost the tab of %s: %s", job.url, e)
+            job.error = e
+            return True
+        while True:
+            now = time.monotonic()
+            if job.phase == 'load':
+                if not self._is_loaded(job):
+                    return False
+                if job.error:
+                    logger.warning("Tab job for %s failed: %s", job.url, job.error)
+                    return True
+                self._next_step(job, advance=False)
+            elif job.phase == 'backoff':
+                if now < job.deadline:
+                    return False
+                job.phase, job.deadline = 'locate', now + self.client.timeout_after
+            elif job.phase == 'locate':
+                if job.step >= len(job.elements):
+                    self._complete(job)
+                    return True
+                element = job.elements[job.step]
+                found = self._find(element.locator)
+                if found is None:
+                    if now < job.deadline:
+                        return False
+                    self._step_failed(job, element, NoSuchElementException(f"Element {element.locator[1]} not found"))
+                    continue
+                try:
+                    self._act(job, element, found)
+                except StaleElementReferenceException as e:
+                    self._step_failed(job, element, e)
+                    continue
+                except Exception as e:
+                    logger.error("Failed to process UIElement with selector '%s': %s", element.element_type, e)
+                    self._next_step(job)
+                    continue
+                job.phase, job.deadline = 'settle', time.monotonic() + element.settle_timeout
+            elif job.phase == 'settle':
+                element = job.elements[job.step]
+                if not self._settled(job, element):
+                    if now < job.deadline:
+                        return False
+                    logger.warning("UIElement %s did not settle (%s) within %ss", element.element_type, element.settle,
+                                   element.settle_timeout)
+                self._next_step(job)
+
+    def _next_step(self, job: TabJob, advance: bool = True) -> None:
+        if advance:
+            job.step += 1
+        job.attempt = 0
+        job.phase, job.deadline = 'locate', time.monotonic() + self.client.timeout_after
+
+    def _step_failed(self, job: TabJob, element: UIElement, error: Exception) -> None:
+        """Retry the current step after a backoff, or give up on it like process_element() does."""
+        retries = element.max_retries if element.max_retries is not None else self.client.max_retries
+        if job.attempt >= retries:
+            logger.error("Failed to process UIElement with selector '%s' after multiple retries: %s",
+                         element.element_type, error)
+            self._next_step(job)
+            return
+        delay = backoff_delay(job.attempt, element.backoff, element.backoff_max)
+        logger.warning("Error interacting with UIElement '%s': %s. Retrying in %.2fs (%d retries left).",
+                       element.element_type, error, delay, retries - job.attempt)
+        job.attempt += 1
+        job.phase, job.deadline = 'backoff', time.monotonic() + delay
+
+    def _find(self, locator) -> Optional[Any]:
+        try:
+            found = self.client.driver.find_elements(*locator)
+        except WebDriverException:
+            # The document is being replaced; look again on the next round.
+            return None
+        return found[0] if found else None
+
+    def _act(self, job: TabJob, element: UIElement, found: Any) -> None:
+        driver = self.client.driver
+        driver.execute_script("arguments[0].scrollIntoView();", found)
+        job.previous_url = driver.current_url if element.settle == 'url_change' else ''
+        found = self.client._perform_action(element, found)
+        if element.post_action:
+            self.client._perform_post_action(element, found)
+        if element.settle in ('dom_quiet', 'network_idle'):
+            driver.execute_script(ACTIVITY_SCRIPT, element.settle, element.quiet_ms, True)
+
+    def _settled(self, job: TabJob, element: UIElement) -> bool:
+        driver = self.client.driver
+        try:
+            if element.settle in ('', 'none'):
+                return True
+            if element.settle == 'url_change':
+                return (driver.current_url != job.previous_url
+                        and driver.execute_script("return document.readyState") == 'complete')
+            if element.settle == 'element':
+                selector_type, selector_value = parse_settle_selector(element.settle_value)
+                return self._find((self.client._get_by_selector(selector_type), selector_value)) is not None
+            if element.settle in ('dom_quiet', 'network_idle'):
+                return bool(driver.execute_script(ACTIVITY_SCRIPT, element.settle, element.quiet_ms, False))
+        except WebDriverException:
+            # Mid-navigation; poll again.
+            return False
+        logger.warning("Unknown settle strategy '%s', not waiting", element.settle)
+        return True
+
+    def _is_loaded(self, job: TabJob) -> bool:
+        if job.same_document:
+            # A fragment change fires no load and keeps the marker; the document is already complete.
+            return True
+        try:
+            if self.client.driver.execute_script(READY_SCRIPT, job.token):
+                return True
+        except WebDriverException:
+            # The old document is being torn down mid-navigation; poll again.
+            pass
+        if time.monotonic() - job.started_at > self.load_timeout:
+            job.error = TimeoutException(f"Page {job.url} did not load within {self.load_timeout} seconds")
+            try:
+                self.client.driver.execute_script("window.stop();")
+            except WebDriverException:
+                pass
+            return True
+        return False
+
+    def _complete(self, job: TabJob) -> None:
+        self.client.cookie_epoch += 1
+        try:
+            if job.callback:
+                job.result = job.callback(self.client, job)
+            logger.debug("Tab job for %s finished in %.2fs", job.url, time.monotonic() - job.started_at, url=job.url)
+        except Exception as e:
+            logger.error("Tab job for %s failed: %s", job.url, e)
+            job.error = e
+
+    def close_tabs(self) -> None:
+        """Close every tab opened by the scheduler and return to the initial window."""
+        driver = self.client.driver
+        for handle in self.handles[1:]:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except WebDriverException:
+                continue
+        if self.handles:
+            driver.switch_to.window(self.handles[0])
+        self.handles = self.handles[:1]
+        self._current_handle = self.handles[0] if self.handles else None
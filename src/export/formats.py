@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Sequence
+from xml.sax.saxutils import escape
+import csv
+import io
+import json
+import re
+
+INVALID_TAG_CHARACTERS = re.compile(r'[^\w.-]')
+
+
+class RecordFormat:
+    """Encodes batches of records for one file; `header()` and `footer()` frame every file."""
+
+    extension = ''
+
+    def header(self) -> str:
+        return ''
+
+    def encode(self, records: List[Dict[str, Any]]) -> str:
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        return ''
+
+
+class NdjsonFormat(RecordFormat):
+    """One JSON object per line."""
+
+    extension = '.ndjson'
+
+    def encode(self, records: List[Dict[str, Any]]) -> str:
+        return ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+
+
+class JsonFormat(RecordFormat):
+    """A single JSON array per file, still written a batch at a time."""
+
+    extension = '.json'
+
+    def __init__(self):
+        self._first = True
+
+    def header(self) -> str:
+        self._first = True
+        return '[\n'
+
+    def encode(self, records: List[Dict[str, Any]]) -> str:
+        text = ',\n'.join(json.dumps(record, ensure_ascii=False, default=str) for record in records)
+        if not self._first:
+            text = ',\n' + text
+        self._first = False
+        return text
+
+    def footer(self) -> str:
+        return '\n]\n'
+
+
+class CsvFormat(RecordFormat):
+    """
+    CSV with a header row in every file. Columns are `fields`, or the keys of the
+    first record written; other keys are dropped and nested values JSON-encoded.
+    """
+
+    extension = '.csv'
+
+    def __init__(self, fields: Optional[Sequence[str]] = None):
+        self.fields = list(fields) if fields else None
+
+    def header(self) -> str:
+        # Written lazily with the first batch when the columns come from the first record.
+        return self._row(self.fields) if self.fields else ''
+
+    @staticmethod
+    def _row(values: Sequence[Any]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        return json.dumps(value, ensure_ascii=False, default=str) if isinstance(value, (dict, list)) else value
+
+    def encode(self, records: List[Dict[str, Any]]) -> str:
+        prefix = ''
+        if self.fields is None:
+            self.fields = list(records[0])
+            prefix = self._row(self.fields)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([self._cell(record.get(field)) for field in self.fields])
+        return prefix + buffer.getvalue()
+
+
+class XmlFormat(RecordFormat):
+    """`<records><record><field>value</field>...</record>...</records>`; lists repeat the field element."""
+
+    extension = '.xml'
+
+    def __init__(self, root: str = 'records', item: str = 'record'):
+        self.root = root
+        self.item = item
+
+    def header(self) -> str:
+        return f'<?xml version="1.0" encoding="UTF-8"?>\n<{self.root}>\n'
+
+    def footer(self) -> str:
+        return f'</{self.root}>\n'
+
+    @staticmethod
+    def _tag(name: str) -> str:
+        tag = INVALID_TAG_CHARACTERS.sub('_', str(name)) or '_'
+        return tag if tag[0].isalpha() or tag[0] == '_' else f'_{tag}'
+
+    def _element(self, name: str, value: Any) -> str:
+        tag = self._tag(name)
+        if value is None:
+            return f'<{tag}/>'
+        if isinstance(value, list):
+            return ''.join(self._element(name, item) for item in value)
+        if isinstance(value, dict):
+            return f'<{tag}>' + ''.join(self._element(key, item) for key, item in value.items()) + f'</{tag}>'
+        return f'<{tag}>{escape(str(value))}</{tag}>'
+
+    def encode(self, records: List[Dict[str, Any]]) -> str:
+        return ''.join(f'  {self._element(self.item, record)}\n' for record in records)
+
+
+FORMATS = {
+    'ndjson': NdjsonFormat,
+    'jsonl': NdjsonFormat,
+    'json': JsonFormat,
+    'csv': CsvFormat,
+    'xml': XmlFormat,
+}
+
+
+def get_format(name: str, **options) -> RecordFormat:
+    if name not in FORMATS:
+        raise ValueError(f"Unknown export format '{name}', expected one of {', '.join(FORMATS)}")
+    return FORMATS[name](**options)
@@ -0,0 +1,239 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+import gzip
+import io
+import os
+import queue
+import threading
+import time
+
+from crawler.bloom import BloomFilter
+from .formats import RecordFormat, get_format
+from . import logger
+
+Record = Dict[str, Any]
+Stage = Callable[[Iterable[Record]], Iterable[Record]]
+
+
+class FileSink:
+    """
+    Streams records into files of one format, a batch at a time.
+
+    Records are buffered and encoded in batches of `batch_size`, or when
+    `flush_interval` seconds have passed since the last flush. With `max_bytes`
+    (on disk, i.e. after compression) or `max_seconds` set, the output rotates to
+    a new numbered file (`products-00001.ndjson.gz`, ...). Files are written as
+    `<name>.part` and renamed once complete, so readers never see a partial file.
+    """
+
+    def __init__(self, path: str, record_format: Union[str, RecordFormat] = 'ndjson', batch_size: int = 500,
+                 flush_interval: float = 5.0, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 compress: bool = False):
+        self.format = get_format(record_format) if isinstance(record_format, str) else record_format
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.files: List[str] = []
+        self.records_written = 0
+        self._buffer: List[Record] = []
+        self._index = 0
+        self._raw: Optional[io.BufferedWriter] = None
+        self._stream: Optional[io.TextIOWrapper] = None
+        self._current: Optional[str] = None
+        self._opened_at = 0.0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'FileSink':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _file_name(self) -> str:
+        stem, extension = os.path.splitext(self.path)
+        extension = extension or self.format.extension
+        if self.max_bytes or self.max_seconds:
+            stem = f"{stem}-{self._index:05d}"
+        return stem + extension + ('.gz' if self.compress else '')
+
+    def _open(self) -> None:
+        self._current = self._file_name()
+        directory = os.path.dirname(os.path.abspath(self._current))
+        os.makedirs(directory, exist_ok=True)
+        self._raw = open(self._current + '.part', 'wb')
+        binary = gzip.GzipFile(fileobj=self._raw, mode='wb') if self.compress else self._raw
+        self._stream = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+        self._stream.write(self.format.header())
+        self._opened_at = time.monotonic()
+
+    def _finish_file(self) -> None:
+        self._stream.write(self.format.footer())
+        self._stream.close()
+        if self.compress:
+            self._raw.close()
+        os.replace(self._current + '.part', self._current)
+        self.files.append(self._current)
+        logger.debug("Finished export file %s", self._current)
+        self._raw = self._stream = self._current = None
+        self._index += 1
+
+    def _rotation_due(self) -> bool:
+        if self.max_bytes and self._raw.tell() >= self.max_bytes:
+            return True
+        return bool(self.max_seconds and time.monotonic() - self._opened_at >= self.max_seconds)
+
+    def write(self, record: Record) -> None:
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def write_many(self, records: Iterable[Record]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def flush_if_due(self) -> None:
+        """Flush a partial batch once `flush_interval` has passed; for writers that go idle."""
+        with self._lock:
+            if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if self._stream is None:
+            self._open()
+        self._stream.write(self.format.encode(self._buffer))
+        self._stream.flush()
+        self.records_written += len(self._buffer)
+        self._buffer.clear()
+        if self._rotation_due():
+            self._finish_file()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._stream is not None:
+                self._finish_file()
+
+
+class QueuedSink:
+    """
+    Runs a FileSink on its own writer thread behind a bounded queue.
+
+    Scrapers call `put()`, which blocks while `max_pending` records are waiting,
+    so a slow disk slows the producers down instead of growing memory. An error
+    in the writer thread is raised from the next `put()` or from `close()`.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, sink: FileSink, max_pending: int = 10_000):
+        self.sink = sink
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="export-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'QueuedSink':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=self.sink.flush_interval)
+            except queue.Empty:
+                self._guard(self.sink.flush_if_due)
+                continue
+            if record is self._CLOSE:
+                return
+            if self._error is None:
+                self._guard(self.sink.write, record)
+
+    def _guard(self, function: Callable, *args) -> None:
+        try:
+            function(*args)
+        except Exception as e:
+            logger.error("Export writer failed: %s", e)
+            self._error = e
+
+    def put(self, record: Record, timeout: Optional[float] = None) -> None:
+        """Queue a record, blocking up to `timeout` seconds (forever by default) while the queue is full."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(record, timeout=timeout)
+
+    def put_many(self, records: Iterable[Record]) -> None:
+        for record in records:
+            self.put(record)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Write everything still queued, finish the current file and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+        if self._error is None:
+            self._guard(self.sink.close)
+        if self._error is not None:
+            raise self._error
+
+
+def pipeline(records: Iterable[Record], *stages: Stage) -> Iterator[Record]:
+    """Chain generator stages over a stream of records; nothing is materialised."""
+    stream: Iterable[Record] = records
+    for stage in stages:
+        stream = stage(stream)
+    return iter(stream)
+
+
+def project(fields: Iterable[str], renames: Optional[Dict[str, str]] = None) -> Stage:
+    """Stage keeping only `fields`, optionally renaming some of them."""
+    fields = list(fields)
+    renames = renames or {}
+
+    def stage(records: Iterable[Record]) -> Iterator[Record]:
+        for record in records:
+            yield {renames.get(field, field): record.get(field) for field in fields}
+    return stage
+
+
+def unique(key: Union[str, Callable[[Record], Any]], capacity: int = 10_000_000, error_rate: float = 0.0001) -> Stage:
+    """
+    Stage dropping records whose key was already seen. Uses a Bloom filter so
+    memory stays bounded on long crawls; a rare false positive drops a new record.
+    """
+    key_of = key if callable(key) else (lambda record: record.get(key))
+
+    def stage(records: Iterable[Record]) -> Iterator[Record]:
+        seen = BloomFilter(capacity, error_rate)
+        for record in records:
+            if seen.add(str(key_of(record))):
+                yield record
+    return stage
+
+
+def open_sink(path: str, record_format: Optional[str] = None, **options) -> FileSink:
+    """Create a FileSink, inferring the format from the extension of `path` (default NDJSON)."""
+    if record_format is None:
+        name = path[:-3] if path.endswith('.gz') else path
+        record_format = os.path.splitext(name)[1].lstrip('.').lower() or 'ndjson'
+        if path.endswith('.gz'):
+            options.setdefault('compress', True)
+    if options.get('compress') and path.endswith('.gz'):
+        path = path[:-3]
+    return FileSink(path, record_format, **options)
@@ -101,11 +101,11 @@ def display_system_info(tab1, logger):
     max_browsers_label.pack(anchor="w", pady=2)
 
     # Log the information
-    logger.info(f"System Info: {results['system_info']}")
-    logger.info(f"Estimated memory usage per Chrome browser/tab: {results['avg_memory_per_browser_mb']:.2f} MB")
-    logger.info(f"Max browsers by available RAM: {results['max_browsers_by_ram']}")
-    logger.info(f"Max browsers by CPU cores: {results['max_browsers_by_cpu']}")
-    logger.info(f"Max browsers that can be opened simultaneously: {results['max_browsers']}")
+    logger.info("System Info: %s", results['system_info'])
+    logger.info("Estimated memory usage per Chrome browser/tab: %.2f MB", results['avg_memory_per_browser_mb'])
+    logger.info("Max browsers by available RAM: %s", results['max_browsers_by_ram'])
+    logger.info("Max browsers by CPU cores: %s", results['max_browsers_by_cpu'])
+    logger.info("Max browsers that can be opened simultaneously: %s", results['max_browsers'])
 
 def create_chrome_test_button(tab1, client):
     chrome_test_button = ttk.Button(tab1, text="Test Chrome", command=lambda: test_chrome(client))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+if __package__ in (None, ''):
+    # Allow `python src/scrapegoat ...` in addition to `python -m scrapegoat` from src/
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapegoat.cli import main
+
+sys.exit(main())
@@ -0,0 +1,436 @@
+"""
+Headless command line entry point.
+
+Only the standard library is imported at module load; each command imports the
+parts of ScrapeGoat it needs, so `--help` and `info` never load Selenium and no
+command ever loads Tk.
+"""
+from typing import Any, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from . import __version__
+
+
+def _configure_logging(args: argparse.Namespace) -> None:
+    # Must run before any other ScrapeGoat module creates the Logger singleton.
+    from utils.logger import Logger
+    Logger(log_level=getattr(logging, args.log_level.upper()), log_file=args.log_file, stream=sys.stderr,
+           log_format=args.log_format, use_queue=True)
+
+
+def _choose(kind: str, requested: Optional[str], available: List[str]) -> str:
+    if requested:
+        if requested not in available:
+            raise SystemExit(f"Unknown {kind} '{requested}', expected one of: {', '.join(available)}")
+        return requested
+    if len(available) != 1:
+        raise SystemExit(f"Please choose a {kind} with --{kind}: {', '.join(available)}")
+    return available[0]
+
+
+def _load_definition(source: str, site: Optional[str], page: Optional[str]) -> Tuple[str, str, Any]:
+    """Read and validate one page definition, returning (site, page, definition)."""
+    from driver.recipes import RecipeError, RecipeRegistry, validate_site
+    try:
+        if source == '-':
+            document = json.load(sys.stdin)
+            for site_name, pages in document.items():
+                validate_site(site_name, pages)
+            site = _choose('site', site, sorted(document))
+            page = _choose('page', page, sorted(document[site]))
+            return site, page, document[site][page]
+        registry = RecipeRegistry(source)
+        site = _choose('site', site, registry.sites())
+        page = _choose('page', page, registry.pages(site))
+        return site, page, registry.definition(site, page)
+    except (RecipeError, ValueError, OSError) as e:
+        raise SystemExit(f"Invalid recipe {source}: {e}")
+
+
+def _load_recipe(source: str, site: Optional[str], page: Optional[str]):
+    from driver.recipes import compile_recipe
+    site, page, definition = _load_definition(source, site, page)
+    try:
+        return compile_recipe(site, page, definition)
+    except ValueError as e:
+        raise SystemExit(f"Invalid recipe {source}: {e}")
+
+
+def _read_urls(args: argparse.Namespace) -> List[str]:
+    urls = list(args.url or [])
+    if args.urls_file:
+        if args.urls_file == '-' and args.recipe == '-':
+            raise SystemExit("The recipe and the URL list cannot both be read from stdin")
+        stream = sys.stdin if args.urls_file == '-' else open(args.urls_file, 'r')
+        with stream:
+            urls += [line.strip() for line in stream if line.strip() and not line.startswith('#')]
+    return urls
+
+
+def _open_export(args: argparse.Namespace):
+    if not args.export:
+        return None
+    from export.sinks import QueuedSink, open_sink
+    return QueuedSink(open_sink(
+        args.export, args.export_format,
+        max_bytes=int(args.export_rotate_mb * 1024 * 1024) if args.export_rotate_mb else None,
+        max_seconds=args.export_rotate_minutes * 60 if args.export_rotate_minutes else None,
+    ))
+
+
+def command_run(args: argparse.Namespace) -> int:
+    recipe = _load_recipe(args.recipe, args.site, args.page)
+    urls = _read_urls(args)
+    if not urls:
+        raise SystemExit("Nothing to do: pass --url or --urls-file")
+
+    from concurrent.futures import ThreadPoolExecutor
+    from driver.pool import BrowserPool
+    from driver.selenium import BrowserClient
+    from driver import logger
+    from utils.logger import log_context
+
+    output_lock = threading.Lock()
+    browsers = max(1, min(args.browsers, len(urls)))
+    sink = _open_export(args)
+
+    # Step-less "static"/"auto" recipes are tried over HTTP first, on browser-less clients (one per thread),
+    # so the browser pool is only started once a page actually needs a browser.
+    static_capable = not recipe.steps and recipe.options.get('fetch', 'browser') != 'browser'
+    pool: Optional[BrowserPool] = None
+    pool_lock = threading.Lock()
+    fetchers: List[BrowserClient] = []
+    local = threading.local()
+
+    def browser_pool() -> BrowserPool:
+        nonlocal pool
+        with pool_lock:
+            if pool is None:
+                started_pool = BrowserPool(size=browsers, **client_options)
+                try:
+                    started_pool.start()
+                except Exception:
+                    started_pool.close()
+                    raise
+                pool = started_pool
+            return pool
+
+    def fetcher() -> BrowserClient:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = BrowserClient(**client_options)
+            with pool_lock:
+                fetchers.append(client)
+        return client
+
+    def run_one(url: str) -> bool:
+        started = time.perf_counter()
+        result = {'url': url, 'recipe': recipe.name}
+        try:
+            with log_context(job=recipe.name, worker=threading.current_thread().name, url=url):
+                outcome = fetcher().run_static(recipe, url) if static_capable else None
+                if outcome is not None:
+                    result.update(final_url=outcome.page.url, static=True)
+                else:
+                    with browser_pool().lease() as client:
+                        outcome = client.run_recipe(recipe, url, try_static=False)
+                        if outcome.static:
+                            result.update(final_url=outcome.page.url, static=True)
+                        else:
+                            result.update(final_url=client.driver.current_url, title=client.driver.title, static=False)
+                if outcome.unchanged:
+                    result['unchanged'] = True
+                elif outcome.records is not None:
+                    if sink:
+                        sink.put_many(outcome.records)
+                        result['records'] = len(outcome.records)
+                    else:
+                        result['records'] = outcome.records
+            result['ok'] = True
+        except Exception as e:
+            logger.error("Recipe %s failed on %s: %s", recipe.name, url, e, job=recipe.name, url=url)
+            result.update(ok=False, error=str(e))
+        result['elapsed'] = round(time.perf_counter() - started, 3)
+        with output_lock:
+            sys.stdout.write(json.dumps(result) + '\n')
+            sys.stdout.flush()
+        return result['ok']
+
+    exporter = None
+    if args.metrics_port is not None or args.metrics_file:
+        from driver.metrics import MetricsExporter
+        exporter = MetricsExporter(port=args.metrics_port, path=args.metrics_file)
+        exporter.start()
+    snapshots = None
+    if args.snapshots:
+        from storage.snapshots import SnapshotStore
+        snapshots = SnapshotStore(args.snapshots)
+    network_cache = None
+    if args.network_cache:
+        from driver.netcache import NetworkCache
+        network_cache = NetworkCache(args.network_cache, mode=args.network_mode, ignore_params=args.ignore_param)
+    fingerprints = None
+    if args.fingerprints:
+        from storage.fingerprints import FingerprintIndex
+        fingerprints = FingerprintIndex(args.fingerprints)
+    profiler = None
+    if args.profile_commands:
+        from driver.profiler import CommandProfiler
+        profiler = CommandProfiler()
+    client_options = dict(browser_headless=not args.headed, profiler=profiler, fingerprints=fingerprints,
+                          snapshots=snapshots, network_cache=network_cache,
+                          execution_mode='batched' if args.batched else 'steps')
+    try:
+        with ThreadPoolExecutor(max_workers=browsers) as executor:
+            results = list(executor.map(run_one, urls))
+    finally:
+        for client in fetchers:
+            client.close_driver()
+        if pool:
+            pool.close()
+        if sink:
+            sink.close()
+        if exporter:
+            exporter.stop()
+        if network_cache:
+            logger.info("Network cache: %(hits)d replayed, %(misses)d not recorded, %(recorded)d recorded",
+                        network_cache.stats())
+        if profiler:
+            sys.stderr.write(profiler.format_report() + '\n')
+            if args.profile_commands != '-':
+                profiler.dump(args.profile_commands)
+    return 0 if all(results) else 1
+
+
+def command_replay(args: argparse.Namespace) -> int:
+    recipe = _load_recipe(args.recipe, args.site, args.page)
+    spec = recipe.options.get('extract')
+    if spec is None:
+        raise SystemExit(f"Recipe {recipe.name} has no extract spec to replay")
+
+    from storage.snapshots import SnapshotStore, replay
+    store = SnapshotStore(args.snapshots)
+    snapshots = store.snapshots(recipe=None if args.any_recipe else recipe.name, latest_only=not args.all_versions)
+    sink = _open_export(args)
+    failed = 0
+    try:
+        for snapshot, records in replay(store, spec, snapshots, processes=args.processes):
+            result = snapshot.to_dict()
+            if isinstance(records, Exception):
+                failed += 1
+                result.update(ok=False, error=str(records))
+            elif sink:
+                sink.put_many(records)
+                result.update(ok=True, records=len(records))
+            else:
+                result.update(ok=True, records=records)
+            sys.stdout.write(json.dumps(result) + '\n')
+    finally:
+        if sink:
+            sink.close()
+    return 1 if failed else 0
+
+
+def command_enqueue(args: argparse.Namespace) -> int:
+    site, page, definition = _load_definition(args.recipe, args.site, args.page)
+    urls = _read_urls(args)
+    if not urls:
+        raise SystemExit("Nothing to do: pass --url or --urls-file")
+    from crawler.jobs import open_queue
+    job_queue = open_queue(args.queue)
+    try:
+        ids = job_queue.put_many(({'site': site, 'page': page, 'definition': definition, 'url': url} for url in urls),
+                                 queue=args.queue_name, priority=args.priority, max_attempts=args.max_attempts)
+        sys.stdout.write(json.dumps({'queued': len(ids), 'first_id': ids[0], 'last_id': ids[-1],
+                                     **job_queue.stats(args.queue_name)}) + '\n')
+    finally:
+        job_queue.close()
+    return 0
+
+
+def command_worker(args: argparse.Namespace) -> int:
+    from crawler.workers import Worker, WorkerSupervisor
+    options = dict(queue_address=args.queue, queue=args.queue_name, browsers=args.browsers,
+                   visibility_timeout=args.visibility_timeout, max_job_runtime=args.max_job_runtime,
+                   exit_when_idle=args.exit_when_idle,
+                   browser_headless=not args.headed, execution_mode='batched' if args.batched else 'steps')
+    if args.processes == 1:
+        Worker(**options).run()
+    else:
+        WorkerSupervisor(args.processes, **options).run()
+    return 0
+
+
+def command_results(args: argparse.Namespace) -> int:
+    from crawler.jobs import open_queue
+    job_queue = open_queue(args.queue)
+    try:
+        after_id = args.after
+        while True:
+            jobs = job_queue.results(args.queue_name, args.state, after_id)
+            for job in jobs:
+                sys.stdout.write(json.dumps(job) + '\n')
+            if len(jobs) < 1000:
+                break
+            after_id = jobs[-1]['id']
+        sys.stderr.write(json.dumps(job_queue.stats(args.queue_name)) + '\n')
+    finally:
+        job_queue.close()
+    return 0
+
+
+def command_broker(args: argparse.Namespace) -> int:
+    from crawler.jobs import BROKER_KEY_ENV, BrokerServer, SQLiteJobQueue
+    try:
+        server = BrokerServer(SQLiteJobQueue(args.db), host=args.host, port=args.port)
+        if server.generated_key:
+            sys.stderr.write(f"No {BROKER_KEY_ENV} set; workers must use {BROKER_KEY_ENV}={server.generated_key}\n")
+            sys.stderr.flush()
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def command_validate(args: argparse.Namespace) -> int:
+    from driver.recipes import RecipeError, RecipeRegistry, validate_site
+    try:
+        if args.recipe == '-':
+            document = json.load(sys.stdin)
+            for site, pages in document.items():
+                validate_site(site, pages)
+            summary = {site: sorted(pages) for site, pages in document.items()}
+        else:
+            registry = RecipeRegistry(args.recipe)
+            summary = {site: registry.pages(site) for site in registry.sites()}
+    except (RecipeError, ValueError, OSError) as e:
+        print(f"Invalid recipe {args.recipe}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def command_info(args: argparse.Namespace) -> int:
+    from utils.helpers import calculate_max_browsers_or_tabs
+    print(json.dumps(calculate_max_browsers_or_tabs(), indent=2, default=str))
+    return 0
+
+
+def _add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--export', metavar='FILE',
+                        help='stream extracted records to FILE (.ndjson, .json, .csv or .xml, optionally .gz) '
+                             'instead of printing them')
+    parser.add_argument('--export-format', choices=['ndjson', 'json', 'csv', 'xml'],
+                        help='export format when it cannot be inferred from the file name')
+    parser.add_argument('--export-rotate-mb', type=float, help='start a new export file after this many MB')
+    parser.add_argument('--export-rotate-minutes', type=float, help='start a new export file after this many minutes')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='scrapegoat', description='Run ScrapeGoat recipes without the GUI.')
+    parser.add_argument('--version', action='version', version=f"%(prog)s {__version__}")
+    parser.add_argument('--log-level', default='info', choices=['debug', 'info', 'warning', 'error'])
+    parser.add_argument('--log-file', help='log file (default: scrapegoat.log in the data directory, '
+                                           '$SCRAPEGOAT_DATA_DIR or ~/.local/share/scrapegoat)')
+    parser.add_argument('--log-format', default='text', choices=['text', 'json'],
+                        help='log as colored text or as JSON lines with job/worker/url fields')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run a recipe against one or more URLs')
+    run.add_argument('recipe', help="recipe JSON file or directory, or '-' to read it from stdin")
+    run.add_argument('--site', help='site of the recipe file to run')
+    run.add_argument('--page', help='page of the site to run')
+    run.add_argument('--url', action='append', help='URL to run the recipe on (repeatable)')
+    run.add_argument('--urls-file', help="file with one URL per line, or '-' for stdin")
+    run.add_argument('--browsers', type=int, default=1, help='number of browsers to run in parallel')
+    run.add_argument('--batched', action='store_true', help='run element steps as batched in-page scripts')
+    run.add_argument('--headed', action='store_true', help='show the browser window')
+    run.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this local port')
+    run.add_argument('--metrics-file', help='periodically write Prometheus metrics to this file')
+    _add_export_arguments(run)
+    run.add_argument('--snapshots', metavar='DIR', help='keep the HTML of every processed page for replay')
+    run.add_argument('--network-cache', metavar='DIR',
+                     help='record responses to DIR and/or replay them from it instead of the network')
+    run.add_argument('--network-mode', choices=['record', 'replay', 'auto'], default='auto',
+                     help='record everything, replay only (unrecorded requests fail) or replay hits and record misses')
+    run.add_argument('--ignore-param', action='append', default=[], metavar='NAME',
+                     help='query parameter (e.g. a cache buster) left out when matching recorded requests')
+    run.add_argument('--fingerprints', metavar='DB',
+                     help='SQLite index of processed pages; unchanged pages are skipped and not exported')
+    run.add_argument('--profile-commands', nargs='?', const='-', metavar='REPORT',
+                     help='time every WebDriver command; print a report to stderr and optionally write it as JSON')
+    run.set_defaults(handler=command_run)
+
+    replay = commands.add_parser('replay', help="re-run a recipe's extract spec on stored snapshots, without a browser")
+    replay.add_argument('recipe', help="recipe JSON file or directory, or '-' to read it from stdin")
+    replay.add_argument('--site', help='site of the recipe file to replay')
+    replay.add_argument('--page', help='page of the site to replay')
+    replay.add_argument('--snapshots', metavar='DIR', required=True, help='snapshot store written by run --snapshots')
+    replay.add_argument('--processes', type=int, help='extraction processes (default: one per CPU)')
+    replay.add_argument('--all-versions', action='store_true', help='replay every capture, not only the latest per URL')
+    replay.add_argument('--any-recipe', action='store_true', help='replay snapshots captured by any recipe')
+    _add_export_arguments(replay)
+    replay.set_defaults(handler=command_replay)
+
+    queue_help = ("job queue: a SQLite file (default: jobs.db in the data directory), "
+                  "sqlite://PATH or broker://HOST:PORT")
+
+    enqueue = commands.add_parser('enqueue', help='queue recipe jobs for worker processes')
+    enqueue.add_argument('recipe', help="recipe JSON file or directory, or '-' to read it from stdin")
+    enqueue.add_argument('--site', help='site of the recipe file to run')
+    enqueue.add_argument('--page', help='page of the site to run')
+    enqueue.add_argument('--url', action='append', help='URL to run the recipe on (repeatable)')
+    enqueue.add_argument('--urls-file', help="file with one URL per line, or '-' for stdin")
+    enqueue.add_argument('--queue', help=queue_help)
+    enqueue.add_argument('--queue-name', default='default', help='named queue within the backend')
+    enqueue.add_argument('--priority', type=int, default=0, help='jobs with a higher priority are leased first')
+    enqueue.add_argument('--max-attempts', type=int, default=3, help='attempts before a job is marked failed')
+    enqueue.set_defaults(handler=command_enqueue)
+
+    worker = commands.add_parser('worker', help='run queued jobs on worker processes, each with its own browsers')
+    worker.add_argument('--queue', help=queue_help)
+    worker.add_argument('--queue-name', default='default', help='named queue within the backend')
+    worker.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='worker processes (default: one per CPU)')
+    worker.add_argument('--browsers', type=int, default=1, help='browsers per worker process')
+    worker.add_argument('--visibility-timeout', type=float, default=300,
+                        help='seconds a job stays leased to a worker that stopped reporting')
+    worker.add_argument('--max-job-runtime', type=float, default=900,
+                        help='seconds after which a running job is considered wedged and its browser killed')
+    worker.add_argument('--exit-when-idle', action='store_true', help='exit once the queue has no pending or leased jobs')
+    worker.add_argument('--batched', action='store_true', help='run element steps as batched in-page scripts')
+    worker.add_argument('--headed', action='store_true', help='show the browser windows')
+    worker.set_defaults(handler=command_worker)
+
+    results = commands.add_parser('results', help='print finished jobs as JSON lines')
+    results.add_argument('--queue', help=queue_help)
+    results.add_argument('--queue-name', default='default', help='named queue within the backend')
+    results.add_argument('--state', choices=['done', 'failed', 'pending', 'leased'], help='only jobs in this state')
+    results.add_argument('--after', type=int, default=0, metavar='ID', help='only jobs with an id above ID')
+    results.set_defaults(handler=command_results)
+
+    broker = commands.add_parser('broker', help='serve a SQLite job queue to workers on other machines')
+    broker.add_argument('--db', help='SQLite job queue to serve (default: jobs.db in the data directory)')
+    broker.add_argument('--host', default='127.0.0.1',
+                        help='interface to listen on; workers authenticate with SCRAPEGOAT_BROKER_KEY (generated and printed when unset)')
+    broker.add_argument('--port', type=int, default=7463, help='port to listen on')
+    broker.set_defaults(handler=command_broker)
+
+    validate = commands.add_parser('validate', help='validate a recipe file')
+    validate.add_argument('recipe', help="recipe JSON file or directory, or '-' to read it from stdin")
+    validate.set_defaults(handler=command_validate)
+
+    info = commands.add_parser('info', help='show system capacity for browsers')
+    info.set_defaults(handler=command_info)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    _configure_logging(args)
+    return args.handler(args)
@@ -0,0 +1,48 @@
+from typing import Any, List
+import os
+import sqlite3
+import threading
+
+
+class ThreadConnections:
+    """
+    The SQLite connections of a store: one per thread, in WAL mode.
+
+    Every connection opened is tracked, so `close()` closes those of all threads,
+    not only the caller's. A thread that uses the store again afterwards opens a
+    new connection.
+    """
+
+    def __init__(self, path: str, **connect_options: Any):
+        self.path = path
+        self.connect_options = connect_options
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._generation = 0
+
+    def get(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use."""
+        local = self._local
+        connection = getattr(local, 'connection', None)
+        if connection is None or local.generation != self._generation:
+            # Each connection is still only used by the thread that opened it; the check is
+            # off so that close() may close it from another thread.
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, **self.connect_options)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self._lock:
+                self._connections.append(connection)
+                local.generation = self._generation
+            local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close the connections of every thread."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
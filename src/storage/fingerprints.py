@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import sqlite3
+import time
+
+from utils.filesystem import get_data_path
+from .database import ThreadConnections
+from . import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    url TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    record_hash TEXT,
+    checked_at REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (url, scope)
+)
+"""
+
+
+def content_hash(html: str) -> str:
+    """Hash of a page body, insensitive to whitespace-only changes."""
+    return hashlib.blake2b(' '.join(html.split()).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def record_hash(records: List[Dict[str, Any]]) -> str:
+    """Order-sensitive hash of extracted records, insensitive to key order."""
+    payload = json.dumps(records, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Fingerprint:
+    """What the index remembers about a URL from the last time it was processed in a scope."""
+
+    __slots__ = ('url', 'scope', 'etag', 'last_modified', 'content_hash', 'record_hash', 'checked_at', 'changed_at')
+
+    def __init__(self, url: str, scope: str, etag: Optional[str], last_modified: Optional[str],
+                 content_hash: Optional[str], record_hash: Optional[str], checked_at: float, changed_at: float):
+        self.url = url
+        self.scope = scope
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.record_hash = record_hash
+        self.checked_at = checked_at
+        self.changed_at = changed_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FingerprintIndex:
+    """
+    SQLite index of (URL, scope) -> ETag, Last-Modified, content hash and extracted-record hash.
+
+    Used to send conditional requests and to tell whether a page (or at least the
+    records extracted from it) changed since it was last processed. The scope names
+    what processed it (see Recipe.fingerprint_scope), so a changed recipe or extract
+    spec starts from scratch instead of skipping pages it never processed. Only call
+    `update()` once a page has been fully processed, so a failed run is retried.
+    Shares the SessionStore's concurrency model: WAL mode, one connection per thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_data_path('fingerprints.db')
+        self._connections = ThreadConnections(self.path)
+        with self._connection() as connection:
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(fingerprints)')]
+            if columns and 'scope' not in columns:
+                # Fingerprints are only a cache, so an index from before scopes is simply rebuilt.
+                logger.info("Discarding fingerprints in %s stored without a recipe scope", path)
+                connection.execute('DROP TABLE fingerprints')
+            connection.execute(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, url: str, scope: str = '') -> Optional[Fingerprint]:
+        row = self._connection().execute(
+            'SELECT url, scope, etag, last_modified, content_hash, record_hash, checked_at, changed_at '
+            'FROM fingerprints WHERE url = ? AND scope = ?', (url, scope)
+        ).fetchone()
+        return Fingerprint(*row) if row else None
+
+    def conditional_headers(self, url: str, scope: str = '') -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for `url`, empty if it was never processed in `scope`."""
+        fingerprint = self.get(url, scope)
+        return fingerprint.conditional_headers() if fingerprint else {}
+
+    def update(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+               content_hash: Optional[str] = None, record_hash: Optional[str] = None, scope: str = '') -> bool:
+        """
+        Remember a processed page and return whether it changed since the last time.
+        The record hash decides when given, then the content hash; unknown URLs count
+        as changed. Values passed as None keep what was stored before.
+        """
+        now = time.time()
+        with self._connection() as connection:
+            previous = connection.execute(
+                'SELECT content_hash, record_hash FROM fingerprints WHERE url = ? AND scope = ?', (url, scope)
+            ).fetchone()
+            if previous is None:
+                changed = True
+            elif record_hash is not None:
+                changed = record_hash != previous[1]
+            elif content_hash is not None:
+                changed = content_hash != previous[0]
+            else:
+                changed = True
+            connection.execute(
+                'INSERT INTO fingerprints (url, scope, etag, last_modified, content_hash, record_hash, checked_at, changed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (url, scope) DO UPDATE SET '
+                'etag = COALESCE(excluded.etag, etag), '
+                'last_modified = COALESCE(excluded.last_modified, last_modified), '
+                'content_hash = COALESCE(excluded.content_hash, content_hash), '
+                'record_hash = COALESCE(excluded.record_hash, record_hash), '
+                'checked_at = excluded.checked_at, '
+                'changed_at = CASE WHEN ? THEN excluded.changed_at ELSE changed_at END',
+                (url, scope, etag, last_modified, content_hash, record_hash, now, now, changed),
+            )
+        logger.debug("Fingerprint of %s %s", url, 'changed' if changed else 'unchanged')
+        return changed
+
+    def touch(self, url: str, scope: str = '') -> None:
+        """Record that `url` was found unchanged (e.g. HTTP 304) without other updates."""
+        with self._connection() as connection:
+            connection.execute('UPDATE fingerprints SET checked_at = ? WHERE url = ? AND scope = ?',
+                               (time.time(), url, scope))
+
+    def forget(self, url: str, scope: Optional[str] = None) -> None:
+        """Forget `url` in `scope`, or in every scope when none is given."""
+        with self._connection() as connection:
+            if scope is None:
+                connection.execute('DELETE FROM fingerprints WHERE url = ?', (url,))
+            else:
+                connection.execute('DELETE FROM fingerprints WHERE url = ? AND scope = ?', (url, scope))
+
+    def purge(self, older_than: float) -> int:
+        """Delete fingerprints not checked for `older_than` seconds and return how many were removed."""
+        with self._connection() as connection:
+            return connection.execute(
+                'DELETE FROM fingerprints WHERE checked_at < ?', (time.time() - older_than,)
+            ).rowcount
+
+    def close(self) -> None:
+        self._connections.close()
@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+from utils.filesystem import get_data_path
+from .database import ThreadConnections
+from . import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    site TEXT NOT NULL,
+    account TEXT NOT NULL,
+    cookies TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (site, account)
+)
+"""
+
+
+def _to_cdp_cookie(cookie: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a WebDriver cookie dict to the DevTools Network.CookieParam shape."""
+    cdp_cookie = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'domain': cookie.get('domain'),
+        'path': cookie.get('path', '/'),
+        'secure': cookie.get('secure', False),
+        'httpOnly': cookie.get('httpOnly', False),
+    }
+    if cookie.get('expiry'):
+        cdp_cookie['expires'] = cookie['expiry']
+    if cookie.get('sameSite'):
+        cdp_cookie['sameSite'] = cookie['sameSite']
+    return {key: value for key, value in cdp_cookie.items() if value is not None}
+
+
+def inject_cookies(driver: Any, cookies: List[Dict[str, Any]]) -> int:
+    """
+    Load `cookies` into a browser in one DevTools call, which (unlike add_cookie)
+    works for any domain without visiting it first. Falls back to add_cookie.
+    Return the number of cookies injected.
+    """
+    if not cookies:
+        return 0
+    try:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': [_to_cdp_cookie(cookie) for cookie in cookies]})
+        return len(cookies)
+    except Exception as e:
+        logger.debug("Bulk cookie injection unavailable, falling back to add_cookie: %s", e)
+    injected = 0
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+            injected += 1
+        except Exception as e:
+            logger.debug("Skipping cookie %s for %s: %s", cookie.get('name'), cookie.get('domain'), e)
+    return injected
+
+
+class SessionStore:
+    """
+    Shared store of authenticated browser sessions keyed by site and account.
+
+    An in-memory TTL cache sits in front of a SQLite database in WAL mode, so
+    any number of threads and processes can share logins. Each save is a
+    single transaction, so readers never see a half-written session.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 12 * 3600, cache_ttl: float = 60):
+        self.path = path or get_data_path('sessions.db')
+        self.ttl = ttl
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._cache_lock = threading.Lock()
+        self._connections = ThreadConnections(self.path)
+        with self._connection() as connection:
+            connection.execute(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def save(self, site: str, account: str, cookies: List[Dict[str, Any]], ttl: Optional[float] = None) -> None:
+        """Store the cookies of a logged-in session."""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO sessions (site, account, cookies, updated_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (site, account, json.dumps(cookies), now, expires_at),
+            )
+        with self._cache_lock:
+            self._cache[(site, account)] = (min(expires_at, now + self.cache_ttl), cookies)
+        logger.debug("Saved session for %s@%s with %s cookies", account, site, len(cookies))
+
+    def load(self, site: str, account: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the stored, unexpired cookies of a session, or None."""
+        now = time.time()
+        with self._cache_lock:
+            cached = self._cache.get((site, account))
+            if cached and cached[0] > now:
+                return cached[1]
+        row = self._connection().execute(
+            'SELECT cookies, expires_at FROM sessions WHERE site = ? AND account = ?', (site, account)
+        ).fetchone()
+        if not row or row[1] <= now:
+            return None
+        cookies = [cookie for cookie in json.loads(row[0]) if not cookie.get('expiry') or cookie['expiry'] > now]
+        with self._cache_lock:
+            self._cache[(site, account)] = (min(row[1], now + self.cache_ttl), cookies)
+        return cookies
+
+    def delete(self, site: str, account: str) -> None:
+        """Forget a session, e.g. after the site logged it out."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM sessions WHERE site = ? AND account = ?', (site, account))
+        with self._cache_lock:
+            self._cache.pop((site, account), None)
+
+    def purge_expired(self) -> int:
+        """Delete expired sessions and return how many were removed."""
+        with self._connection() as connection:
+            removed = connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+        with self._cache_lock:
+            self._cache.clear()
+        return removed
+
+    def inject(self, driver: Any, site: str, account: str) -> bool:
+        """Load a stored session into `driver`. Return False if there is none."""
+        cookies = self.load(site, account)
+        if not cookies:
+            return False
+        injected = inject_cookies(driver, cookies)
+        logger.debug("Injected %s cookies for %s@%s", injected, account, site)
+        return injected > 0
+
+    def close(self) -> None:
+        self._connections.close()
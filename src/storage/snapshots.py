@@ -0,0 +1,207 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+from utils.filesystem import get_data_path
+from utils.markup import lxml_available
+from .database import ThreadConnections
+from . import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    recipe TEXT,
+    captured_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, captured_at);
+CREATE INDEX IF NOT EXISTS snapshots_recipe ON snapshots (recipe, captured_at);
+"""
+
+
+class Snapshot:
+    """One capture of a page: where it was, when, and the digest of its HTML."""
+
+    __slots__ = ('url', 'final_url', 'digest', 'recipe', 'captured_at')
+
+    def __init__(self, url: str, final_url: str, digest: str, recipe: Optional[str], captured_at: float):
+        self.url = url
+        self.final_url = final_url
+        self.digest = digest
+        self.recipe = recipe
+        self.captured_at = captured_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'final_url': self.final_url,
+            'digest': self.digest,
+            'recipe': self.recipe,
+            'captured_at': self.captured_at,
+        }
+
+
+class SnapshotStore:
+    """
+    Content-addressed, gzip-compressed store of page HTML.
+
+    Each distinct document is stored once under `objects/<2 hex>/<sha256>.html.gz`;
+    a SQLite index (WAL mode, one connection per thread) records every capture of
+    a URL with its final URL, recipe and time, so re-captures of unchanged pages
+    cost one index row. Object files are written atomically, so several processes
+    can share a store.
+    """
+
+    def __init__(self, root: Optional[str] = None, compression_level: int = 6):
+        self.root = root = root or get_data_path('snapshots')
+        self.compression_level = compression_level
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._connections = ThreadConnections(os.path.join(root, 'index.db'))
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def object_path(self, digest: str) -> str:
+        return object_path(self.root, digest)
+
+    def put(self, html: str) -> str:
+        """Store a document (once) and return its digest."""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(gzip.compress(data, self.compression_level))
+        os.replace(temporary, path)
+        return digest
+
+    def save(self, url: str, html: str, final_url: Optional[str] = None, recipe: Optional[str] = None) -> Snapshot:
+        """Record a capture of `url` and return its Snapshot."""
+        snapshot = Snapshot(url, final_url or url, self.put(html), recipe, time.time())
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT INTO snapshots (url, final_url, digest, recipe, captured_at) VALUES (?, ?, ?, ?, ?)',
+                (snapshot.url, snapshot.final_url, snapshot.digest, snapshot.recipe, snapshot.captured_at),
+            )
+        logger.debug("Saved snapshot %s of %s", snapshot.digest[:12], url, url=url)
+        return snapshot
+
+    def load(self, digest: str) -> str:
+        return load_object(self.root, digest)
+
+    def latest(self, url: str) -> Optional[Snapshot]:
+        row = self._connection().execute(
+            'SELECT url, final_url, digest, recipe, captured_at FROM snapshots '
+            'WHERE url = ? ORDER BY captured_at DESC LIMIT 1', (url,)
+        ).fetchone()
+        return Snapshot(*row) if row else None
+
+    def snapshots(self, recipe: Optional[str] = None, since: Optional[float] = None,
+                  latest_only: bool = True) -> Iterator[Snapshot]:
+        """Iterate over captures, optionally of one recipe and after `since`; by default only each URL's latest."""
+        conditions, parameters = [], []
+        if recipe is not None:
+            conditions.append('recipe = ?')
+            parameters.append(recipe)
+        if since is not None:
+            conditions.append('captured_at >= ?')
+            parameters.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if latest_only:
+            query = (f'SELECT url, final_url, digest, recipe, MAX(captured_at) FROM snapshots {where} '
+                     f'GROUP BY url ORDER BY url')
+        else:
+            query = f'SELECT url, final_url, digest, recipe, captured_at FROM snapshots {where} ORDER BY captured_at'
+        for row in self._connection().execute(query, parameters):
+            yield Snapshot(*row)
+
+    def stats(self) -> Dict[str, int]:
+        captures, urls, documents = self._connection().execute(
+            'SELECT COUNT(*), COUNT(DISTINCT url), COUNT(DISTINCT digest) FROM snapshots'
+        ).fetchone()
+        return {'captures': captures, 'urls': urls, 'documents': documents}
+
+    def close(self) -> None:
+        self._connections.close()
+
+
+def object_path(root: str, digest: str) -> str:
+    return os.path.join(root, 'objects', digest[:2], f"{digest}.html.gz")
+
+
+def load_object(root: str, digest: str) -> str:
+    with open(object_path(root, digest), 'rb') as file:
+        return gzip.decompress(file.read()).decode('utf-8')
+
+
+def _extract_snapshots(root: str, spec: Any, batch: List[Tuple[str, str]]) -> List[Any]:
+    """Process pool worker: parse and extract a batch of (digest, final_url) snapshots."""
+    # Imported here: the driver package imports storage at module level.
+    from driver.extraction import extract_from_html
+    results = []
+    for digest, final_url in batch:
+        try:
+            results.append(extract_from_html(load_object(root, digest), spec, final_url))
+        except ImportError:
+            # lxml or cssselect is missing: no snapshot can be extracted, fail the whole replay.
+            raise
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _batches(snapshots: Iterable[Snapshot], size: int) -> Iterator[List[Snapshot]]:
+    batch: List[Snapshot] = []
+    for snapshot in snapshots:
+        batch.append(snapshot)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def replay(store: SnapshotStore, spec: Any, snapshots: Optional[Iterable[Snapshot]] = None,
+           processes: Optional[int] = None, batch_size: int = 64,
+           max_pending: Optional[int] = None) -> Iterator[Tuple[Snapshot, Any]]:
+    """
+    Run an ExtractionSpec against stored snapshots on a process pool, without a browser.
+
+    Yields (snapshot, records) in snapshot order; records is the exception instead
+    when a document could not be extracted. At most `max_pending` batches (default
+    four per process) are in flight, so arbitrarily many snapshots stream through
+    in bounded memory. Requires lxml and cssselect.
+    """
+    if not lxml_available():
+        raise ImportError("Replaying snapshots requires lxml and cssselect")
+    if snapshots is None:
+        snapshots = store.snapshots()
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or processes * 4
+    started, count = time.monotonic(), 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = []
+        for batch in _batches(snapshots, batch_size):
+            pending.append((batch, executor.submit(
+                _extract_snapshots, store.root, spec, [(snapshot.digest, snapshot.final_url) for snapshot in batch]
+            )))
+            if len(pending) >= max_pending:
+                done, future = pending.pop(0)
+                yield from zip(done, future.result())
+                count += len(done)
+        for done, future in pending:
+            yield from zip(done, future.result())
+            count += len(done)
+    logger.info("Replayed %s snapshots in %.1fs on %s processes", count, time.monotonic() - started, processes)
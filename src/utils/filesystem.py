@@ -17,6 +17,21 @@ def get_resource_path(relative_path: str) -> str:
 
     return os.path.join(base_path, relative_path)
 
+def get_data_path(*parts: str) -> str:
+    """
+    Get the absolute path to a file or folder in ScrapeGoat's data directory:
+    $SCRAPEGOAT_DATA_DIR if set, otherwise $XDG_DATA_HOME/scrapegoat
+    (~/.local/share/scrapegoat). The directory is not created.
+
+    :param parts: Path components below the data directory.
+    :return: The absolute path.
+    """
+    data_dir = os.environ.get('SCRAPEGOAT_DATA_DIR')
+    if not data_dir:
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+        data_dir = os.path.join(data_home, 'scrapegoat')
+    return os.path.abspath(os.path.join(data_dir, *parts))
+
 def create_directory(path: str) -> bool:
     """
     Create a directory at the specified path if it does not exist.
@@ -1,17 +1,98 @@
 import psutil
 import platform
 import os
-import subprocess
+import json
+import time
 import re
 
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_SELF_CGROUP = '/proc/self/cgroup'
+# Used until a real measurement from a running browser has been cached.
+DEFAULT_BROWSER_MEMORY_MB = 350
+DEFAULT_TAB_MEMORY_MB = 120
+CAPACITY_CACHE_TTL = 7 * 24 * 3600
+# cgroup v1 reports "no limit" as a huge page-aligned number.
+CGROUP_V1_UNLIMITED = 1 << 60
+
+def _own_cgroups():
+    """Map each cgroup controller ('' for the v2 unified hierarchy) to the cgroup of this process."""
+    cgroups = {}
+    try:
+        with open(PROC_SELF_CGROUP) as file:
+            for line in file:
+                _, controllers, path = line.rstrip('\n').split(':', 2)
+                for controller in controllers.split(','):
+                    cgroups[controller] = path.lstrip('/')
+    except (OSError, ValueError):
+        pass
+    return cgroups
+
+def _read_cgroup_file(hierarchy, name, cgroups):
+    # Without a cgroup namespace our own cgroup sits below the mount; with one, the mount is it.
+    controller = hierarchy.split(',')[0]
+    own = os.path.join(CGROUP_ROOT, hierarchy, cgroups.get(controller, ''))
+    for directory in (own, os.path.join(CGROUP_ROOT, hierarchy)):
+        try:
+            with open(os.path.join(directory, name)) as file:
+                return file.read().strip()
+        except OSError:
+            continue
+    return None
+
+def read_cgroup_limits():
+    """Read the CPU and memory limits of the current cgroup (v2 or v1). Missing limits are None."""
+    limits = {'cgroup_version': None, 'cpu_limit': None, 'memory_limit_bytes': None, 'memory_usage_bytes': None}
+    cgroups = _own_cgroups()
+
+    cpu_max = _read_cgroup_file('', 'cpu.max', cgroups)
+    memory_max = _read_cgroup_file('', 'memory.max', cgroups)
+    if cpu_max is not None or memory_max is not None:
+        limits['cgroup_version'] = 2
+        if cpu_max and not cpu_max.startswith('max'):
+            quota, period = cpu_max.split()[:2]
+            limits['cpu_limit'] = int(quota) / int(period)
+        if memory_max and memory_max != 'max':
+            limits['memory_limit_bytes'] = int(memory_max)
+        memory_current = _read_cgroup_file('', 'memory.current', cgroups)
+        if memory_current:
+            limits['memory_usage_bytes'] = int(memory_current)
+        return limits
+
+    quota = _read_cgroup_file('cpu', 'cpu.cfs_quota_us', cgroups) or _read_cgroup_file('cpu,cpuacct', 'cpu.cfs_quota_us', cgroups)
+    period = _read_cgroup_file('cpu', 'cpu.cfs_period_us', cgroups) or _read_cgroup_file('cpu,cpuacct', 'cpu.cfs_period_us', cgroups)
+    memory_limit = _read_cgroup_file('memory', 'memory.limit_in_bytes', cgroups)
+    if quota is not None or memory_limit is not None:
+        limits['cgroup_version'] = 1
+        if quota and period and int(quota) > 0:
+            limits['cpu_limit'] = int(quota) / int(period)
+        if memory_limit and int(memory_limit) < CGROUP_V1_UNLIMITED:
+            limits['memory_limit_bytes'] = int(memory_limit)
+        memory_usage = _read_cgroup_file('memory', 'memory.usage_in_bytes', cgroups)
+        if memory_usage:
+            limits['memory_usage_bytes'] = int(memory_usage)
+    return limits
+
 def get_system_info():
-    """Gather system information such as architecture, number of cores, RAM, and CPU usage."""
+    """Gather system information such as architecture, number of cores, RAM, and CPU usage, honouring cgroup limits."""
+    memory = psutil.virtual_memory()
+    cgroup = read_cgroup_limits()
+    try:
+        num_cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        num_cores = psutil.cpu_count(logical=True)
+    available_ram = memory.available
+    total_ram = memory.total
+    if cgroup['memory_limit_bytes']:
+        total_ram = min(total_ram, cgroup['memory_limit_bytes'])
+        available_ram = min(available_ram, cgroup['memory_limit_bytes'] - (cgroup['memory_usage_bytes'] or 0))
     system_info = {
         'architecture': platform.machine(),
-        'num_cores': psutil.cpu_count(logical=True),
-        'available_ram_gb': psutil.virtual_memory().available / (1024 ** 3),  # Convert bytes to GB
-        'total_ram_gb': psutil.virtual_memory().total / (1024 ** 3),  # Convert bytes to GB
-        'cpu_usage_percent': psutil.cpu_percent(interval=1),
+        'num_cores': num_cores,
+        'cpu_limit': cgroup['cpu_limit'],
+        'available_ram_gb': max(available_ram, 0) / (1024 ** 3),  # Convert bytes to GB
+        'total_ram_gb': total_ram / (1024 ** 3),  # Convert bytes to GB
+        'cpu_usage_percent': psutil.cpu_percent(interval=None),  # Non-blocking: usage since the previous call
+        'cgroup_version': cgroup['cgroup_version'],
     }
 
     if platform.system().lower() == 'windows':
@@ -29,28 +110,110 @@ def get_system_info():
 
     return system_info
 
+def get_capacity_cache_path():
+    """Location of the cached browser cost measurement."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'scrapegoat', 'capacity.json')
+
+def _capacity_cache_key(system_info):
+    # A measurement is only valid on the same machine shape and within the same limits.
+    return {
+        'architecture': system_info['architecture'],
+        'num_cores': system_info['num_cores'],
+        'cpu_limit': system_info['cpu_limit'],
+        'total_ram_gb': round(system_info['total_ram_gb'], 1),
+    }
+
+def load_browser_cost(system_info=None, browser_version=None):
+    """Return the cached browser cost measurement, or None if missing, stale or made on another setup."""
+    system_info = system_info or get_system_info()
+    try:
+        with open(get_capacity_cache_path()) as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cached.get('key') != _capacity_cache_key(system_info):
+        return None
+    if time.time() - cached.get('measured_at', 0) > CAPACITY_CACHE_TTL:
+        return None
+    if browser_version and cached.get('browser_version') != browser_version:
+        return None
+    return cached
+
+def measure_browser_cost(client):
+    """
+    Measure what a running BrowserClient costs: the unique set size (memory that would be freed
+    if it exited) of its whole driver process tree, and the extra USS of one more blank tab.
+    The result is cached on disk for `calculate_max_browsers_or_tabs`.
+    """
+    def tree_uss():
+        total = 0
+        for process in client.get_process_tree():
+            try:
+                total += process.memory_full_info().uss
+            except psutil.Error:
+                continue
+        return total / (1024 ** 2)
+
+    browser_mb = tree_uss()
+    driver = client.driver
+    current_handle = driver.current_window_handle
+    driver.switch_to.new_window('tab')
+    driver.get('about:blank')
+    tab_mb = max(tree_uss() - browser_mb, 0)
+    driver.close()
+    driver.switch_to.window(current_handle)
+
+    system_info = get_system_info()
+    measurement = {
+        'key': _capacity_cache_key(system_info),
+        'browser_version': driver.capabilities.get('browserVersion'),
+        'measured_at': time.time(),
+        'browser_mb': browser_mb,
+        'tab_mb': tab_mb or DEFAULT_TAB_MEMORY_MB,
+    }
+    path = get_capacity_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as file:
+            json.dump(measurement, file)
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+    return measurement
+
 def get_browser_memory_usage(browser="chrome"):
-    """Estimate the average memory consumption per browser instance/tab."""
-    if browser == "chrome":
-        return _get_chrome_memory_usage()
-    elif browser == "firefox":
-        return _get_firefox_memory_usage()
-    else:
+    """Return the average memory cost per browser instance in MB, from the cached measurement when there is one."""
+    if browser not in ("chrome", "firefox"):
         raise ValueError("Unsupported browser: Only 'chrome' and 'firefox' are supported.")
+    cached = load_browser_cost() if browser == "chrome" else None
+    return cached['browser_mb'] if cached else DEFAULT_BROWSER_MEMORY_MB
+
+def calculate_max_browsers_or_tabs(browser="chrome", client=None):
+    """
+    Calculate the maximum number of browser instances or tabs that can be opened simultaneously.
 
-def calculate_max_browsers_or_tabs(browser="chrome"):
-    """Calculate the maximum number of browser instances or tabs that can be opened simultaneously."""
+    Returns immediately: it uses the cached measurement of a previous run (or defaults)
+    and only measures when an already running `client` is passed and the cache is stale.
+    """
     # Get system information
     system_info = get_system_info()
 
-    # Estimate average memory usage per browser instance
-    avg_memory_per_browser = get_browser_memory_usage(browser)
+    cached = load_browser_cost(system_info) if browser == "chrome" else None
+    if cached is None and client is not None and client.driver:
+        cached = measure_browser_cost(client)
+    avg_memory_per_browser = cached['browser_mb'] if cached else DEFAULT_BROWSER_MEMORY_MB
+    avg_memory_per_tab = cached['tab_mb'] if cached else DEFAULT_TAB_MEMORY_MB
 
     # Max number of browsers by RAM (leave a safety margin of 20% of the available RAM)
     max_by_ram = int(system_info['available_ram_gb'] * 1024 / avg_memory_per_browser * 0.8)  # Safety margin
+    max_tabs_by_ram = int(system_info['available_ram_gb'] * 1024 / avg_memory_per_tab * 0.8)
 
     # Estimate CPU requirements (assuming each browser uses about 1 full core)
     max_by_cpu = system_info['num_cores']
+    if system_info['cpu_limit']:
+        max_by_cpu = max(1, min(max_by_cpu, int(system_info['cpu_limit'])))
 
     # The maximum is determined by the lower of RAM or CPU limits
     max_browsers = min(max_by_ram, max_by_cpu)
@@ -59,41 +222,13 @@ def calculate_max_browsers_or_tabs(browser="chrome"):
         'max_browsers_by_ram': max_by_ram,
         'max_browsers_by_cpu': max_by_cpu,
         'max_browsers': max_browsers,
+        'max_tabs_by_ram': max_tabs_by_ram,
         'system_info': system_info,
-        'avg_memory_per_browser_mb': avg_memory_per_browser
+        'avg_memory_per_browser_mb': avg_memory_per_browser,
+        'avg_memory_per_tab_mb': avg_memory_per_tab,
+        'measured': cached is not None,
     }
 
-def _get_chrome_memory_usage():
-    """Use Chrome to open a tab and measure memory usage."""
-    return _estimate_memory_usage("chrome")
-
-def _get_firefox_memory_usage():
-    """Use Firefox to open a tab and measure memory usage."""
-    return _estimate_memory_usage("firefox")
-
-def _estimate_memory_usage(browser):
-    """Helper to estimate memory usage by launching a browser."""
-    # Launch a browser instance in the background and measure its memory usage
-    if browser == "chrome":
-        process = subprocess.Popen(["google-chrome", "--headless", "--disable-gpu", "--remote-debugging-port=9222"])
-    elif browser == "firefox":
-        process = subprocess.Popen(["firefox", "--headless"])
-
-    # Allow the browser to initialize
-    import time
-    time.sleep(5)
-
-    # Check memory usage of the browser process
-    browser_memory = 0
-    for proc in psutil.process_iter(['pid', 'name']):
-        if browser in proc.info['name'].lower():
-            browser_memory += proc.memory_info().rss / (1024 ** 2)  # Convert bytes to MB
-
-    # Kill the browser instance
-    process.terminate()
-
-    return browser_memory
-
 def transform_url(url):
     """Transform the URL by replacing '.' with '_'."""
     # Use regex to extract the domain part from the URL
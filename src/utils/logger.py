@@ -1,8 +1,16 @@
+import atexit
+import contextvars
+import json
 import logging
+import os
+import queue
 import threading
-from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional
+
+from utils.filesystem import get_data_path
 
 
 class ColoredFormatter(logging.Formatter):
@@ -22,54 +30,167 @@ class ColoredFormatter(logging.Formatter):
 
 
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FORMATS = ('text', 'json')
+# Structured fields attached to every record, from `log_context()` or per call.
+CONTEXT_FIELDS = ('job', 'worker', 'url')
+
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('log_context', default={})
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach `fields` (e.g. job, worker, url) to every record logged inside the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current `log_context()` fields onto records in the logging thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Resolves the message in the calling thread (so mutable arguments are captured
+    as they were) but leaves formatting and I/O to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _LazyRotatingFileHandler(RotatingFileHandler):
+    """Creates the log file (and its directory) on the first record instead of at import."""
+
+    def __init__(self, filename: str, **kwargs: Any):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
 
 
 class Logger:
+    """
+    Process-wide logger writing to a rotating file and a colored stream.
+    The file defaults to scrapegoat.log in the data directory (see
+    `get_data_path`) and is only created once something is logged.
+
+    With `use_queue` the calling thread only enqueues records and a listener
+    thread does the formatting and I/O. Messages are formatted lazily: pass
+    `%`-style arguments (`logger.debug("Clicked %s", name)`) or a callable that
+    is only invoked when the level is enabled. Keyword arguments from
+    `CONTEXT_FIELDS` are attached to the record and shown by the JSON format.
+    """
     _instance: Optional['Logger'] = None
     _lock = threading.Lock()
 
-    def __new__(cls, log_level: int = logging.INFO, log_file: str = 'scrapegoat.log') -> 'Logger':
+    def __new__(cls, log_level: int = logging.INFO, log_file: Optional[str] = None, stream=None,
+                log_format: str = 'text', use_queue: bool = False) -> 'Logger':
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super(Logger, cls).__new__(cls)
-                    cls._instance._initialize_logger(log_level, log_file)
+                    cls._instance._initialize_logger(log_level, log_file, stream or sys.stdout, log_format, use_queue)
         return cls._instance
 
-    def _initialize_logger(self, log_level: int, log_file: str) -> None:
+    def _initialize_logger(self, log_level: int, log_file: Optional[str], stream, log_format: str,
+                           use_queue: bool) -> None:
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{log_format}', expected one of {LOG_FORMATS}")
         self.logger_instance = logging.getLogger(__name__)
         self.logger_instance.setLevel(log_level)
+        self.logger_instance.addFilter(ContextFilter())
+        self.listener: Optional[QueueListener] = None
 
         # Create a rotating file handler
-        file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=30)
+        file_handler = _LazyRotatingFileHandler(log_file or get_data_path('scrapegoat.log'),
+                                                maxBytes=5*1024*1024, backupCount=30)
         file_handler.setLevel(log_level)
-        file_formatter = logging.Formatter(LOG_FORMAT)
+        file_formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(LOG_FORMAT)
         file_handler.setFormatter(file_formatter)
-        self.logger_instance.addHandler(file_handler)
 
-        # Create a stream handler for stdout
-        stream_handler = logging.StreamHandler(sys.stdout)
+        # Create a stream handler for stdout (or the given stream)
+        stream_handler = logging.StreamHandler(stream)
         stream_handler.setLevel(log_level)
-        stream_formatter = ColoredFormatter(LOG_FORMAT)
+        stream_formatter = JsonFormatter() if log_format == 'json' else ColoredFormatter(LOG_FORMAT)
         stream_handler.setFormatter(stream_formatter)
-        self.logger_instance.addHandler(stream_handler)
+
+        if use_queue:
+            self.listener = QueueListener(queue.SimpleQueue(), file_handler, stream_handler,
+                                          respect_handler_level=True)
+            self.logger_instance.addHandler(_DeferredQueueHandler(self.listener.queue))
+            self.listener.start()
+            atexit.register(self.stop)
+        else:
+            self.logger_instance.addHandler(file_handler)
+            self.logger_instance.addHandler(stream_handler)
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread (no-op without a queue)."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def set_log_level(self, log_level: int) -> None:
         self.logger_instance.setLevel(log_level)
-        for handler in self.logger_instance.handlers:
+        handlers = list(self.logger_instance.handlers)
+        if self.listener is not None:
+            handlers += self.listener.handlers
+        for handler in handlers:
             handler.setLevel(log_level)
 
-    def debug(self, message: str) -> None:
-        self.logger_instance.debug(message)
-    
-    def info(self, message: str) -> None:
-        self.logger_instance.info(message)
-    
-    def warning(self, message: str) -> None:
-        self.logger_instance.warning(message)
-    
-    def error(self, message: str) -> None:
-        self.logger_instance.error(message)
-
-    def critical(self, message: str) -> None:
-        self.logger_instance.critical(message)
+    def is_enabled_for(self, log_level: int) -> bool:
+        return self.logger_instance.isEnabledFor(log_level)
+
+    def log(self, log_level: int, message: Any, *args: Any, **fields: Any) -> None:
+        if not self.logger_instance.isEnabledFor(log_level):
+            return
+        if callable(message):
+            message = message()
+        exc_info = fields.pop('exc_info', None)
+        self.logger_instance.log(log_level, message, *args, exc_info=exc_info, extra=fields or None, stacklevel=3)
+
+    def debug(self, message: Any, *args: Any, **fields: Any) -> None:
+        self.log(logging.DEBUG, message, *args, **fields)
+
+    def info(self, message: Any, *args: Any, **fields: Any) -> None:
+        self.log(logging.INFO, message, *args, **fields)
+
+    def warning(self, message: Any, *args: Any, **fields: Any) -> None:
+        self.log(logging.WARNING, message, *args, **fields)
+
+    def error(self, message: Any, *args: Any, **fields: Any) -> None:
+        self.log(logging.ERROR, message, *args, **fields)
+
+    def critical(self, message: Any, *args: Any, **fields: Any) -> None:
+        self.log(logging.CRITICAL, message, *args, **fields)
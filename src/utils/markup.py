@@ -0,0 +1,131 @@
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+import importlib.util
+import re
+
+# Compound CSS selectors the stdlib fallback understands: tag#id.class[attr=value] (no combinators).
+SIMPLE_CSS = re.compile(r'^([a-zA-Z][\w-]*)?((?:[#.][\w-]+|\[[\w-]+(?:=["\']?[^\]"\']*["\']?)?\])*)$')
+SIMPLE_CSS_PART = re.compile(r'([#.])([\w-]+)|\[([\w-]+)(?:=["\']?([^\]"\']*)["\']?)?\]')
+
+
+def lxml_available() -> bool:
+    """
+    Whether parse_html() and select() (and so static extraction) can be used in this environment.
+    lxml needs cssselect to evaluate CSS selectors.
+    """
+    return all(importlib.util.find_spec(name) is not None for name in ('lxml', 'cssselect'))
+
+
+def parse_html(html: str) -> Any:
+    """Parse an HTML document with lxml. Raises ImportError when lxml is not installed."""
+    import lxml.html
+    return lxml.html.fromstring(html)
+
+
+def select(tree: Any, by: str, value: str, descendants_only: bool = True) -> List[Any]:
+    """
+    Evaluate a Selenium-style (`By`, value) locator against the descendants of an lxml element,
+    or against its whole document (including the root element) with `descendants_only=False`.
+    """
+    axis = './/' if descendants_only else '//'
+    if by == 'xpath':
+        return tree.xpath(value)
+    if by == 'css selector':
+        return tree.cssselect(value)
+    if by == 'id':
+        return tree.xpath(f'{axis}*[@id=$value]', value=value)
+    if by == 'name':
+        return tree.xpath(f'{axis}*[@name=$value]', value=value)
+    if by == 'class name':
+        return tree.xpath(f'{axis}*[contains(concat(" ", normalize-space(@class), " "), $value)]', value=f" {value} ")
+    if by == 'tag name':
+        return tree.xpath(f'{axis}{value}')
+    if by == 'link text':
+        return [link for link in tree.xpath(f'{axis}a') if link.text_content().strip() == value]
+    if by == 'partial link text':
+        return [link for link in tree.xpath(f'{axis}a') if value in link.text_content()]
+    raise ValueError(f"Unsupported locator strategy '{by}'")
+
+
+class _ElementCollector(HTMLParser):
+    """Collects (tag, attributes, link text) of every element, for the dependency-free fallback."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements: List[Tuple[str, Dict[str, str]]] = []
+        self.links: List[str] = []
+        self._link_text: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        self.elements.append((tag, {name: value or '' for name, value in attrs}))
+        if tag == 'a':
+            self._link_text = []
+
+    def handle_data(self, data):
+        if self._link_text is not None:
+            self._link_text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._link_text is not None:
+            self.links.append(''.join(self._link_text))
+            self._link_text = None
+
+
+def _simple_css_matcher(selector: str):
+    match = SIMPLE_CSS.match(selector.strip())
+    if not match or not selector.strip():
+        return None
+    tag, rest = match.group(1), match.group(2)
+    conditions = SIMPLE_CSS_PART.findall(rest)
+
+    def matches(element_tag: str, attrs: Dict[str, str]) -> bool:
+        if tag and element_tag != tag.lower():
+            return False
+        for prefix, name, attribute, attribute_value in conditions:
+            if prefix == '#' and attrs.get('id') != name:
+                return False
+            if prefix == '.' and name not in attrs.get('class', '').split():
+                return False
+            if attribute and (attribute not in attrs or (attribute_value and attrs[attribute] != attribute_value)):
+                return False
+        return True
+
+    return matches
+
+
+def has_element(html: str, by: str, value: str) -> Optional[bool]:
+    """
+    Tell whether a locator matches anything in `html`.
+
+    Uses lxml when it is installed; otherwise falls back to a stdlib scan that handles
+    id/name/class/tag/link locators and simple compound CSS selectors. Returns None
+    when the locator cannot be evaluated in this environment.
+    """
+    if not html.strip():
+        return False
+    try:
+        return bool(select(parse_html(html), by, value, descendants_only=False))
+    except ImportError:
+        pass
+
+    collector = _ElementCollector()
+    collector.feed(html)
+    if by == 'link text':
+        return any(text.strip() == value for text in collector.links)
+    if by == 'partial link text':
+        return any(value in text for text in collector.links)
+    if by == 'css selector':
+        matches = _simple_css_matcher(value)
+    else:
+        attribute = {'id': 'id', 'name': 'name'}.get(by)
+        if attribute:
+            matches = lambda tag, attrs: attrs.get(attribute) == value
+        elif by == 'class name':
+            matches = lambda tag, attrs: value in attrs.get('class', '').split()
+        elif by == 'tag name':
+            matches = lambda tag, attrs: tag == value.lower()
+        else:
+            matches = None
+    if matches is None:
+        return None
+    return any(matches(tag, attrs) for tag, attrs in collector.elements)
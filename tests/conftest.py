@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The packages live in src/ and are imported as top-level modules (driver, crawler, storage, ...).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Keep the log file (and any other default data paths) out of the user's data directory.
+os.environ.setdefault('SCRAPEGOAT_DATA_DIR', tempfile.mkdtemp(prefix='scrapegoat-tests-'))
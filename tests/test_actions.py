@@ -0,0 +1,50 @@
+import pytest
+
+from driver import selenium
+from driver.batch import _compile_step
+from driver.recipes import RecipeError, compile_recipe, validate_step
+from driver.schema import UIElement
+
+
+class FakeWebElement:
+    def __init__(self, value='old'):
+        self.value = value
+        self.calls = []
+
+    def clear(self):
+        self.calls.append('clear')
+        self.value = ''
+
+    def send_keys(self, text):
+        self.calls.append('send_keys')
+        self.value += text
+
+
+class FakeClient:
+    timeout_after = 10
+
+
+def test_send_keys_replaces_the_field_value():
+    element = UIElement({'selector_type': 'css', 'selector_value': '#email', 'action': 'send_keys',
+                         'action_value': 'goat@example.com'})
+    found = FakeWebElement()
+    selenium.ACTIONS[element.action](FakeClient(), element, found)
+    assert found.calls == ['clear', 'send_keys']
+    assert found.value == 'goat@example.com'
+
+
+def test_send_keys_needs_an_action_value():
+    step = {'selector_type': 'css', 'selector_value': '#email', 'action': 'send_keys'}
+    with pytest.raises(RecipeError, match='action_value: required by the send_keys action'):
+        validate_step(step, 'site.page[0]')
+    validate_step({**step, 'action_value': ''}, 'site.page[0]')
+
+
+def test_action_value_reaches_compiled_and_batched_steps():
+    recipe = compile_recipe('site', 'page', [{'selector_type': 'id', 'selector_value': 'email', 'action': 'send_keys',
+                                              'action_value': 'goat@example.com'}])
+    step = recipe.steps[0]
+    assert step.to_dict()['action_value'] == 'goat@example.com'
+    compiled = _compile_step(FakeClient(), step)
+    assert (compiled['by'], compiled['value'], compiled['action'], compiled['action_value']) == (
+        'id', 'email', 'send_keys', 'goat@example.com')
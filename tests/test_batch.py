@@ -0,0 +1,104 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from driver.batch import BATCH_SCRIPT, PROGRESS_KEY, _compile_step, compile_batches, run_batch
+from driver.schema import UIElement
+
+# Just enough DOM for BATCH_SCRIPT: an input whose instance `value` property swallows plain
+# assignments like a React-controlled input, a button and a sessionStorage.
+DOM = """
+const log = [];
+class HTMLInputElement {}
+Object.defineProperty(HTMLInputElement.prototype, 'value', {
+    get() { return this._value || ''; }, set(v) { this._value = v; log.push('native:' + v); }, configurable: true});
+class HTMLTextAreaElement {}
+class HTMLSelectElement {}
+class Event { constructor(type) { this.type = type; } }
+const input = new HTMLInputElement();
+Object.defineProperty(input, 'value', {get() { return ''; }, set(v) { log.push('instance:' + v); }});
+input.focus = () => log.push('focus');
+input.scrollIntoView = () => {};
+input.dispatchEvent = (event) => log.push(event.type);
+const button = {scrollIntoView() {}, click() { log.push('click'); }};
+const store = new Map();
+globalThis.sessionStorage = {setItem: (k, v) => store.set(k, v), getItem: (k) => store.get(k) ?? null,
+                             removeItem: (k) => store.delete(k)};
+globalThis.document = {querySelector: (selector) => ({'#email': input, '#go': button})[selector] || null};
+"""
+
+
+def step(selector, **fields):
+    return UIElement({'selector_type': 'css', 'selector_value': selector, **fields})
+
+
+class FakeClient:
+    timeout_after = 0
+    script_timeout = 30
+
+    def __init__(self, driver=None):
+        self.driver = driver
+
+
+def run_script(steps):
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('node is not installed')
+    compiled = [_compile_step(FakeClient(), element) for element in steps]
+    script = (f"{DOM}\n(function () {{ {BATCH_SCRIPT} }}).call(null, {json.dumps(compiled)}, "
+              f"{json.dumps(PROGRESS_KEY)}, (status) => console.log(JSON.stringify("
+              f"{{status, log, stored: Array.from(store.keys())}})));")
+    output = subprocess.run([node, '-e', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def test_send_keys_uses_the_native_value_setter():
+    result = run_script([step('#email', action='send_keys', action_value='goat@example.com'),
+                         step('#go', action='click')])
+    assert result['status'] == {'ok': True, 'done': 2, 'error': None}
+    assert result['log'] == ['focus', 'native:goat@example.com', 'input', 'change', 'click']
+    assert result['stored'] == []
+
+
+def test_missing_element_clears_the_progress_key():
+    result = run_script([step('#go', action='click', in_page=True), step('#missing', action='click')])
+    assert result['status'] == {'ok': False, 'done': 1, 'error': 'not_found'}
+    assert result['stored'] == []
+
+
+def test_clicks_end_batches_unless_in_page():
+    steps = [step('#a', action='send_keys', action_value='x'), step('#b', action='click', in_page=True),
+             step('#c', action='USE_SCRIPT'), step('#d'), step('#e', post_action='submit'),
+             step('#f', settle='url_change'), step('#g', action='click', settle='dom_quiet', in_page=True)]
+    assert [[element.selector_value for element in batch] for batch in compile_batches(steps)] == [
+        ['#a', '#b', '#c'], ['#d', '#e'], ['#f'], ['#g']]
+
+
+class NavigatingDriver:
+    """Unloads the document during the batch script; the progress key is gone with it."""
+
+    current_url = 'https://a.example/'
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, script, *args):
+        raise WebDriverException('javascript error: document unloaded while waiting for result')
+
+    def execute_script(self, script, *args):
+        return None
+
+
+def test_navigation_by_the_last_click_completes_the_batch():
+    client = FakeClient(NavigatingDriver())
+    assert run_batch(client, [step('#a', action='click', in_page=True), step('#b', action='click')]) == (2, None)
+
+
+def test_unknown_interruption_of_an_in_page_batch_is_reported():
+    client = FakeClient(NavigatingDriver())
+    completed, error = run_batch(client, [step('#a', action='click', in_page=True)])
+    assert completed == 0
+    assert error.startswith('batch interrupted at an unknown step')
@@ -0,0 +1,38 @@
+from urllib.request import urlopen
+
+import pytest
+
+from benchmarks.fixtures import FixtureServer
+from benchmarks.suite import STEP_SCENARIOS
+from driver.recipes import validate_step
+from utils.markup import has_element
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FixtureServer() as server:
+        yield server
+
+
+def fetch(server, path):
+    with urlopen(server.url(path), timeout=5) as response:
+        return response.read().decode('utf-8')
+
+
+@pytest.mark.parametrize('path', list(STEP_SCENARIOS))
+def test_step_scenarios_are_valid_recipes(server, path):
+    for index, step in enumerate(STEP_SCENARIOS[path]):
+        validate_step(step, f"{path}[{index}]")
+    assert fetch(server, path)
+
+
+def test_form_scenario_targets_exist(server):
+    html = fetch(server, '/form')
+    assert all(has_element(html, 'css selector', step['selector_value']) for step in STEP_SCENARIOS['/form'])
+
+
+def test_captcha_fixture_only_mentions_captcha_in_the_challenge_frame(server):
+    html = fetch(server, '/captcha?ms=10')
+    # handle_captcha waits until "captcha" leaves the page source, i.e. until the iframe is removed.
+    assert html.lower().count('captcha') == 1
+    assert 'src="/captcha/frame"' in html
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from driver.blocking import ESTIMATED_BYTES, ResourcePolicy
+
+
+def request(url, destination=None):
+    return SimpleNamespace(url=url, headers={'Sec-Fetch-Dest': destination} if destination else {})
+
+
+def response(content_length=None, body=b''):
+    headers = {'Content-Length': str(content_length)} if content_length is not None else {}
+    return SimpleNamespace(headers=headers, body=body)
+
+
+def test_blocks_by_type_and_domain_unless_allowed():
+    policy = ResourcePolicy(block_types=['image'], block_domains=['ads.example'], allow_urls=['*/keep.png'])
+    assert policy.should_block(request('https://example.com/a.png')) == 'image'
+    assert policy.should_block(request('https://example.com/a.png?v=2', 'image')) == 'image'
+    assert policy.should_block(request('https://cdn.ads.example/tag.js')) == 'script'
+    assert policy.should_block(request('https://example.com/keep.png')) is None
+    assert policy.should_block(request('https://example.com/', 'document')) is None
+
+
+def test_bytes_saved_are_estimated_from_measured_responses():
+    policy = ResourcePolicy(block_types=['image', 'font'])
+    policy.record_block('image')
+    policy.record_block('image')
+    policy.record_block('font')
+    assert policy.stats()['estimated_bytes_saved'] == 2 * ESTIMATED_BYTES['image'] + ESTIMATED_BYTES['font']
+    assert policy.stats()['measured_types'] == []
+
+    policy.record_response(request('https://example.com/a.png'), response(content_length=1000))
+    policy.record_response(request('https://example.com/b.png'), response(body=b'x' * 3000))
+    stats = policy.stats()
+    assert stats['estimated_bytes_saved'] == 2 * 2000 + ESTIMATED_BYTES['font']
+    assert stats['measured_types'] == ['image']
+    assert stats['blocked'] == {'image': 2, 'font': 1} and stats['blocked_total'] == 3
@@ -0,0 +1,33 @@
+import pytest
+
+from crawler.bloom import BloomFilter
+
+
+def test_add_reports_new_keys_only():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    assert bloom.add('https://example.com/a')
+    assert not bloom.add('https://example.com/a')
+    assert bloom.add('https://example.com/b')
+    assert len(bloom) == 2
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    keys = [f"https://example.com/page/{i}" for i in range(2000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"seen-{i}")
+    false_positives = sum(f"unseen-{i}" in bloom for i in range(10000))
+    assert false_positives / 10000 < 0.03
+
+
+@pytest.mark.parametrize('capacity, error_rate', [(0, 0.01), (-1, 0.01), (100, 0), (100, 1), (100, 1.5)])
+def test_rejects_bad_arguments(capacity, error_rate):
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=capacity, error_rate=error_rate)
@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+
+from driver.capture import NetworkCapture
+
+
+def exchange(n):
+    request = SimpleNamespace(method='GET', url=f'https://example.com/{n}', headers={})
+    response = SimpleNamespace(status_code=200, headers={'Content-Type': 'text/html'}, body=b'<p>goat</p>')
+    return request, response
+
+
+def test_full_buffer_spills_to_disk(tmp_path):
+    spill_path = tmp_path / 'capture' / 'traffic.ndjson'
+    capture = NetworkCapture(capacity=2, spill_path=str(spill_path))
+    for n in range(3):
+        assert capture.record(*exchange(n))
+    capture.flush()
+    urls = [json.loads(line)['url'] for line in spill_path.read_text().splitlines()]
+    assert urls == [f'https://example.com/{n}' for n in range(3)]
+    assert (capture.spilled, capture.dropped) == (3, 0)
+
+
+def test_unwritable_spill_directory_drops_instead_of_raising(tmp_path):
+    blocker = tmp_path / 'not-a-directory'
+    blocker.write_text('')
+    capture = NetworkCapture(capacity=2, spill_path=str(blocker / 'traffic.ndjson'))
+    for n in range(3):
+        assert capture.record(*exchange(n))
+    capture.flush()
+    assert (capture.spilled, capture.dropped, len(capture)) == (0, 3, 0)
@@ -0,0 +1,66 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from driver.pool import BrowserPool
+from scrapegoat.cli import main
+
+PAGE = b'<html><body><h1>Goat</h1></body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}/goat'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def pool_starts(monkeypatch):
+    starts = []
+
+    def start(pool):
+        starts.append(pool)
+        raise RuntimeError('no browser here')
+
+    monkeypatch.setattr(BrowserPool, 'start', start)
+    return starts
+
+
+def recipe_file(tmp_path, fetch):
+    path = tmp_path / 'shop.json'
+    path.write_text(json.dumps({'shop': {'product': {
+        'steps': [], 'fetch': fetch, 'extract': {'fields': {'title': 'css:h1'}},
+    }}}))
+    return str(path)
+
+
+def test_run_serves_static_recipes_without_starting_browsers(tmp_path, server, pool_starts, capsys):
+    assert main(['run', recipe_file(tmp_path, 'static'), '--url', server, '--url', server]) == 0
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result['records'] for result in results] == [[{'title': 'Goat'}]] * 2
+    assert all(result['static'] for result in results)
+    assert pool_starts == []
+
+
+def test_run_starts_the_pool_for_browser_recipes(tmp_path, server, pool_starts, capsys):
+    assert main(['run', recipe_file(tmp_path, 'browser'), '--url', server]) == 1
+    result = json.loads(capsys.readouterr().out)
+    assert result['ok'] is False and 'no browser here' in result['error']
+    assert len(pool_starts) == 1
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from storage.database import ThreadConnections
+from storage.sessions import SessionStore
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    connections = ThreadConnections(str(tmp_path / 'store.db'))
+    main = connections.get()
+    assert connections.get() is main
+    others = []
+    thread = threading.Thread(target=lambda: others.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert others[0] is not main
+    assert main.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    connections.close()
+
+
+def test_close_closes_the_connections_of_every_thread(tmp_path):
+    connections = ThreadConnections(str(tmp_path / 'store.db'))
+    opened = [connections.get()]
+    thread = threading.Thread(target=lambda: opened.append(connections.get()))
+    thread.start()
+    thread.join()
+    connections.close()
+    for connection in opened:
+        with pytest.raises(Exception, match='closed'):
+            connection.execute('SELECT 1')
+    reopened = connections.get()
+    assert reopened not in opened
+    assert reopened.execute('SELECT 1').fetchone() == (1,)
+    connections.close()
+
+
+def test_stores_default_to_the_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('SCRAPEGOAT_DATA_DIR', str(tmp_path / 'data'))
+    store = SessionStore()
+    try:
+        assert store.path == str(tmp_path / 'data' / 'sessions.db')
+        store.save('example.com', 'default', [{'name': 'sid', 'value': '1'}])
+        assert (tmp_path / 'data' / 'sessions.db').exists()
+    finally:
+        store.close()
@@ -0,0 +1,95 @@
+import importlib.util
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from driver.extraction import EXTRACT_SCRIPT, ExtractionSpec, _to_number, extract_from_html
+from utils.markup import lxml_available
+
+NUMBER_CASES = [
+    ('$1,234.56', 1234.56),
+    ('1.234,56 €', 1234.56),
+    ('1\u00a0234,5', 1234.5),
+    ('1 234', 1234.0),
+    ('1,234', 1234.0),
+    ('1,5', 1.5),
+    ('1.234.567', 1234567.0),
+    ('3.14', 3.14),
+    ('-42 items', -42.0),
+    ('Price: 12.', 12.0),
+    ('no digits', None),
+]
+
+
+@pytest.mark.parametrize('value, expected', NUMBER_CASES)
+def test_to_number(value, expected):
+    assert _to_number(value) == expected
+
+
+def test_to_number_matches_the_in_page_version():
+    """_to_number must agree with toNumber() in EXTRACT_SCRIPT, or static and browser runs extract different records."""
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('node is not installed')
+    function = re.search(r'^function toNumber\(value\) \{.*?^\}$', EXTRACT_SCRIPT, re.S | re.M).group()
+    values = [value for value, _ in NUMBER_CASES]
+    script = f"{function}\nconsole.log(JSON.stringify({json.dumps(values)}.map(toNumber)));"
+    output = subprocess.run([node, '-e', script], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output) == [_to_number(value) for value in values]
+
+
+PRODUCTS = """
+<html><head><base href="https://shop.example/"></head><body>
+  <h1>  Goats
+  </h1>
+  <ul>
+    <li class="product featured"><a class="name" href="/goats/1">Alpine</a><span class="price">1.234,50 €</span>
+      <span class="tag">dairy</span><span class="tag">hardy</span><span class="sku">SKU-001</span></li>
+    <li class="product"><a class="name" href="goats/2">Boer</a><span class="price">$950</span><span class="sku">SKU-002</span></li>
+    <li class="product"><a class="name" href="https://other.example/3">Pygmy</a></li>
+  </ul>
+</body></html>
+"""
+
+
+def test_extract_from_html_with_css_rows_and_fields():
+    spec = ExtractionSpec.from_dict({
+        'rows': 'css:li.product',
+        'fields': {
+            'name': 'css:a.name',
+            'url': {'selector': 'css:a.name', 'attribute': 'href', 'transform': 'absolute_url'},
+            'price': {'selector': 'css:.price', 'transform': 'number'},
+            'tags': {'selector': 'class:tag', 'all': True, 'transform': 'upper'},
+            'sku': {'selector': 'xpath:.//span[@class="sku"]', 'transform': ['regex:SKU-(\\d+)', 'int']},
+        },
+    })
+    assert extract_from_html(PRODUCTS, spec, 'https://shop.example/list') == [
+        {'name': 'Alpine', 'url': 'https://shop.example/goats/1', 'price': 1234.5, 'tags': ['DAIRY', 'HARDY'],
+         'sku': 1},
+        {'name': 'Boer', 'url': 'https://shop.example/goats/2', 'price': 950.0, 'tags': [], 'sku': 2},
+        {'name': 'Pygmy', 'url': 'https://other.example/3', 'price': None, 'tags': [], 'sku': None},
+    ]
+
+
+def test_extract_from_html_without_rows_reads_the_whole_page():
+    spec = ExtractionSpec.from_dict({'fields': {'title': 'css:h1', 'count': {'selector': 'css:li', 'all': True}},
+                                     'limit': 1})
+    records = extract_from_html(PRODUCTS, spec)
+    assert len(records) == 1
+    assert records[0]['title'] == 'Goats'
+    assert len(records[0]['count']) == 3
+
+
+def test_limit_caps_rows():
+    spec = ExtractionSpec.from_dict({'rows': 'css:li.product', 'fields': {'name': 'css:a'}, 'limit': 2})
+    assert [record['name'] for record in extract_from_html(PRODUCTS, spec)] == ['Alpine', 'Boer']
+
+
+def test_lxml_available_requires_cssselect(monkeypatch):
+    assert lxml_available()
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None if name == 'cssselect' else real_find_spec(name))
+    assert not lxml_available()
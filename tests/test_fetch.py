@@ -0,0 +1,124 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from driver.fetch import StaticFetcher
+from storage.fingerprints import FingerprintIndex
+
+BODY = b'<html><body><p>Goat</p></body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        self._answer(body=True)
+
+    def do_HEAD(self):
+        self._answer(body=False)
+
+    def _answer(self, body):
+        Handler.requests.append((self.command, self.headers.get('If-None-Match')))
+        if self.etag and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(BODY)))
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    Handler.etag = '"v1"'
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/page'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FingerprintIndex(str(tmp_path / 'fingerprints.db'))
+    yield index
+    index.close()
+
+
+def test_revalidate_sends_nothing_without_validators(server, index):
+    fetcher = StaticFetcher(fingerprints=index)
+    assert fetcher.revalidate(server) is None
+    index.update(server, content_hash='x')
+    assert fetcher.revalidate(server) is None
+    assert Handler.requests == []
+
+
+def test_revalidate_uses_a_conditional_head_and_touches(server, index):
+    fetcher = StaticFetcher(fingerprints=index)
+    index.update(server, etag='"v1"', content_hash='x')
+    checked_at = index.get(server).checked_at
+    time.sleep(0.01)
+    page = fetcher.revalidate(server)
+    assert page.unchanged and page.status == 304
+    assert Handler.requests == [('HEAD', '"v1"')]
+    assert index.get(server).checked_at > checked_at
+
+    Handler.etag = '"v2"'
+    assert fetcher.revalidate(server) is None
+
+
+def test_head_returns_validators(server):
+    page = StaticFetcher().head(server)
+    assert page.headers['ETag'] == '"v1"' and page.html == ''
+    assert Handler.requests == [('HEAD', None)]
+
+
+def test_fetch_touches_pages_unchanged_by_content(server, index):
+    Handler.etag = None
+    fetcher = StaticFetcher(fingerprints=index)
+    page = fetcher.fetch(server)
+    assert not page.unchanged
+    index.update(server, content_hash=page.content_hash)
+    checked_at = index.get(server).checked_at
+    time.sleep(0.01)
+    assert fetcher.fetch(server).unchanged
+    assert index.get(server).checked_at > checked_at
+
+
+class CookieDriver:
+    def __init__(self):
+        self.cookies = [{'name': 'consent', 'value': 'no', 'domain': 'example.com'}]
+        self.reads = 0
+
+    def get_cookies(self):
+        self.reads += 1
+        return self.cookies
+
+
+def test_cookies_are_copied_again_after_every_chain():
+    from driver.selenium import BrowserClient
+    client = BrowserClient()
+    client.driver = CookieDriver()
+    fetcher = StaticFetcher(client)
+    fetcher.sync_from_driver()
+    fetcher.sync_from_driver()
+    assert client.driver.reads == 1
+
+    client.driver.cookies = [{'name': 'consent', 'value': 'yes', 'domain': 'example.com'}]
+    client.process_elements_chain([])
+    fetcher.sync_from_driver()
+    assert client.driver.reads == 2
+    assert fetcher.session.cookies.get('consent') == 'yes'
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from storage.fingerprints import FingerprintIndex, content_hash, record_hash
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FingerprintIndex(str(tmp_path / 'fingerprints.db'))
+    yield index
+    index.close()
+
+
+def test_update_reports_changes(index):
+    url = 'https://example.com/p'
+    assert index.update(url, etag='"a"', content_hash=content_hash('<p>one</p>\n<p>two</p>'))
+    assert not index.update(url, content_hash=content_hash('  <p>one</p>  <p>two</p>\n'))
+    assert index.update(url, content_hash=content_hash('<p>one</p><p>three</p>'))
+    assert index.get(url).etag == '"a"'
+
+
+def test_record_hash_takes_precedence_over_content_hash(index):
+    url = 'https://example.com/p'
+    records = [{'name': 'Goat', 'price': 10}]
+    index.update(url, content_hash=content_hash('<p>one</p>'), record_hash=record_hash(records))
+    assert not index.update(url, content_hash=content_hash('<p>ads changed</p>'),
+                            record_hash=record_hash([{'price': 10, 'name': 'Goat'}]))
+    assert index.update(url, record_hash=record_hash([{'name': 'Goat', 'price': 12}]))
+
+
+def test_update_keeps_changed_at_of_unchanged_pages(index):
+    url = 'https://example.com/p'
+    index.update(url, content_hash='x')
+    first = index.get(url)
+    index.update(url, content_hash='x')
+    second = index.get(url)
+    assert second.changed_at == first.changed_at
+    assert second.checked_at >= first.checked_at
+
+
+def test_scopes_are_separate(index):
+    url = 'https://example.com/p'
+    index.update(url, etag='"a"', content_hash='x', scope='shop.product@1')
+    assert index.get(url) is None
+    assert index.conditional_headers(url, 'shop.product@2') == {}
+    assert index.conditional_headers(url, 'shop.product@1') == {'If-None-Match': '"a"'}
+    assert index.update(url, content_hash='x', scope='shop.product@2')
+    index.forget(url, 'shop.product@1')
+    assert index.get(url, 'shop.product@1') is None
+    assert index.get(url, 'shop.product@2') is not None
+    index.forget(url)
+    assert index.get(url, 'shop.product@2') is None
+
+
+def test_index_without_scopes_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'fingerprints.db')
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE fingerprints (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+                           'content_hash TEXT, record_hash TEXT, checked_at REAL NOT NULL, changed_at REAL NOT NULL)')
+        connection.execute("INSERT INTO fingerprints VALUES ('https://example.com/p', NULL, NULL, 'x', NULL, 0, 0)")
+    connection.close()
+    index = FingerprintIndex(path)
+    assert index.get('https://example.com/p') is None
+    assert index.update('https://example.com/p', content_hash='x', scope='shop.product@1')
+    index.close()
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from crawler.frontier import Frontier, canonicalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTP://Example.COM:80/a/./b/../c?b=2&a=1#top', 'http://example.com/a/c?a=1&b=2'),
+    ('https://example.com:443', 'https://example.com/'),
+    ('https://example.com:8443/x/', 'https://example.com:8443/x/'),
+    ('http://example.com/p?utm_source=news&id=7', 'http://example.com/p?id=7'),
+    ('http://example.com/a/%2F/b?b=2&a=1', 'http://example.com/a/%2F/b?a=1&b=2'),
+    ('http://h/%7euser/A%e2%82%ac', 'http://h/~user/A%E2%82%AC'),
+    ('http://user:pw@Host/p', 'http://user:pw@host/p'),
+    ('http://[::1]:8080/y', 'http://[::1]:8080/y'),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_encoded_slash_stays_distinct_from_slash():
+    assert canonicalize_url('http://example.com/a%2Fb') != canonicalize_url('http://example.com/a/b')
+
+
+def test_unreserved_escapes_equal_their_characters():
+    assert canonicalize_url('http://example.com/%41%2D%5F') == canonicalize_url('http://example.com/A-_')
+
+
+def test_dedups_canonical_spellings():
+    frontier = Frontier(politeness_delay=0)
+    assert frontier.add('https://example.com/a?b=2&a=1')
+    assert not frontier.add('HTTPS://EXAMPLE.com:443/a?a=1&b=2#section')
+    assert not frontier.add('https://example.com/./a?utm_source=x&a=1&b=2')
+    assert frontier.add_many(['https://example.com/a?a=1&b=2', 'https://example.com/b']) == 1
+    assert frontier.stats() == {'pending': 2, 'in_flight': 0, 'hosts': 1, 'seen': 2}
+
+
+def test_higher_priority_first():
+    frontier = Frontier(politeness_delay=0)
+    frontier.add('https://a.example/low', priority=1)
+    frontier.add('https://b.example/high', priority=10)
+    frontier.add('https://a.example/mid', priority=5)
+    order = []
+    while True:
+        request = frontier.next(timeout=0)
+        if request is None:
+            break
+        order.append(request.url)
+        frontier.done(request)
+    assert order == ['https://b.example/high', 'https://a.example/mid', 'https://a.example/low']
+
+
+def test_one_request_per_host_at_a_time():
+    frontier = Frontier(politeness_delay=0)
+    frontier.add('https://a.example/1')
+    frontier.add('https://a.example/2')
+    frontier.add('https://b.example/1')
+    first, second = frontier.next(timeout=0), frontier.next(timeout=0)
+    assert {first.host, second.host} == {'a.example', 'b.example'}
+    assert frontier.next(timeout=0) is None
+    assert (len(frontier), frontier.in_flight) == (1, 2)
+    frontier.done(first if first.host == 'a.example' else second)
+    assert frontier.next(timeout=0).url == 'https://a.example/2'
+
+
+def test_politeness_delay_between_fetches_of_a_host():
+    frontier = Frontier(politeness_delay=0.2)
+    frontier.set_delay('fast.example', 0)
+    frontier.add_many(['https://slow.example/1', 'https://slow.example/2', 'https://fast.example/1',
+                       'https://fast.example/2'])
+    for _ in range(2):
+        frontier.done(frontier.next(timeout=0))
+    started = time.monotonic()
+    assert frontier.next(timeout=1).host == 'fast.example'
+    assert time.monotonic() - started < 0.1
+    request = frontier.next(timeout=1)
+    assert request.url == 'https://slow.example/2'
+    assert time.monotonic() - started >= 0.15
+
+
+def test_next_returns_none_once_exhausted():
+    frontier = Frontier(politeness_delay=0)
+    frontier.add('https://example.com/')
+    request = frontier.next()
+    frontier.done(request)
+    assert frontier.next() is None
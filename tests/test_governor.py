@@ -0,0 +1,91 @@
+import threading
+import time
+
+import psutil
+
+from driver.governor import ResourceGovernor
+from driver.pool import BrowserPool
+from driver.selenium import BrowserClient
+
+
+class FakeClient:
+    """Stands in for a BrowserClient whose liveness probe can be made to hang."""
+
+    def __init__(self):
+        self.driver = object()
+        self.pages_visited = 0
+        self.probes = 0
+        self.hang = threading.Event()
+        self.killed = False
+
+    def initialize_driver(self):
+        pass
+
+    def is_alive(self):
+        self.probes += 1
+        if self.hang.is_set():
+            time.sleep(5)
+        return True
+
+    def get_process_tree(self):
+        return []
+
+    def get_memory_usage(self):
+        return 100.0
+
+    def kill(self):
+        self.killed = True
+
+    def close_driver(self):
+        self.driver = None
+
+
+def test_healthy_idle_browser_is_probed_once_and_returned():
+    with BrowserPool(size=1, client_factory=FakeClient) as pool:
+        client = pool.clients()[0][0]
+        governor = ResourceGovernor(pool, probe_timeout=1)
+        governor.tick()
+        assert client.probes == 1
+        assert pool.clients() == [(client, False)]
+        governor.stop()
+
+
+def test_browser_hanging_after_its_probe_does_not_block_the_governor():
+    with BrowserPool(size=1, client_factory=FakeClient) as pool:
+        client = pool.clients()[0][0]
+        governor = ResourceGovernor(pool, probe_timeout=1)
+        real_is_alive = client.is_alive
+
+        def is_alive():
+            # Answers the governor's probe, then hangs on any further one.
+            alive = real_is_alive()
+            client.hang.set()
+            return alive
+        client.is_alive = is_alive
+        started = time.monotonic()
+        governor.tick()
+        assert time.monotonic() - started < 1
+        assert pool.clients() == [(client, False)]
+        governor.stop()
+
+
+def test_unresponsive_idle_browser_is_killed_and_replaced():
+    with BrowserPool(size=1, client_factory=FakeClient) as pool:
+        client = pool.clients()[0][0]
+        client.hang.set()
+        governor = ResourceGovernor(pool, probe_timeout=0.1)
+        governor.tick()
+        assert client.killed
+        deadline = time.monotonic() + 2
+        while client in [c for c, _ in pool.clients()] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client not in [c for c, _ in pool.clients()]
+        governor.stop()
+
+
+def test_memory_usage_sums_unique_memory(monkeypatch):
+    process = psutil.Process()
+    client = BrowserClient.__new__(BrowserClient)
+    monkeypatch.setattr(BrowserClient, 'get_process_tree', lambda self: [process, process])
+    assert client.get_memory_usage() == 2 * process.memory_full_info().uss / (1024 ** 2)
+    assert client.get_memory_usage('rss') == 2 * process.memory_full_info().rss / (1024 ** 2)
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from crawler import jobs
+from crawler.jobs import SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    yield queue
+    queue.close()
+
+
+def test_lease_hands_out_each_job_once(queue):
+    low = queue.put({'url': 'https://example.com/low'})
+    high = queue.put({'url': 'https://example.com/high'}, priority=5)
+    first = queue.lease('worker-1')
+    second = queue.lease('worker-2')
+    assert (first.id, second.id) == (high, low)
+    assert first.payload == {'url': 'https://example.com/high'}
+    assert first.attempts == 1 and first.leased_by == 'worker-1'
+    assert queue.lease('worker-3') is None
+    assert queue.stats()['leased'] == 2
+
+
+def test_complete_requires_the_current_lease(queue):
+    queue.put({'n': 1})
+    job = queue.lease('worker', visibility_timeout=0.05)
+    time.sleep(0.1)
+    retaken = queue.lease('other')
+    assert retaken.id == job.id and retaken.attempts == 2
+    assert not queue.heartbeat(job)
+    assert not queue.complete(job, {'stale': True})
+    assert queue.complete(retaken, {'records': 3})
+    assert queue.results() == [{'id': job.id, 'payload': {'n': 1}, 'state': 'done', 'attempts': 2,
+                                'result': {'records': 3}, 'error': None}]
+
+
+def test_heartbeat_extends_the_lease(queue):
+    queue.put({'n': 1})
+    job = queue.lease('worker', visibility_timeout=0.1)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.heartbeat(job, visibility_timeout=0.1)
+    assert queue.lease('other') is None
+
+
+def test_expired_lease_fails_the_job_once_attempts_are_spent(queue):
+    queue.put({'n': 1}, max_attempts=1)
+    queue.lease('worker', visibility_timeout=0.05)
+    time.sleep(0.1)
+    assert queue.lease('other') is None
+    assert queue.results() == [{'id': 1, 'payload': {'n': 1}, 'state': 'failed', 'attempts': 1,
+                                'result': None, 'error': 'lease expired'}]
+
+
+def test_fail_retries_after_a_delay_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(jobs, 'retry_delay', lambda attempts: 0.05)
+    queue.put({'n': 1}, max_attempts=2)
+    job = queue.lease('worker')
+    assert queue.fail(job, 'TimeoutError: slow')
+    assert queue.stats()['pending'] == 1
+    assert queue.lease('worker') is None  # still backing off
+    time.sleep(0.1)
+    job = queue.lease('worker')
+    assert job.attempts == 2
+    assert queue.fail(job, 'TimeoutError: slow again')
+    assert queue.lease('worker') is None
+    stats = queue.stats()
+    assert (stats['pending'], stats['failed']) == (0, 1)
+    assert queue.results(state='failed')[0]['error'] == 'TimeoutError: slow again'
+
+
+def test_fail_without_retry(queue):
+    queue.put({'n': 1}, max_attempts=5)
+    job = queue.lease('worker')
+    assert queue.fail(job, 'RecipeError: bad', retry=False)
+    assert queue.stats()['failed'] == 1
+
+
+def test_retry_delay_backs_off_exponentially():
+    assert [jobs.retry_delay(attempts) for attempts in (1, 2, 3)] == [5.0, 10.0, 20.0]
+    assert jobs.retry_delay(20) == 300.0
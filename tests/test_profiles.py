@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from driver.profiles import ProfileTemplate
+
+
+class FakeClient:
+    def __init__(self, starts):
+        self.starts = starts
+        self.user_data_dir = None
+        self.driver = None
+        self.visited = []
+
+    def initialize_driver(self):
+        # Chrome creates the profile directory before it fails or succeeds.
+        os.makedirs(os.path.join(self.user_data_dir, 'Default'), exist_ok=True)
+        if self.starts:
+            self.driver = object()
+
+    def visit(self, url):
+        self.visited.append(url)
+
+    def close_driver(self):
+        self.driver = None
+
+
+def test_build_runs_the_client_on_the_template(tmp_path):
+    template = ProfileTemplate(str(tmp_path / 'template'), base_directory=str(tmp_path))
+    client = FakeClient(starts=True)
+    template.build(client, ['https://example.com/'])
+    assert template.exists and client.visited == ['https://example.com/']
+    assert client.user_data_dir is None
+    instance = template.instantiate()
+    assert os.path.isdir(os.path.join(instance, 'Default'))
+    ProfileTemplate.release(instance)
+
+
+def test_build_raises_and_cleans_up_when_chrome_does_not_start(tmp_path):
+    template = ProfileTemplate(str(tmp_path / 'template'), base_directory=str(tmp_path))
+    client = FakeClient(starts=False)
+    with pytest.raises(RuntimeError, match='did not start'):
+        template.build(client, ['https://example.com/'])
+    assert not template.exists
+    assert client.visited == [] and client.user_data_dir is None
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from driver.recipes import DEFAULT_RECIPES_PATH, RecipeError, RecipeRegistry, compile_recipe, validate_page, validate_step
+
+
+def step(**fields):
+    return {'selector_type': 'css', 'selector_value': '#go', **fields}
+
+
+@pytest.mark.parametrize('fields', [
+    {},
+    {'action': 'click', 'post_action': 'submit'},
+    {'action': 'click', 'in_page': True},
+    {'action': 'send_keys', 'action_value': 'someone@example.com'},
+    {'action': 'USE_EMAIL'},
+    {'action': 'USE_SCRIPT', 'settle': 'element', 'settle_value': 'css:#results'},
+    {'selector_type': 'XPATH', 'settle_timeout': 2.5, 'max_retries': None},
+])
+def test_valid_steps(fields):
+    validate_step(step(**fields), 'site.page[0]')
+
+
+@pytest.mark.parametrize('data, message', [
+    ('click', 'step must be an object'),
+    ({'selector_value': '#go'}, 'selector_type: missing required field'),
+    (step(selector_type='shadow'), "unsupported selector type 'shadow'"),
+    (step(action='tap'), "unsupported action 'tap'"),
+    (step(post_action='enter'), "unsupported post action 'enter'"),
+    (step(settle='idle'), 'settle: expected one of'),
+    (step(quiet_ms=True), 'quiet_ms: expected int'),
+    (step(in_page='yes'), 'in_page: expected bool'),
+    (step(color='red'), "unknown fields ['color']"),
+])
+def test_invalid_steps(data, message):
+    with pytest.raises(RecipeError, match='site.page\\[0\\]') as error:
+        validate_step(data, 'site.page[0]')
+    assert message in str(error.value)
+
+
+def test_page_options_are_validated():
+    validate_page({'steps': [step()], 'fetch': 'auto', 'extract': {'fields': {'title': 'css:h1'}}}, 'site.page')
+    with pytest.raises(RecipeError, match='site.page.fetch'):
+        validate_page({'steps': [], 'fetch': 'curl'}, 'site.page')
+    with pytest.raises(RecipeError, match="unknown field 'wait'"):
+        validate_page({'steps': [], 'wait': 3}, 'site.page')
+    with pytest.raises(RecipeError, match='site.page\\[1\\].selector_value'):
+        validate_page([step(), {'selector_type': 'css'}], 'site.page')
+
+
+def test_python_only_regex_is_rejected():
+    extract = {'fields': {'sku': {'selector': 'css:.sku', 'transform': 'regex:(?P<sku>\\d+)'}}}
+    with pytest.raises(RecipeError, match="regex syntax '\\(\\?P<' is not supported"):
+        validate_page({'steps': [], 'extract': extract}, 'site.page')
+    extract['fields']['sku']['transform'] = 'regex:SKU-(\\d+)[(?P<]'
+    validate_page({'steps': [], 'extract': extract}, 'site.page')
+
+
+def test_shipped_recipes_are_valid():
+    registry = RecipeRegistry(DEFAULT_RECIPES_PATH)
+    for site in registry.sites():
+        for page in registry.pages(site):
+            assert registry.recipe(site, page).steps
+
+
+def test_fingerprint_scope_follows_the_definition():
+    original = compile_recipe('site', 'page', [step(action='click')])
+    assert original.fingerprint_scope == compile_recipe('site', 'page', {'steps': [step(action='click')]}).fingerprint_scope
+    assert original.fingerprint_scope != compile_recipe('site', 'page', [step(action='USE_SCRIPT')]).fingerprint_scope
+
+
+def test_registry_reloads_changed_files(tmp_path):
+    path = tmp_path / 'recipes.json'
+    path.write_text(json.dumps({'site': {'page': [step()]}}))
+    registry = RecipeRegistry(str(path))
+    assert registry.get('site', 'page')[0].selector_value == '#go'
+    path.write_text(json.dumps({'site': {'page': [step(selector_value='#next')]}}))
+    os.utime(path, ns=(0, 1))
+    assert registry.get('site', 'page')[0].selector_value == '#next'
+    with pytest.raises(KeyError):
+        registry.get('site', 'missing')
@@ -0,0 +1,53 @@
+import gzip
+import json
+import os
+import time
+
+from export.sinks import FileSink
+
+
+def read_ndjson(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def test_writes_one_file_without_rotation(tmp_path):
+    path = str(tmp_path / 'products.ndjson')
+    with FileSink(path, batch_size=2) as sink:
+        sink.write_many({'id': i} for i in range(5))
+    assert sink.files == [path]
+    assert sink.records_written == 5
+    assert read_ndjson(path) == [{'id': i} for i in range(5)]
+
+
+def test_rotates_by_size(tmp_path):
+    path = str(tmp_path / 'products.ndjson')
+    with FileSink(path, batch_size=2, max_bytes=1) as sink:
+        sink.write_many({'id': i} for i in range(5))
+    assert [os.path.basename(name) for name in sink.files] == [
+        'products-00000.ndjson', 'products-00001.ndjson', 'products-00002.ndjson']
+    assert [read_ndjson(name) for name in sink.files] == [
+        [{'id': 0}, {'id': 1}], [{'id': 2}, {'id': 3}], [{'id': 4}]]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def test_rotates_by_age(tmp_path):
+    path = str(tmp_path / 'products.ndjson')
+    sink = FileSink(path, batch_size=1, max_seconds=0.01)
+    sink.write({'id': 0})
+    time.sleep(0.02)
+    sink.write({'id': 1})
+    sink.write({'id': 2})
+    sink.close()
+    assert [read_ndjson(name) for name in sink.files] == [[{'id': 0}, {'id': 1}], [{'id': 2}]]
+
+
+def test_compressed_files_are_renamed_when_complete(tmp_path):
+    path = str(tmp_path / 'products.ndjson')
+    sink = FileSink(path, batch_size=1, compress=True)
+    sink.write({'id': 0})
+    assert os.listdir(tmp_path) == ['products.ndjson.gz.part']
+    sink.close()
+    assert sink.files == [path + '.gz']
+    assert read_ndjson(sink.files[0]) == [{'id': 0}]
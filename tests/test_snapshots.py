@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from driver.extraction import ExtractionSpec
+from storage import snapshots
+from storage.snapshots import SnapshotStore, replay
+
+PAGE = '<html><body><div class="product"><h2>{name}</h2><span class="price">{price}</span></div></body></html>'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    yield store
+    store.close()
+
+
+def test_saves_each_document_once(store):
+    first = store.save('https://shop.example/a', PAGE.format(name='Alpine', price='10'), recipe='shop.product')
+    second = store.save('https://shop.example/b', PAGE.format(name='Alpine', price='10'), recipe='shop.product')
+    store.save('https://shop.example/a', PAGE.format(name='Alpine', price='12'), 'https://shop.example/a?v=2')
+    assert first.digest == second.digest
+    assert store.stats() == {'captures': 3, 'urls': 2, 'documents': 2}
+    assert store.latest('https://shop.example/a').final_url == 'https://shop.example/a?v=2'
+    assert store.load(first.digest) == PAGE.format(name='Alpine', price='10')
+    assert [snapshot.url for snapshot in store.snapshots(recipe='shop.product')] == [
+        'https://shop.example/a', 'https://shop.example/b']
+
+
+def test_replay_extracts_every_snapshot_in_order(store):
+    for i in range(5):
+        store.save(f"https://shop.example/{i}", PAGE.format(name=f"Goat {i}", price=f"{i},50 €"))
+    missing = store.save('https://shop.example/missing', PAGE.format(name='Gone', price='1'))
+    os.remove(store.object_path(missing.digest))
+    spec = ExtractionSpec.from_dict({'rows': 'css:div.product',
+                                     'fields': {'name': 'css:h2', 'price': {'selector': 'css:.price', 'transform': 'number'}}})
+
+    results = list(replay(store, spec, processes=2, batch_size=2, max_pending=1))
+
+    assert [snapshot.url for snapshot, _ in results] == [f"https://shop.example/{i}" for i in range(5)] + [
+        'https://shop.example/missing']
+    assert [records for _, records in results[:5]] == [[{'name': f"Goat {i}", 'price': i + 0.5}] for i in range(5)]
+    assert isinstance(results[5][1], FileNotFoundError)
+
+
+def test_replay_requires_lxml_and_cssselect(store, monkeypatch):
+    monkeypatch.setattr(snapshots, 'lxml_available', lambda: False)
+    with pytest.raises(ImportError, match='cssselect'):
+        next(replay(store, ExtractionSpec.from_dict({'fields': {'title': 'css:h1'}})))
@@ -0,0 +1,145 @@
+import time
+
+from driver import tabs
+from driver.schema import UIElement, resolve_selector
+from driver.tabs import TabScheduler
+
+# url -> seconds until the page has loaded, and selector -> seconds after the load until the element appears
+PAGES = {
+    'https://slow.example/': {'load': 0.0, 'elements': {'#late': 0.4}},
+    'https://fast.example/': {'load': 0.0, 'elements': {'#one': 0, '#two': 0}},
+    'https://settle.example/': {'load': 0.0, 'elements': {'#go': 0, '#done': 0.3}},
+    'https://stuck.example/': {'load': 60, 'elements': {}},
+}
+
+
+class FakeElement:
+    def __init__(self, driver, selector):
+        self.driver = driver
+        self.selector = selector
+
+    def click(self):
+        self.driver.clicks.append((self.driver.page['url'], self.selector, time.monotonic()))
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+    def new_window(self, kind):
+        handle = f"tab-{len(self.driver.pages)}"
+        self.driver.pages[handle] = None
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """A few tabs of fake pages whose loads and elements show up after fixed delays."""
+
+    def __init__(self):
+        self.pages = {'tab-0': None}
+        self.current_window_handle = 'tab-0'
+        self.switch_to = FakeSwitchTo(self)
+        self.clicks = []
+
+    @property
+    def page(self):
+        return self.pages[self.current_window_handle]
+
+    @property
+    def current_url(self):
+        return self.page['url'] if self.page else 'about:blank'
+
+    def execute_script(self, script, *args):
+        now = time.monotonic()
+        if script == tabs.NAVIGATE_SCRIPT:
+            config = PAGES[args[0]]
+            self.pages[self.current_window_handle] = {'url': args[0], 'loaded_at': now + config['load']}
+            return False
+        if script == tabs.READY_SCRIPT:
+            return now >= self.page['loaded_at']
+        if script == tabs.ACTIVITY_SCRIPT:
+            return not args[2]
+        return 'complete' if 'readyState' in script else None
+
+    def find_elements(self, by, value):
+        page = self.page
+        appears = PAGES[page['url']]['elements'].get(value)
+        if appears is None or time.monotonic() < page['loaded_at'] + appears:
+            return []
+        return [FakeElement(self, value)]
+
+
+class FakeClient:
+    def __init__(self):
+        self.driver = FakeDriver()
+        self.initial_window_handle = 'tab-0'
+        self.pages_visited = 0
+        self.cookie_epoch = 0
+        self.timeout_after = 1
+        self.max_retries = 0
+
+    @staticmethod
+    def _get_by_selector(selector):
+        return resolve_selector(selector)
+
+    def _perform_action(self, element, found):
+        found.click()
+        return found
+
+    def _perform_post_action(self, element, found):
+        return found
+
+
+def step(selector, **fields):
+    return UIElement({'selector_type': 'css', 'selector_value': selector, 'action': 'click', **fields})
+
+
+def test_waiting_tab_does_not_block_the_others():
+    client = FakeClient()
+    scheduler = TabScheduler(client, tabs=2, poll_interval=0.01)
+    slow = scheduler.submit('https://slow.example/', [step('#late')])
+    fast = scheduler.submit('https://fast.example/', [step('#one'), step('#two')], callback=lambda c, job: 'ok')
+    started = time.monotonic()
+    finished = scheduler.run()
+    assert finished == [fast, slow]
+    assert all(job.succeeded for job in finished)
+    assert fast.result == 'ok'
+    clicks = [(url, selector) for url, selector, _ in client.driver.clicks]
+    assert clicks == [('https://fast.example/', '#one'), ('https://fast.example/', '#two'), ('https://slow.example/', '#late')]
+    assert client.driver.clicks[1][2] - started < 0.2
+    assert client.pages_visited == 2
+
+
+def test_settle_waits_are_polled_without_blocking():
+    client = FakeClient()
+    scheduler = TabScheduler(client, tabs=2, poll_interval=0.01)
+    settling = scheduler.submit('https://settle.example/', [step('#go', settle='element', settle_value='css:#done'),
+                                                            step('#done')])
+    fast = scheduler.submit('https://fast.example/', [step('#one')])
+    finished = scheduler.run()
+    assert finished == [fast, settling]
+    clicks = {selector: at for _, selector, at in client.driver.clicks}
+    assert clicks['#one'] < clicks['#done']
+    assert clicks['#done'] - clicks['#go'] >= 0.25
+
+
+def test_missing_element_is_skipped_after_its_retries():
+    client = FakeClient()
+    client.timeout_after = 0.05
+    scheduler = TabScheduler(client, tabs=1, poll_interval=0.01)
+    job = scheduler.submit('https://fast.example/', [step('#missing', max_retries=1, backoff=0.01), step('#one')])
+    scheduler.run()
+    assert job.succeeded
+    assert [selector for _, selector, _ in client.driver.clicks] == ['#one']
+
+
+def test_load_timeout_fails_the_job():
+    client = FakeClient()
+    scheduler = TabScheduler(client, tabs=2, load_timeout=0.1, poll_interval=0.01)
+    stuck = scheduler.submit('https://stuck.example/', [step('#never')])
+    fast = scheduler.submit('https://fast.example/', [step('#one')])
+    assert scheduler.run() == [fast, stuck]
+    assert fast.succeeded and not stuck.succeeded
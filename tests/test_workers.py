@@ -0,0 +1,71 @@
+import time
+
+from crawler.workers import Worker, WorkerSupervisor, _Slot
+
+
+class FlakyQueue:
+    def __init__(self, failures):
+        self.failures = failures
+        self.leases = 0
+
+    def lease(self, worker, visibility_timeout, queue):
+        self.leases += 1
+        if self.leases <= self.failures:
+            raise ConnectionError('queue unreachable')
+        return None
+
+    def stats(self, queue):
+        return {'pending': 0, 'leased': 0}
+
+
+def test_worker_survives_queue_errors():
+    worker = Worker('sqlite:///unused.db', poll_interval=0.01, exit_when_idle=True)
+    worker._queue = FlakyQueue(failures=3)
+    started = time.monotonic()
+    worker._work(pool=None)
+    assert worker._queue.leases == 4
+    assert time.monotonic() - started >= 0.01 + 0.02 + 0.04
+
+
+class DeadProcess:
+    name = 'scrapegoat-worker-0'
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+
+def supervisor(monkeypatch, **options):
+    supervisor = WorkerSupervisor(1, **options)
+    started = []
+
+    def start(index):
+        previous = supervisor._slots[index]
+        slot = supervisor._slots[index] = _Slot(DeadProcess())
+        if previous is not None:
+            slot.failures = previous.failures
+        started.append(time.monotonic())
+        return slot
+
+    monkeypatch.setattr(supervisor, '_start', start)
+    supervisor._start(0)
+    return supervisor, started
+
+
+def test_supervisor_backs_off_and_gives_up_on_startup_failures(monkeypatch):
+    supervisor_, started = supervisor(monkeypatch, restart_delay=0.02, max_startup_failures=3)
+    while supervisor_._check(0):
+        time.sleep(0.005)
+    assert supervisor_.restarts == 2 and len(started) == 3
+    assert started[2] - started[1] >= 0.04 > started[1] - started[0] >= 0.02
+    assert not supervisor_._check(0)
+    assert supervisor_.restarts == 2
+
+
+def test_supervisor_restarts_long_running_workers_without_backoff(monkeypatch):
+    supervisor_, started = supervisor(monkeypatch, restart_delay=0.01, healthy_after=0.0, max_startup_failures=1)
+    while supervisor_.restarts < 3:
+        assert supervisor_._check(0)
+        time.sleep(0.002)
+    assert supervisor_._slots[0].failures == 0
+    assert all(later - earlier >= 0.01 for earlier, later in zip(started, started[1:]))